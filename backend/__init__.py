@@ -1,6 +1 @@
-from .cache_manager import CacheManager
-
-# Create a singleton instance of CacheManager
-cache_manager = CacheManager()
-
-__all__ = ['cache_manager']
\ No newline at end of file
+# The backend runs from this directory and imports its modules directly (from utils import cache_manager)
@@ -1,9 +1,8 @@
 import os
-import googlemaps
-import folium
 import polyline
 import datetime
 import logging
+from utils import upstream_client
 
 logger = logging.getLogger(__name__)
 
@@ -18,10 +17,9 @@ class TravelAgent:
         if not self.api_key:
             raise ValueError("Google Maps API key not found. This should have been caught during startup.")
         
-        self.gmaps = googlemaps.Client(key=self.api_key)
         self.locations = {}
 
-    def get_route(self, origin, destination, waypoints=[]):
+    async def get_route(self, origin, destination, waypoints=[]):
         """ Fetch optimized route and return travel time in hours and minutes. """
         try:   
             logger.info(f"Fetching route from {origin} to {destination}")
@@ -44,7 +42,7 @@ class TravelAgent:
 
             try:
                 # Call Google Directions API
-                route_result = self.gmaps.directions(**params)
+                route_result = await upstream_client.directions(**params)
             except Exception as api_error:
                 logger.error(f"Google Maps API Error: {str(api_error)}")
                 logger.error(f"Error type: {type(api_error)}")
@@ -77,6 +75,9 @@ class TravelAgent:
                         "end_address": leg['end_address'],
                         "distance_text": leg['distance']['text'],
                         "duration_text": leg['duration']['text'],
+                        "distance_meters": leg['distance']['value'],
+                        "duration_seconds": leg['duration']['value'],
+                        "start_location": leg.get('start_location', {}),
                         "end_location": leg.get('end_location', {})
                     })
 
@@ -142,7 +143,7 @@ class TravelAgent:
             logger.error(f"Request parameters: origin={origin}, destination={destination}, waypoints={waypoints}")
             return {"error": f"An error occurred while fetching the route: {str(e)}"}
     
-    def get_real_time_traffic(self, origin, destination, waypoints=[]):
+    async def get_real_time_traffic(self, origin, destination, waypoints=[]):
         """ Get real-time traffic duration in hours and minutes. """
         try:
             # Build the request parameters
@@ -155,7 +156,7 @@ class TravelAgent:
             }
 
             # Call Google Directions API
-            route_result = self.gmaps.directions(**params)
+            route_result = await upstream_client.directions(**params)
             
             if not route_result:
                 print(f"No routes found.")
@@ -1,20 +1,16 @@
-import httpx
 import os
 import time
-import openai
-import re
 import asyncio
-from difflib import SequenceMatcher
-import difflib
 import sys
 from pathlib import Path
-import googlemaps
 
 # Add the backend directory to the Python path
 backend_dir = Path(__file__).resolve().parent.parent
 sys.path.append(str(backend_dir))
 
-from utils import cache_manager
+from utils import cache_manager, geocoding_service, place_ranker, places_cache, upstream_client, RequestCoalescer
+from utils.geo import distances_to_polyline, haversine_distance, haversine_to_points, resample_by_distance
+from utils.top_k import TopKAggregator
 import logging
 
 # Set up logging with a more concise format
@@ -45,20 +41,36 @@ VALID_PLACE_TYPES = {
     'logding': 'lodging'
 }
 
-def is_similar(a, b, threshold=0.8):
-    return SequenceMatcher(None, a, b).ratio() > threshold
+# Maximum number of upstream Google Maps calls in flight per recommendations request
+DEFAULT_MAX_CONCURRENT_REQUESTS = 8
 
-def normalize(name):
-    return re.sub(r"[^\w\s]", "", name).lower().strip()
+# Google ratings top out at 5. Once the final route attractions are all rated 5, a later
+# find could at best be a closer 5, so searching stops there. That is rare on real data;
+# most of the saving comes from not searching types that are already full.
+MAX_PLACE_RATING = 5.0
+BEST_POSSIBLE_ATTRACTION_KEY = (MAX_PLACE_RATING, -float("inf"))
+
+# Places kept per location and section, and the wider pool per search handed to the AI ranker
+SECTION_LIMITS = {"hotels": 5, "restaurants": 5, "attractions": 9}
+ATTRACTIONS_PER_TYPE = 3
+AI_RANKING_CANDIDATES = 10
 
 class RecommendationAgent:
-    def __init__(self):
+    def __init__(self, max_concurrent_requests=DEFAULT_MAX_CONCURRENT_REQUESTS, rank_with_ai=None):
+        """
+        :param max_concurrent_requests: Upstream concurrency limit per recommendations request
+        :param rank_with_ai: Order each location's places with the LLM ranker (defaults to LLM_RANKING)
+        """
         self.api_key = os.getenv("GOOGLE_MAPS_API_KEY")
         if not self.api_key:
             raise ValueError("Google Maps API key not found")
         logger.info(f"Initializing RecommendationAgent with API key: {self.api_key[:8]}...")
-        self.gmaps = googlemaps.Client(key=self.api_key)
-        self.http_client = httpx.AsyncClient()
+        self.max_concurrent_requests = max_concurrent_requests
+        if rank_with_ai is None:
+            rank_with_ai = os.getenv("LLM_RANKING", "").lower() in ("1", "true", "yes")
+        self.rank_with_ai = rank_with_ai
+        # Trips enriching the same place at the same moment share one details call
+        self._details_coalescer = RequestCoalescer("place details")
 
     def _process_places_results(self, results, max_results=5):
         """Helper method to process and sort places results"""
@@ -73,157 +85,154 @@ class RecommendationAgent:
         )
         return sorted_places[:max_results]
 
-    async def get_recommendations(self, locations, preferences):
-        """Get recommendations for each location based on preferences"""
+    async def get_recommendations(self, locations, preferences, max_concurrent_requests=None, on_location=None):
+        """
+        Get recommendations for each location based on preferences
+
+        All locations are geocoded in parallel, then every (location, place type)
+        search is issued at once. At most ``max_concurrent_requests`` upstream calls
+        are in flight at any time; pass 1 to run them one after another.
+        :param locations: List of addresses to get recommendations for
+        :param preferences: List of place types to search for
+        :param max_concurrent_requests: Upstream concurrency limit (defaults to the agent setting)
+        :param on_location: Optional callback(location, recommendations) called as each location completes
+        :return: Dictionary mapping each geocoded location to its hotels, restaurants and attractions
+        """
         logger.info(f"Getting recommendations for locations: {locations}")
         logger.info(f"With preferences: {preferences}")
-        
+
+        semaphore = asyncio.Semaphore(max_concurrent_requests or self.max_concurrent_requests)
+
+        # Geocode every location at once (orchestrator already excludes origin)
+        geocodes = await geocoding_service.geocode_many(
+            locations, max_concurrent_requests=max_concurrent_requests or self.max_concurrent_requests
+        )
+        coordinates = []
+        for location in locations:
+            geocode = geocodes[location]
+            if geocode:
+                logger.info(f"Coordinates for {location}: {geocode['lat']}, {geocode['lng']}")
+                coordinates.append((geocode['lat'], geocode['lng']))
+            else:
+                coordinates.append(None)
+
+        # Resolve which attraction types to search for once, not per location
+        attraction_types = []
+        for preference in preferences or []:
+            logger.info(f"preference: {preference}")
+            if preference not in VALID_PLACE_TYPES:
+                logger.warning(f"Invalid place type: {preference}")
+                continue
+
+            # Skip restaurant since it's already handled separately
+            if preference == 'restaurant':
+                logger.info(f"Skipping restaurant preference since restaurants are handled separately")
+                continue
+
+            # Skip hotels since they're already handled separately
+            if preference == 'hotels':
+                logger.info(f"Skipping hotels preference since hotels are handled separately")
+                continue
+
+            attraction_types.append(preference)
+
+        # Build every (location, type) search: hotels and restaurants always, plus each preference
+        searches_by_location = {}
         recommendations = {}
-        
-        # Process all locations (orchestrator already excludes origin)
-        for location in locations: # Process all locations, don't skip first
-            logger.info(f"Processing location: {location}")
+        for location, coords in zip(locations, coordinates):
+            if coords is None or location in recommendations:
+                continue
+            # Initialize recommendations for this location
+            recommendations[location] = {
+                "hotels": [],
+                "restaurants": [],
+                "attractions": []
+            }
+            # The AI ranker picks from a wider pool than the rating cut would keep
+            searches = [
+                ("hotels", "hotels", 'lodging', AI_RANKING_CANDIDATES if self.rank_with_ai else SECTION_LIMITS["hotels"]),
+                ("restaurants", "restaurants", 'restaurant', AI_RANKING_CANDIDATES if self.rank_with_ai else SECTION_LIMITS["restaurants"])
+            ]
+            for preference in attraction_types:
+                searches.append(("attractions", preference, VALID_PLACE_TYPES[preference], ATTRACTIONS_PER_TYPE))
+            searches_by_location[location] = (coords, searches)
+
+        async def complete_location(location, coords, searches):
+            sections = recommendations[location]
             try:
-                # Get coordinates for the location
-                logger.info(f"Geocoding location: {location}")
-                geocode_result = await asyncio.to_thread(self.gmaps.geocode, location)
-                if not geocode_result:
-                    logger.warning(f"Could not geocode location: {location}")
-                    continue
-                
-                location_data = geocode_result[0]
-                lat = location_data['geometry']['location']['lat']
-                lng = location_data['geometry']['location']['lng']
-                
-                logger.info(f"Coordinates for {location}: {lat}, {lng}")
-                
-                # Initialize recommendations for this location
-                recommendations[location] = {
-                    "hotels": [],
-                    "restaurants": [],
-                    "attractions": []
-                }
-                
-                # Always get hotels
-                try:
-                    logger.info(f"Getting hotels for {location} at coordinates ({lat}, {lng})")
-                    hotels = await asyncio.to_thread(
-                        self.gmaps.places_nearby,
-                        location=(lat, lng),
-                        type='lodging',
-                        radius=5000
-                    )
+                # This location's searches share the semaphore with every other location's
+                results = await asyncio.gather(
+                    *(self._search_nearby(location, coords, label, place_type, semaphore)
+                      for _, label, place_type, _ in searches)
+                )
+
+                # Results come back in search order, so attractions keep their preference order
+                for (section, label, _, max_results), places in zip(searches, results):
+                    found = self._process_places_results(places, max_results=max_results)
+                    sections[section].extend(found)
+                    logger.info(f"Found {len(found)} {label} for {location}")
+
+                if self.rank_with_ai:
+                    recommendations[location] = sections = await self._rank_with_ai(sections, preferences)
+                    logger.info(f"Ranked places for {location} with AI")
 
-                    recommendations[location]["hotels"] = self._process_places_results(hotels)
-                    logger.info(f"Found {len(recommendations[location]['hotels'])} hotels")
-                except Exception as e:
-                    logger.error(f"Error getting hotels for {location}: {str(e)}")
-                    logger.error(f"Error type: {type(e)}")
-                    if hasattr(e, 'response'):
-                        logger.error(f"Response status: {e.response.status_code}")
-                        logger.error(f"Response body: {e.response.text}")
-                
-                # Always get restaurants
-                try:
-                    logger.info(f"Getting restaurants for {location} at coordinates ({lat}, {lng})")
-                    restaurants = await asyncio.to_thread(
-                        self.gmaps.places_nearby,
-                        location=(lat, lng),
-                        type='restaurant',
-                        radius=5000  # 5km radius
-                    )
-                    
-                    recommendations[location]["restaurants"] = self._process_places_results(restaurants)
-                    logger.info(f"Found {len(recommendations[location]['restaurants'])} restaurants")
-                except Exception as e:
-                    logger.error(f"Error getting restaurants for {location}: {str(e)}")
-                    logger.error(f"Error type: {type(e)}")
-                    if hasattr(e, 'response'):
-                        logger.error(f"Response status: {e.response.status_code}")
-                        logger.error(f"Response body: {e.response.text}")
-                
-                # Get attractions based on preferences
-                for preference in preferences:
-                    logger.info(f"preference: {preference}")
-                    if preference not in VALID_PLACE_TYPES:
-                        logger.warning(f"Invalid place type: {preference}")
-                        continue
-                    
-                    # Skip restaurant since it's already handled separately
-                    if preference == 'restaurant':
-                        logger.info(f"Skipping restaurant preference since restaurants are handled separately")
-                        continue
-                    
-                    # Skip hotels since they're already handled separately
-                    if preference == 'hotels':
-                        logger.info(f"Skipping hotels preference since hotels are handled separately")
-                        continue
-                        
-                    try:
-                        logger.info(f"Getting {preference} for {location} at coordinates ({lat}, {lng})")
-                        places = await asyncio.to_thread(
-                            self.gmaps.places_nearby,
-                            location=(lat, lng),
-                            type=VALID_PLACE_TYPES[preference],
-                            radius=5000  # 5km radius
-                        )
-                        
-                        attractions = self._process_places_results(places, max_results=3) # Limit to 3 per type
-                        recommendations[location]["attractions"].extend(attractions)
-                        logger.info(f"Found {len(attractions)} {preference}")
-                    except Exception as e:
-                        logger.error(f"Error getting {preference} for {location}: {str(e)}")
-                        logger.error(f"Error type: {type(e)}")
-                        if hasattr(e, 'response'):
-                            logger.error(f"Response status: {e.response.status_code}")
-                            logger.error(f"Response body: {e.response.text}")
-                
                 # Limit total attractions per location to prevent too many markers
-                if len(recommendations[location]["attractions"]) > 9:
-                    # Sort by rating and take the top 9
-                    recommendations[location]["attractions"].sort(key=lambda x: x.get('rating', 0), reverse=True)
-                    recommendations[location]["attractions"] = recommendations[location]["attractions"][:9]
-                    logger.info(f"Limited attractions for {location} to top 9 by rating")
-
+                elif len(sections["attractions"]) > SECTION_LIMITS["attractions"]:
+                    # Sort by rating and take the top ones
+                    sections["attractions"].sort(key=lambda x: x.get('rating', 0), reverse=True)
+                    sections["attractions"] = sections["attractions"][:SECTION_LIMITS["attractions"]]
+                    logger.info(f"Limited attractions for {location} to top {SECTION_LIMITS['attractions']} by rating")
             except Exception as e:
+                # One location failing must not take the others down; keep what it found
                 logger.error(f"Error processing location {location}: {str(e)}")
-                logger.error(f"Error type: {type(e)}")
-                if hasattr(e, 'response'):
-                    logger.error(f"Response status: {e.response.status_code}")
-                    logger.error(f"Response body: {e.response.text}")
-                continue
-        
+                self._log_upstream_error(e)
+                sections["error"] = str(e)
+
+            if on_location:
+                on_location(location, sections)
+
+        await asyncio.gather(
+            *(complete_location(location, coords, searches)
+              for location, (coords, searches) in searches_by_location.items())
+        )
+
         logger.info(f"Final recommendations structure: {recommendations}")
         return recommendations
 
-    async def _get_lat_lng(self, address):
-        """ Get latitude and longitude for an address with caching """
+    async def _search_nearby(self, location, coords, label, place_type, semaphore, radius=5000):
+        """ Run one places_nearby search under the shared concurrency limit, returning the raw result or None """
+        lat, lng = coords
         try:
-            response = await self.http_client.get(
-                "https://maps.googleapis.com/maps/api/geocode/json",
-                params={"address": address, "key": self.api_key}
-            )
-            result = response.json()
-            if result["results"]:
-                loc = result["results"][0]["geometry"]["location"]
-                return f"{loc['lat']},{loc['lng']}"
+            logger.info(f"Getting {label} for {location} at coordinates ({lat}, {lng})")
+            async with semaphore:
+                return await places_cache.search(self._places_nearby, (lat, lng), place_type, radius)
         except Exception as e:
-            logger.error(f"Error getting lat/lng for {address}: {str(e)}")
+            logger.error(f"Error getting {label} for {location}: {str(e)}")
+            self._log_upstream_error(e)
+            return None
+
+    async def _places_nearby(self, **params):
+        """ Call the Places Nearby Search API through the shared upstream client """
+        return await upstream_client.places_nearby(**params)
+
+    def _log_upstream_error(self, e):
+        """ Log the type and, when available, the HTTP response of an upstream error """
+        logger.error(f"Error type: {type(e)}")
+        if hasattr(e, 'response'):
+            logger.error(f"Response status: {e.response.status_code}")
+            logger.error(f"Response body: {e.response.text}")
+
+    async def _get_lat_lng(self, address):
+        """ Get latitude and longitude for an address with caching """
+        geocode = await geocoding_service.geocode(address)
+        if geocode:
+            return f"{geocode['lat']},{geocode['lng']}"
         return None
     
     async def _fetch_places(self, location, place_type):
         """ Fetch places with caching """
         try:
-            response = await self.http_client.get(
-                "https://maps.googleapis.com/maps/api/place/nearbysearch/json",
-                params={
-                    "location": location,
-                    "radius": 20000,
-                    "type": place_type,
-                    "key": self.api_key
-                }
-            )
-            result = response.json()
+            result = await upstream_client.places_nearby(location=location, radius=20000, type=place_type)
 
             # Limit to 5 places per category
             places = [{
@@ -241,21 +250,16 @@ class RecommendationAgent:
         try:
             # Try to get cached place details
             cache_key = f"details_{place_id}"
-            cached_details = cache_manager.get_cached('details', cache_key)
+            cached_details = await cache_manager.get_cached_async('details', cache_key)
             if cached_details:
                 logger.debug(f"Cache HIT: Place details for {place_id}")
                 return cached_details
 
             logger.debug(f"Cache MISS: Place details for {place_id}")
-            response = await self.http_client.get(
-                "https://maps.googleapis.com/maps/api/place/details/json",
-                params={
-                    "place_id": place_id,
-                    "fields": "name,formatted_address,formatted_phone_number,rating,opening_hours",
-                    "key": self.api_key
-                }
+            result = await upstream_client.place_details(
+                place_id,
+                fields="name,formatted_address,formatted_phone_number,rating,opening_hours"
             )
-            result = response.json()
             if "result" in result:
                 details = result["result"]
                 place_details = {
@@ -274,77 +278,51 @@ class RecommendationAgent:
             logger.error(f"Error getting place details for place_id {place_id}: {str(e)}")
         return None
 
-    def _rank_with_ai(self, places, category):
-        """ 
-        Use OpenAI to rank places based on user preferences 
+    async def get_place_details_batch(self, place_ids, max_concurrent_requests=None):
         """
-        if not places:
-            return []
-        
-        # Create the prompt for the AI
-        prompt = f"Rank these {category} based on reviews and relevance:\n"
-        for p in places:
-            prompt += f"- {p['name']} (Rating: {p.get('rating', 'N/A')})\n"
-
-        # Call OpenAI API to get ranking
-        response = self.client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": "You are an AI assistant that ranks restaurants, hotels, and attractions based on user preferences."},
-                {"role": "user", "content": prompt}
-            ]
-        )
-
-        # Initialize variables for processing the AI response
-        ranked_places = []
-        matched_names = set()
-
-        # Get the AI's response and split it into lines
-        ai_response = response.choices[0].message.content
-        lines = ai_response.split("\n")
-
-        # Create a dictionary of normalized place names for matching
-        normalized_places = {normalize(p["name"]): p for p in places}
+        Get details for many places at once, fetching each distinct uncached place only once
 
-        # Process each line of the AI response
-        for line in lines:
-            # Skip lines that don't start with a number
-            if not re.match(r"^\d+[\.\)]", line.strip()):
-                continue
-
-            # Extract the place name from the line
-            match = re.search(r"^\s*[\d•\-]+[.)\s-]*\**(.*?)\**(?:\s*\(|$)", line)
-            if not match: 
-                continue
+        Cached details are served straight from cache_manager; the misses are fetched
+        concurrently and written back to it.
+        :param place_ids: Place IDs from any section of a trip; duplicates and empty IDs are ignored
+        :param max_concurrent_requests: Upstream concurrency limit (defaults to the agent setting)
+        :return: Dictionary mapping each place ID to its details, or None if they could not be fetched
+        """
+        unique = [place_id for place_id in dict.fromkeys(place_ids) if place_id]
+        details = {}
+        misses = []
+        for place_id in unique:
+            cached_details = await cache_manager.get_cached_async('details', f"details_{place_id}")
+            if cached_details:
+                details[place_id] = cached_details
+            else:
+                misses.append(place_id)
 
-            # Clean and normalize the extracted name
-            cleaned_name = normalize(match.group(1))
-            if not cleaned_name:
-                continue
+        semaphore = asyncio.Semaphore(max_concurrent_requests or self.max_concurrent_requests)
 
-            # Find the best matching place from our list
-            close_matches = difflib.get_close_matches(cleaned_name, normalized_places.keys(), n=1, cutoff=0.7)
+        async def fetch(place_id):
+            async with semaphore:
+                details[place_id] = await self._details_coalescer.run(place_id, lambda: self._get_place_details(place_id))
 
-            # If we found a match, add it to our ranked places
-            if close_matches:
-                best_match = close_matches[0]
-                place = normalized_places[best_match]
-                if place["name"] not in matched_names:
-                    matched_names.add(place["name"])
-                    ranked_places.append(place)
+        await asyncio.gather(*(fetch(place_id) for place_id in misses))
+        logger.info(f"Place details for {len(unique)} places: {len(unique) - len(misses)} cached, {len(misses)} fetched")
+        return {place_id: details[place_id] for place_id in unique}
 
-            # Stop after getting 5 places
-            if len(ranked_places) >= 5:
-                break
-        
-        # If no matches were found, return the top 5 raw results
-        if not ranked_places:
-            logger.warning(f"No matches found via AI for {category}. Using top 5 raw results.")
-            return places[:5]
-        
-        return ranked_places
+    async def _rank_with_ai(self, sections, preferences, deadline=None):
+        """
+        Order one location's hotels, restaurants and attractions with the LLM ranker
+
+        Every section goes to the model in a single request; if it fails or misses
+        the deadline, places come back in rating order.
+        :param sections: Dictionary of candidate places by section
+        :param preferences: List of place types the traveler asked for
+        :param deadline: Seconds to wait for the model (defaults to the ranker setting)
+        :return: The same sections, best first and cut to SECTION_LIMITS
+        """
+        ranked = await place_ranker.rank(sections, preferences, limits=SECTION_LIMITS, deadline=deadline)
+        return {section: ranked.get(section, []) for section in sections}
 
-    async def get_route_attractions(self, route_coordinates, preferences, max_distance=5000, max_attractions_per_type=3, max_total_attractions=15):
+    async def get_route_attractions(self, route_coordinates, preferences, max_distance=5000, max_attractions_per_type=3, max_total_attractions=15, sample_spacing=None, stats=None, on_attraction=None):
         """
         Find attractions along the route, not just at waypoints
         :param route_coordinates: List of [lat, lng] coordinates along the route
@@ -352,109 +330,122 @@ class RecommendationAgent:
         :param max_distance: Maximum distance in meters from route to search for attractions
         :param max_attractions_per_type: Maximum number of attractions per type to return
         :param max_total_attractions: Maximum total number of attractions to return
+        :param sample_spacing: Distance in meters between search centers along the route (defaults to max_distance)
+        :param stats: Optional dict that receives the number of search centers, upstream API calls, failed and skipped searches, and duplicates dropped
+        :param on_attraction: Optional callback(attraction) called for each candidate kept as it is found, before final ranking
         :return: Dictionary of attractions found along the route
         """
         logger.info(f"Searching for attractions along route with {len(route_coordinates)} points")
-        
-        # Skip the first 10% of coordinates to avoid searching near origin
-        start_index = int(len(route_coordinates) * 0.1)
-        route_coordinates = route_coordinates[start_index:]
 
-        # Sample points along the route (every 10th point to avoid too many API calls)
-        sampled_points = route_coordinates[::10]
+        # Place search centers about one search radius apart by distance traveled,
+        # skipping the first 10% of the route to avoid searching near origin
+        sampled_points = resample_by_distance(route_coordinates, sample_spacing or max_distance, skip_fraction=0.1)
         logger.info(f"Sampling {len(sampled_points)} points along route")
+
+        # Searches answered from the places cache don't reach the upstream API
+        api_calls = 0
+        async def count_upstream_call(**params):
+            nonlocal api_calls
+            api_calls += 1
+            return await self._places_nearby(**params)
         
-        # Track attractions by type of limit per type
-        attractions_by_type = {}
-        
-        for point in sampled_points:
+        # Keep the best attractions of each type as they are found, dropping duplicates on insert
+        aggregator = TopKAggregator(
+            max_attractions_per_type,
+            max_total_attractions,
+            key=lambda x: (x['rating'], -x['distance_from_route'])
+        )
+        failed_searches = 0
+        skipped_searches = 0
+
+        # Resolve which attraction types to search for once, not per sample point
+        attraction_types = []
+        for preference in preferences:
+            if preference not in VALID_PLACE_TYPES:
+                logger.warning(f"Invalid place type: {preference}")
+                continue
+
+            # Skip restaurant since it's already handled separately
+            if preference == 'restaurant':
+                logger.info(f"Skipping restaurant preference since restaurants are handled separately")
+                continue
+
+            # Skip hotels since they're already handled separately
+            if preference == 'hotels':
+                logger.info(f"Skipping hotels preference since hotels are handled separately")
+                continue
+
+            attraction_types.append(preference)
+
+        for point_index, point in enumerate(sampled_points):
             lat, lng = point
-            
-            # Search for each preferred attraction type
-            for preference in preferences:
-                if preference not in VALID_PLACE_TYPES:
-                    logger.warning(f"Invalid place type: {preference}")
-                    continue
-                
-                # Skip restaurant since it's already handled separately
-                if preference == 'restaurant':
-                    logger.info(f"Skipping restaurant preference since restaurants are handled separately")
-                    continue
-                
-                # Skip hotels since they're already handled separately
-                if preference == 'hotels':
-                    logger.info(f"Skipping hotels preference since hotels are handled separately")
-                    continue
-                    
-                # Skip if we already have enough of this type
-                if preference in attractions_by_type and len(attractions_by_type[preference]) >= max_attractions_per_type:
-                    continue
 
+            # Types that already have enough attractions are not searched again
+            open_types = [preference for preference in attraction_types if not aggregator.is_full(preference)]
+
+            # Stop once no attraction found later could make the final list
+            if not open_types or not aggregator.can_change(BEST_POSSIBLE_ATTRACTION_KEY):
+                skipped_searches += len(open_types) * (len(sampled_points) - point_index)
+                logger.info(f"Route attractions settled after {point_index} of {len(sampled_points)} search centers")
+                break
+
+            for preference in open_types:
                 try:
                     logger.info(f"Searching for {preference} near coordinates ({lat}, {lng})")
-                    places = self.gmaps.places_nearby(
-                        location=(lat, lng),
-                        type=VALID_PLACE_TYPES[preference],
-                        radius=max_distance
+                    places = await places_cache.search(
+                        count_upstream_call,
+                        (lat, lng),
+                        VALID_PLACE_TYPES[preference],
+                        max_distance
                     )
-                    
+
                     if places and 'results' in places:
-                        # Initialize list for this type if not exists
-                        if preference not in attractions_by_type:
-                            attractions_by_type[preference] = []
-
-                        for place in places['results']:
-                            # Stop if we have enough of this type
-                            if len(attractions_by_type[preference]) >= max_attractions_per_type:
-                                   break
-
-                            # Calculate distance from route point
-                            place_location = place['geometry']['location']
-                            distance = self._calculate_distance(
-                                (lat, lng),
-                                (place_location['lat'], place_location['lng'])
-                            )
-                            
+                        # Distances from the search center to every candidate at once
+                        candidates = places['results']
+                        distances = haversine_to_points(
+                            (lat, lng),
+                            [(p['geometry']['location']['lat'], p['geometry']['location']['lng']) for p in candidates]
+                        ) if candidates else []
+
+                        for place, distance in zip(candidates, distances):
                             # Only include if within max_distance
                             if distance <= max_distance:
                                 attraction = {
                                     'name': place['name'],
                                     'type': preference,
-                                    'location': place_location,
+                                    'location': place['geometry']['location'],
                                     'rating': place.get('rating', 0),
-                                    'distance_from_route': distance,
+                                    'distance_from_route': float(distance),
                                     'place_id': place.get('place_id')
                                 }
-                                # route_attractions.append(attraction)
-                                attractions_by_type[preference].append(attraction)
-                                
+                                if aggregator.offer(preference, attraction) and on_attraction:
+                                    on_attraction(attraction)
+
                 except Exception as e:
+                    failed_searches += 1
                     logger.error(f"Error searching for {preference} near ({lat}, {lng}): {str(e)}")
                     continue
-        
-        # Combine all attractions and sort by rating and distance
-        route_attractions = []
-        for preference, attractions in attractions_by_type.items():
-            # Sort attractions for this type by rating and distance
-            attractions.sort(key=lambda x: (x['rating'], -x['distance_from_route']), reverse=True)
-            route_attractions.extend(attractions)
-        
-        # Sort attractions by rating and distance
-        route_attractions.sort(key=lambda x: (x['rating'], -x['distance_from_route']), reverse=True)
-
-        # Remove duplicates (same place_id)
-        seen_place_ids = set()
-        unique_attractions = []
-        for attraction in route_attractions:
-            if attraction['place_id'] not in seen_place_ids:
-                seen_place_ids.add(attraction['place_id'])
-                unique_attractions.append(attraction)
-        
-                # Stop if we have reached the total limit
-                if len(unique_attractions) >= max_total_attractions:
-                    break;
-        
-        logger.info(f"Found {len(unique_attractions)} unique attractions along route")
+
+        # Score every kept attraction by its distance to the route itself, not just the search center
+        kept = aggregator.places()
+        if kept and len(route_coordinates) > 0:
+            route_distances = distances_to_polyline(
+                [(a['location']['lat'], a['location']['lng']) for a in kept],
+                route_coordinates
+            )
+            for attraction, distance in zip(kept, route_distances):
+                attraction['distance_from_route'] = min(attraction['distance_from_route'], float(distance))
+
+        # Best attractions overall by rating and distance
+        unique_attractions = aggregator.results()
+
+        logger.info(f"Found {len(unique_attractions)} unique attractions along route using {api_calls} API calls")
+        if stats is not None:
+            stats["sample_points"] = len(sampled_points)
+            stats["api_calls"] = api_calls
+            stats["failed_searches"] = failed_searches
+            stats["skipped_searches"] = skipped_searches
+            stats["duplicates"] = aggregator.duplicates
         return unique_attractions
 
     def _calculate_distance(self, point1, point2):
@@ -464,19 +455,4 @@ class RecommendationAgent:
         :param point2: Tuple of (lat, lng)
         :return: Distance in meters
         """
-        from math import radians, sin, cos, sqrt, atan2
-        
-        lat1, lng1 = point1
-        lat2, lng2 = point2
-        
-        R = 6371000  # Earth's radius in meters
-        
-        lat1, lng1, lat2, lng2 = map(radians, [lat1, lng1, lat2, lng2])
-        dlat = lat2 - lat1
-        dlng = lng2 - lng1
-        
-        a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlng/2)**2
-        c = 2 * atan2(sqrt(a), sqrt(1-a))
-        distance = R * c
-        
-        return distance
\ No newline at end of file
+        return haversine_distance(point1, point2)
@@ -1,59 +1,141 @@
 import httpx
 import os
+import asyncio
+from datetime import datetime, timezone
 from urllib.parse import quote
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 import logging
-import googlemaps
-import asyncio
+from utils import cache_manager, geocoding_service, upstream_client, RequestCoalescer
+from utils.route_timing import stop_times, sample_route_etas
+from utils.trip_cache import has_utc_offset, parse_departure_time
 
 logger = logging.getLogger(__name__)
 
+# Stops within the same grid cell (in degrees; 0.1 is about 11 km) share one current-conditions lookup
+DEFAULT_WEATHER_GRID_DEGREES = 0.1
+
+# Maximum number of stops looked up at once
+DEFAULT_MAX_CONCURRENT_REQUESTS = 8
+
+# Days of hourly forecast fetched per grid cell (WeatherAPI's free plan allows 3)
+DEFAULT_FORECAST_DAYS = 3
+
+# Distance in meters between forecast points along the route, between stops
+DEFAULT_FORECAST_SAMPLE_SPACING = 100000
+
+# Forecast hours this far (in seconds) from an arrival time are still used for it
+FORECAST_HOUR_TOLERANCE = 3600
+
+def _time_zone(tz_id):
+    """ The zone named by a WeatherAPI tz_id (e.g. America/Chicago), or UTC if unknown """
+    try:
+        return ZoneInfo(tz_id) if tz_id else timezone.utc
+    except (ZoneInfoNotFoundError, ValueError):
+        logger.warning(f"Unknown time zone: {tz_id}; using UTC")
+        return timezone.utc
+
 class WeatherAgent:
-    def __init__(self):
-        """ Initialize WeatherAPI """
+    def __init__(self, grid_degrees=None, max_concurrent_requests=DEFAULT_MAX_CONCURRENT_REQUESTS):
+        """ Initialize WeatherAPI
+        :param grid_degrees: Size of the weather cache grid cells in degrees (defaults to WEATHER_GRID_DEGREES or 0.1)
+        :param max_concurrent_requests: Maximum number of stops looked up at once
+        """
 
         self.api_key = os.getenv("WEATHER_API_KEY")
         self.google_api_key = os.getenv("GOOGLE_MAPS_API_KEY")
         if not self.api_key or not self.google_api_key:
             raise ValueError("API keys not found! Check your .env file.")
-        self.base_url = "http://api.weatherapi.com/v1/current.json"
-        
-        # Create an async client with explicit proxy settings
-        self.http_client = httpx.AsyncClient(
-            verify=False,
-            proxies=None,
-            timeout=30.0
-        )
-        
-        # Initialize Google Maps client
-        self.gmaps = googlemaps.Client(key=self.google_api_key)
+        self.grid_degrees = grid_degrees or float(os.getenv("WEATHER_GRID_DEGREES", DEFAULT_WEATHER_GRID_DEGREES))
+        self.max_concurrent_requests = max_concurrent_requests
+        self.forecast_days = int(os.getenv("WEATHER_FORECAST_DAYS", DEFAULT_FORECAST_DAYS))
+        # Stops in the same cell looked up at the same moment share one call
+        self._cell_coalescer = RequestCoalescer("weather cell")
+        self._forecast_coalescer = RequestCoalescer("forecast cell")
         
         logger.info("WeatherAgent initialized with API keys")
 
     async def _get_lat_lng(self, address):
-        """ Get latitude and longitude for an address using Google Maps API """
+        """ Get latitude and longitude for an address using the shared geocoding service """
+        # Add state/country to the address if not present
+        if "katy" in address.lower() and "texas" not in address.lower():
+            address = f"{address}, Texas, USA"
+
+        geocode = await geocoding_service.geocode(address)
+        if geocode:
+            logger.info(f"Geocoding result for {address}:")
+            logger.info(f"- Formatted address: {geocode['formatted_address']}")
+            logger.info(f"- Location: {geocode['lat']},{geocode['lng']}")
+            return geocode['lat'], geocode['lng']
+        return None
+
+    def _grid_cell(self, lat, lng):
+        """ Snap coordinates to the center of their weather grid cell, as 'lat,lng' (a cache key, not a query) """
+        return f"{round(lat / self.grid_degrees) * self.grid_degrees:.4f},{round(lng / self.grid_degrees) * self.grid_degrees:.4f}"
+
+    async def _stop_weather(self, waypoint):
+        """ Geocode one stop and get the current conditions, shared with stops in its grid cell """
         try:
-            # Add state/country to the address if not present
-            if "katy" in address.lower() and "texas" not in address.lower():
-                address = f"{address}, Texas, USA"
-
-            logger.info(f"Geocoding address: {address}")
-            geocode_result = await asyncio.to_thread(self.gmaps.geocode, address)
-            
-            if geocode_result:
-                location = geocode_result[0]['geometry']['location']
-                formatted_address = geocode_result[0]['formatted_address']
-                logger.info(f"Geocoding result for {address}:")
-                logger.info(f"- Formatted address: {formatted_address}")
-                logger.info(f"- Location: {location}")
-                return f"{location['lat']},{location['lng']}"
-            return None
+            # First get the coordinates using Google Maps
+            coords = await self._get_lat_lng(waypoint)
+            if not coords:
+                logger.error(f"Could not get coordinates for {waypoint}")
+                return {"error": "Could not get coordinates"}
+
+            cell = self._grid_cell(*coords)
+            weather = await cache_manager.get_cached_async('weather', cell)
+            if weather:
+                logger.info(f"Using cached weather for {waypoint} (cell {cell})")
+                return weather
+
+            logger.info(f"Fetching weather for {waypoint} using grid cell: {cell}")
+            weather = await self._cell_coalescer.run(cell, lambda: self._fetch_current(cell, coords))
+            if "error" not in weather:
+                logger.info(f"Successfully fetched weather for {waypoint}: {weather['temperature']} and {weather['condition']}")
+                logger.debug(f"Full weather data for {waypoint}: {weather}")
+            return weather
+        except httpx.RequestError as e:
+            logger.error(f"Error fetching weather data for {waypoint}: {str(e)}")
+            return {"error": str(e)}
         except Exception as e:
-            logger.error(f"Error getting lat/lng for {address}: {str(e)}")
-            return None
+            logger.error(f"Unexpected error fetching weather data for {waypoint}: {str(e)}")
+            return {"error": str(e)}
+
+    async def _fetch_current(self, cell, coords):
+        """ Get current conditions at coords from WeatherAPI, caching successful results for their grid cell """
+        data = await upstream_client.current_weather(f"{coords[0]},{coords[1]}")
+        if "error" in data:
+            logger.error(f"Weather API error for cell {cell}: {data['error']['message']}")
+            return {"error": data["error"]["message"]}
 
-    async def get_weather(self, route_info):
+        weather = self._format_weather(
+            data["location"], data["current"], {"lat": data["location"]["lat"], "lng": data["location"]["lon"]}
+        )
+        cache_manager.set_cached('weather', cell, weather)
+        return weather
+
+    @staticmethod
+    def _format_weather(location, conditions, coords):
+        """ Build a stop's weather entry from WeatherAPI location and current/hourly conditions """
+        return {
+            "location": location["name"],
+            "region": location["region"],
+            "country": location["country"],
+            "temperature": f"{conditions['temp_f']}°F",
+            "temperature_c": f"{conditions['temp_c']}°C",
+            "condition": conditions["condition"]["text"],
+            "humidity": f"{conditions['humidity']}%",
+            "wind_speed_mph": f"{conditions['wind_mph']} mph",
+            "wind_speed_kph": f"{conditions['wind_kph']} kph",
+            "coords": coords
+        }
+
+    async def get_weather(self, route_info, on_stop=None):
         """ Fetch weather data for a given location using WeatherAPI 
+
+        Stops are looked up concurrently; stops whose coordinates share a grid cell
+        share one cached lookup for as long as the 'weather' cache TTL.
         :param location: City name (e.g. "Katy") or coordinates ("lat,lon")
+        :param on_stop: Optional callback(stop, weather) called as each stop completes
         :return Weather details as JSON
         """
         weather_data = {}
@@ -90,51 +172,137 @@ class WeatherAgent:
             logger.error("No stops provided for weather lookup")
             return {"error": "No stops provided for weather lookup"}
 
-        for waypoint in stops:
-            try:
-                # First get the coordinates using Google Maps
-                coords = await self._get_lat_lng(waypoint)
-                if not coords:
-                    logger.error(f"Could not get coordinates for {waypoint}")
-                    weather_data[waypoint] = {"error": "Could not get coordinates"}
-                    continue
-
-                # Use the coordinates to get weather data
-                url = f"{self.base_url}?key={self.api_key}&q={coords}&aqi=no"
-                
-                logger.info(f"Fetching weather for {waypoint} using coordinates: {coords}")
-                response = await self.http_client.get(url)
-                response.raise_for_status()
-                data = response.json()
-
-                if "error" in data:
-                    logger.error(f"Weather API error for {waypoint}: {data['error']['message']}")
-                    weather_data[waypoint] = {"error": data["error"]["message"]}
-                else:
-                    weather_data[waypoint] = {
-                        "location": data["location"]["name"],
-                        "region": data["location"]["region"],
-                        "country": data["location"]["country"],
-                        "temperature": f"{data['current']['temp_f']}°F",
-                        "temperature_c": f"{data['current']['temp_c']}°C",
-                        "condition": data["current"]["condition"]["text"],
-                        "humidity": f"{data['current']['humidity']}%",
-                        "wind_speed_mph": f"{data['current']['wind_mph']} mph",
-                        "wind_speed_kph": f"{data['current']['wind_kph']} kph",
-                        "coords": {
-                            "lat": data["location"]["lat"], 
-                            "lng": data["location"]["lon"]
-                        }
-                    }
-                    logger.info(f"Successfully fetched weather for {waypoint}: {weather_data[waypoint]['temperature']} and {weather_data[waypoint]['condition']}")
-                    logger.debug(f"Full weather data for {waypoint}: {weather_data[waypoint]}")
-            except httpx.RequestError as e:
-                logger.error(f"Error fetching weather data for {waypoint}: {str(e)}")
-                weather_data[waypoint] = {"error": str(e)}
-            except Exception as e:
-                logger.error(f"Unexpected error fetching weather data for {waypoint}: {str(e)}")
-                weather_data[waypoint] = {"error": str(e)}
+        semaphore = asyncio.Semaphore(self.max_concurrent_requests)
+
+        async def lookup(waypoint):
+            async with semaphore:
+                weather = await self._stop_weather(waypoint)
+            weather_data[waypoint] = weather
+            if on_stop:
+                on_stop(waypoint, weather)
+
+        await asyncio.gather(*(lookup(waypoint) for waypoint in dict.fromkeys(stops)))
+
+        # Report stops in route order, not completion order
+        weather_data = {waypoint: weather_data[waypoint] for waypoint in dict.fromkeys(stops)}
 
         logger.info(f"Completed weather lookup for {len(weather_data)} locations")
         logger.info(f"Locations with weather data: {list(weather_data.keys())}")
-        return weather_data
\ No newline at end of file
+        return weather_data
+
+    async def get_route_forecast(self, stops, route, departure_time="now", stop_durations=None, sample_spacing=DEFAULT_FORECAST_SAMPLE_SPACING, on_stop=None):
+        """ Forecast weather for when the trip reaches each stop and points along the route
+
+        Arrival times come from the route's leg durations, the departure time and the time
+        spent at each stop. One multi-day hourly forecast is fetched per grid cell and the
+        hour nearest each arrival is picked from it, so stops and route points in the same
+        cell share a single call.
+        :param stops: Stop names in route order: origin, waypoints, destination
+        :param route: Route from TravelAgent.get_route, with legs and coordinates
+        :param departure_time: 'now', an ISO-8601 time with a UTC offset, or YYYY-MM-DD HH:MM
+            in the origin's local time (its zone comes from the origin's forecast)
+        :param stop_durations: Minutes spent at each waypoint
+        :param sample_spacing: Distance in meters between forecast points along the route
+        :param on_stop: Optional callback(stop, weather) called as each stop or route point completes
+        :return Weather details keyed by stop name or route point label, each with its arrival time
+        """
+        legs = route.get("legs") or []
+        if not legs or any("duration_seconds" not in leg or "start_location" not in leg for leg in legs):
+            logger.warning("Route legs have no durations; falling back to current weather")
+            return await self.get_weather({"waypoints": list(stops)}, on_stop=on_stop)
+
+        stop_locations = [legs[0]["start_location"]] + [leg["end_location"] for leg in legs]
+
+        # A local departure time is read in the origin's zone, not the server's
+        origin_zone = timezone.utc
+        if not has_utc_offset(departure_time):
+            origin = stop_locations[0]
+            origin_forecast = await self._cell_forecast(origin["lat"], origin["lng"])
+            origin_zone = _time_zone(origin_forecast.get("location", {}).get("tz_id"))
+        times = stop_times(legs, parse_departure_time(departure_time, origin_zone), stop_durations)
+        if len(stops) != len(times):
+            stops = [legs[0]["start_address"]] + [leg["end_address"] for leg in legs]
+
+        points = []
+        for stop, location, (arrival, _) in zip(stops, stop_locations, times):
+            points.append((stop, location["lat"], location["lng"], arrival))
+        for sample in sample_route_etas(route.get("coordinates", []), legs, times, sample_spacing):
+            label = f"En route (mile {sample['distance_meters'] * 0.000621371:.0f})"
+            points.append((label, sample["lat"], sample["lng"], sample["eta"]))
+        # Route order is arrival order
+        points.sort(key=lambda point: point[3])
+
+        weather_data = {}
+
+        async def forecast_point(label, lat, lng, eta):
+            weather = await self._point_forecast(lat, lng, eta, origin_zone)
+            weather_data[label] = weather
+            if on_stop:
+                on_stop(label, weather)
+
+        await asyncio.gather(*(forecast_point(*point) for point in points))
+
+        cells = {self._grid_cell(lat, lng) for _, lat, lng, _ in points}
+        logger.info(f"Forecast weather for {len(points)} stops and route points from {len(cells)} grid cells")
+        # Report in route order, not completion order
+        return {label: weather_data[label] for label, *_ in points}
+
+    async def _point_forecast(self, lat, lng, eta, default_zone=timezone.utc):
+        """ Weather at one point for the hour nearest its arrival time, which is given in the point's local time """
+        arrival_time = datetime.fromtimestamp(eta, default_zone).strftime("%Y-%m-%d %H:%M")
+        try:
+            forecast = await self._cell_forecast(lat, lng)
+            if "error" in forecast:
+                return {**forecast, "arrival_time": arrival_time}
+            tz_id = forecast["location"].get("tz_id")
+            if tz_id:
+                arrival_time = datetime.fromtimestamp(eta, _time_zone(tz_id)).strftime("%Y-%m-%d %H:%M")
+
+            hour = min(forecast["hours"], key=lambda h: abs(h["time_epoch"] - eta), default=None)
+            if hour is None or abs(hour["time_epoch"] - eta) > FORECAST_HOUR_TOLERANCE:
+                return {"error": "Arrival time is outside the forecast range", "arrival_time": arrival_time}
+
+            weather = self._format_weather(forecast["location"], hour, {"lat": lat, "lng": lng})
+            weather["arrival_time"] = arrival_time
+            weather["forecast_time"] = hour["time"]
+            weather["chance_of_rain"] = f"{hour.get('chance_of_rain', 0)}%"
+            return weather
+        except httpx.RequestError as e:
+            logger.error(f"Error fetching forecast at ({lat}, {lng}): {str(e)}")
+            return {"error": str(e), "arrival_time": arrival_time}
+        except Exception as e:
+            logger.error(f"Unexpected error fetching forecast at ({lat}, {lng}): {str(e)}")
+            return {"error": str(e), "arrival_time": arrival_time}
+
+    async def _cell_forecast(self, lat, lng):
+        """ Get the hourly forecast for a point's grid cell, from cache, an in-flight call, or WeatherAPI
+
+        The cache and in-flight calls are keyed by grid cell, but a fetch queries the point
+        itself, so the forecast is for a real stop or route point rather than the cell center.
+        """
+        cell = self._grid_cell(lat, lng)
+        forecast = await cache_manager.get_cached_async('weather_forecast', cell)
+        if forecast:
+            return forecast
+        # Upstream concurrency is bounded by the rate limiter's forecast_weather limit
+        return await self._forecast_coalescer.run(cell, lambda: self._fetch_forecast(cell, lat, lng))
+
+    async def _fetch_forecast(self, cell, lat, lng):
+        """ Fetch the forecast at a point for its cell, keeping only the fields used per hour """
+        logger.info(f"Fetching {self.forecast_days}-day forecast at ({lat}, {lng}) for grid cell: {cell}")
+        data = await upstream_client.forecast_weather(f"{lat},{lng}", self.forecast_days)
+        if "error" in data:
+            logger.error(f"Weather API error for cell {cell}: {data['error']['message']}")
+            return {"error": data["error"]["message"]}
+
+        fields = ("time_epoch", "time", "temp_f", "temp_c", "condition", "humidity", "wind_mph", "wind_kph", "chance_of_rain")
+        forecast = {
+            "location": {key: data["location"].get(key) for key in ("name", "region", "country", "tz_id")},
+            "hours": [
+                {field: hour.get(field) for field in fields}
+                for day in data["forecast"]["forecastday"]
+                for hour in day["hour"]
+            ]
+        }
+        cache_manager.set_cached('weather_forecast', cell, forecast)
+        return forecast
@@ -0,0 +1,41 @@
+import random
+import time
+from utils.geo import haversine_distance, cumulative_route_length, distances_to_polyline, haversine_to_points
+
+# Micro-benchmark: scalar haversine loops vs the vectorized utils.geo functions
+# on a 10k-point route (roughly Katy, TX to Orlando, FL). Run from backend/.
+random.seed(42)
+ROUTE_POINTS = 10000
+CANDIDATES = 60
+
+route = [[29.78 - 1.2 * i / ROUTE_POINTS + random.uniform(-0.01, 0.01), -95.82 + 14.4 * i / ROUTE_POINTS] for i in range(ROUTE_POINTS)]
+candidates = [[lat + random.uniform(-0.05, 0.05), lng + random.uniform(-0.05, 0.05)] for lat, lng in random.sample(route, CANDIDATES)]
+
+def timed(label, func, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    print(f"{label:<45} {best * 1000:10.2f} ms")
+    return best, result
+
+def scalar_route_length():
+    total = 0.0
+    for previous, current in zip(route, route[1:]):
+        total += haversine_distance(previous, current)
+    return total
+
+def scalar_to_route():
+    return [min(haversine_distance(c, p) for p in route) for c in candidates]
+
+print(f"\n=== {ROUTE_POINTS} route points, {CANDIDATES} candidates ===")
+scalar, total = timed("Route length (scalar loop)", scalar_route_length)
+vector, lengths = timed("Route length (cumulative_route_length)", lambda: cumulative_route_length(route))
+print(f"  speedup: {scalar / vector:.1f}x  (difference {abs(total - lengths[-1]):.3f} m)")
+
+scalar, nearest = timed("Candidates to route vertices (scalar loop)", scalar_to_route, repeat=1)
+vector, _ = timed("Candidates to route vertices (haversine_to_points)", lambda: [haversine_to_points(c, route).min() for c in candidates])
+print(f"  speedup: {scalar / vector:.1f}x")
+vector, to_segments = timed("Candidates to route segments (distances_to_polyline)", lambda: distances_to_polyline(candidates, route))
+print(f"  speedup: {scalar / vector:.1f}x  (max amount segment distance exceeds vertex distance: {max(s - n for s, n in zip(to_segments, nearest)):.3f} m)")
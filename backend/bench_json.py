@@ -0,0 +1,42 @@
+import json
+import random
+import time
+from fastapi.encoders import jsonable_encoder
+from utils import fast_json
+
+# Micro-benchmark: FastAPI's default JSON path (jsonable_encoder + json.dumps, plus the
+# extra json.dumps plan_trip used to do for size logging) vs a single orjson encode,
+# on a plan_trip-shaped response with a long route. Run from backend/.
+random.seed(42)
+ROUTE_POINTS = 40000
+
+route = {
+    "polyline": "x" * 20000,
+    "legs": [{"start_address": "Katy, TX", "end_address": "Orlando, FL", "distance": "1,540 km", "duration": "14 hours 10 mins"}],
+    "detailed_coordinates": [[29.78 - 1.2 * i / ROUTE_POINTS, -95.82 + 14.4 * i / ROUTE_POINTS] for i in range(ROUTE_POINTS)],
+    "coordinates": [[29.78 - 1.2 * i / 600, -95.82 + 14.4 * i / 600] for i in range(600)]
+}
+attractions = [
+    {"name": f"Place {i}", "rating": round(random.uniform(3, 5), 1), "location": {"lat": random.uniform(28, 30), "lng": random.uniform(-96, -81)},
+     "types": ["restaurant", "food"], "distance_from_route": random.uniform(0, 5000)}
+    for i in range(200)
+]
+response_data = {"route": route, "weather": {}, "recommendations": {}, "route_attractions": attractions, "cached_sections": []}
+
+def timed(label, func, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    print(f"{label:<50} {best * 1000:10.2f} ms")
+    return best, result
+
+def default_path():
+    json.dumps(response_data, default=str)  # size logging in plan_trip
+    return json.dumps(jsonable_encoder(response_data), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+print(f"\n=== plan_trip response with {ROUTE_POINTS} detailed route points ===")
+before, expected = timed("jsonable_encoder + json.dumps (x2)", default_path)
+after, body = timed("fast_json.dumps (once)", lambda: fast_json.dumps(response_data))
+print(f"  speedup: {before / after:.1f}x  ({len(body)} bytes, same content: {json.loads(body) == json.loads(expected)})")
@@ -0,0 +1,84 @@
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+import httpx
+
+# Load test: sends plan_trip requests to a running backend and reports latency
+# percentiles. Offline, run it against the fake upstream from backend/:
+#
+#   python fake_upstream.py --latency-ms 80 --jitter-ms 40 &
+#   FAKE_UPSTREAM_URL=http://localhost:8090 uvicorn main:app --port 8000 &
+#   python bench_plan_trip.py --requests 200 --concurrency 20
+#
+# Trips are drawn from a fixed seed, so runs are repeatable; --distinct sets how
+# many different trips there are (fewer means more trip cache hits).
+CITIES = [
+    "Katy, TX", "New Orleans, LA", "Pensacola, FL", "Lake Buena Vista, FL", "Austin, TX", "Dallas, TX",
+    "Memphis, TN", "Nashville, TN", "Atlanta, GA", "Birmingham, AL", "Jackson, MS", "Mobile, AL",
+    "Savannah, GA", "Charleston, SC", "Little Rock, AR", "Tulsa, OK", "San Antonio, TX", "Shreveport, LA"
+]
+PREFERENCES = ["museum", "tourist_attraction", "park", "zoo", "aquarium", "art_gallery"]
+
+def make_trips(count, seed):
+    rng = random.Random(seed)
+    trips = []
+    for _ in range(count):
+        origin, *waypoints, destination = rng.sample(CITIES, rng.randint(2, 4))
+        trips.append({
+            "origin": origin,
+            "destination": destination,
+            "waypoints": waypoints,
+            "stop_durations": [rng.choice([15, 30, 60]) for _ in waypoints],
+            "attraction_preferences": rng.sample(PREFERENCES, 3),
+            "weather_mode": rng.choice(["current", "forecast"])
+        })
+    return trips
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+async def main(args):
+    trips = make_trips(args.distinct, args.seed)
+    latencies, failures = [], 0
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async with httpx.AsyncClient(base_url=args.url, timeout=300.0, headers={"Accept-Encoding": "gzip"}) as client:
+        async def plan(i):
+            nonlocal failures
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    response = await client.post("/api/plan_trip", json=trips[i % len(trips)])
+                    if response.status_code != 200 or "error" in response.json():
+                        failures += 1
+                except httpx.HTTPError:
+                    failures += 1
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(plan(i) for i in range(args.requests)))
+        elapsed = time.perf_counter() - start
+        metrics = (await client.get("/api/metrics")).json()
+
+    print(f"\n=== {args.requests} plan_trip requests, {args.concurrency} at a time, {len(trips)} distinct trips ===")
+    print(f"{'throughput':<12} {args.requests / elapsed:10.2f} req/s")
+    print(f"{'failures':<12} {failures:10d}")
+    for label, value in (("mean", statistics.mean(latencies)), ("p50", percentile(latencies, 0.5)),
+                         ("p95", percentile(latencies, 0.95)), ("p99", percentile(latencies, 0.99)), ("max", max(latencies))):
+        print(f"{label:<12} {value * 1000:10.1f} ms")
+    print(f"{'upstream':<12} {metrics['upstream']['requests']:10d} calls")
+    for family, stats in sorted(metrics.get("rate_limits", {}).items()):
+        print(f"  {family:<18} {stats['calls']:6d} calls, {stats['retries']:4d} retries, {stats['failures']:3d} failures")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test plan_trip")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--distinct", type=int, default=50, help="Number of different trips")
+    parser.add_argument("--seed", type=int, default=1)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,66 @@
+import os
+import re
+import subprocess
+import sys
+
+# Startup benchmark: imports the app in a fresh interpreter with -X importtime and
+# reports the cumulative import time of each backend module and the slowest
+# third-party packages. Run from backend/; pass a budget in milliseconds, e.g.
+# `python bench_startup.py 1500`, to exit non-zero when the app import exceeds it.
+RUNS = 3
+TOP_PACKAGES = 10
+BACKEND_PREFIXES = ("main", "orchestrator", "models", "agents", "utils")
+
+# Importing main checks these exist; dummy values are enough since nothing is called
+env = dict(os.environ)
+for var in ("GOOGLE_MAPS_API_KEY", "OPENAI_API_KEY", "AZURE_OPENAI_ENDPOINT", "WEATHER_API_KEY"):
+    env.setdefault(var, "AIza-bench")
+
+line_pattern = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+def profile_import():
+    """ Import main once in a new interpreter and return {module: cumulative microseconds} """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        sys.exit(f"Importing main failed:\n{result.stderr[-2000:]}")
+    times = {}
+    top_level = {}
+    for line in result.stderr.splitlines():
+        match = line_pattern.match(line)
+        if not match:
+            continue
+        cumulative, indent, module = int(match.group(2)), len(match.group(3)), match.group(4)
+        times[module] = cumulative
+        package = module.split(".")[0]
+        if package not in BACKEND_PREFIXES:
+            top_level[package] = max(top_level.get(package, 0), cumulative)
+    return times, top_level
+
+# Keep the fastest run per module to reduce noise from the OS page cache
+best, packages = {}, {}
+for _ in range(RUNS):
+    times, top_level = profile_import()
+    for module, cumulative in times.items():
+        best[module] = min(best.get(module, cumulative), cumulative)
+    for package, cumulative in top_level.items():
+        packages[package] = min(packages.get(package, cumulative), cumulative)
+
+total_ms = best.get("main", 0) / 1000
+print(f"\n=== Import time of main (best of {RUNS}) ===")
+print(f"{'main':<45} {total_ms:10.1f} ms")
+for module in sorted(best):
+    if module != "main" and module.split(".")[0] in BACKEND_PREFIXES:
+        print(f"  {module:<43} {best[module] / 1000:10.1f} ms")
+
+print(f"\n=== Slowest third-party packages ===")
+for package, cumulative in sorted(packages.items(), key=lambda item: -item[1])[:TOP_PACKAGES]:
+    print(f"  {package:<43} {cumulative / 1000:10.1f} ms")
+
+if len(sys.argv) > 1:
+    budget_ms = float(sys.argv[1])
+    if total_ms > budget_ms:
+        sys.exit(f"\nImport time {total_ms:.1f} ms is over the {budget_ms:.0f} ms budget")
+    print(f"\nImport time {total_ms:.1f} ms is within the {budget_ms:.0f} ms budget")
@@ -0,0 +1,381 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import random
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import httpx
+import polyline
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from utils.upstream_client import FAKE_UPSTREAM_PATHS, GOOGLE_MAPS_BASE_URL, LLM_BASE_URL, WEATHER_API_BASE_URL
+
+# Local stand-in for Google Maps, WeatherAPI and the LLM API, for load tests and
+# profiling without keys or network. Run from backend/:
+#
+#   python fake_upstream.py --port 8090 --latency-ms 80 --jitter-ms 40 --error-rate 0.01
+#   FAKE_UPSTREAM_URL=http://localhost:8090 uvicorn main:app
+#
+# replay (default) serves recorded fixtures and synthesizes a deterministic response
+# for anything not recorded (--on-miss error returns 404 instead). record forwards
+# each request to the real API, using the keys the backend sends, and saves the
+# response as a fixture. Faults (latency, 5xx errors, throttling) can be set for
+# every endpoint on the command line or per endpoint with --profile, a JSON file like
+#   {"default": {"latency_ms": 50}, "places_nearby": {"throttle_rate": 0.05}}
+# Counters are served at /_stats.
+
+logger = logging.getLogger("fake_upstream")
+
+# Endpoint name of each served path, matching the rate limiter's API families
+ENDPOINTS = {
+    f"{FAKE_UPSTREAM_PATHS['google']}/directions/json": ("google", "directions"),
+    f"{FAKE_UPSTREAM_PATHS['google']}/geocode/json": ("google", "geocode"),
+    f"{FAKE_UPSTREAM_PATHS['google']}/place/nearbysearch/json": ("google", "places_nearby"),
+    f"{FAKE_UPSTREAM_PATHS['google']}/place/details/json": ("google", "place_details"),
+    f"{FAKE_UPSTREAM_PATHS['weather']}/current.json": ("weather", "current_weather"),
+    f"{FAKE_UPSTREAM_PATHS['weather']}/forecast.json": ("weather", "forecast_weather"),
+    f"{FAKE_UPSTREAM_PATHS['llm']}/chat/completions": ("llm", "chat_completions"),
+}
+REAL_BASE_URLS = {"google": GOOGLE_MAPS_BASE_URL, "weather": WEATHER_API_BASE_URL, "llm": LLM_BASE_URL}
+
+# Request parameters that don't change the response, left out of fixture keys
+_IGNORED_PARAMS = ("key", "departure_time")
+
+# Synthetic trips stay inside the continental US
+_LAT_RANGE = (29.0, 45.0)
+_LNG_RANGE = (-120.0, -75.0)
+_ROAD_FACTOR = 1.25  # driving distance over straight-line distance
+_DRIVING_SPEED = 27.0  # meters per second, about 60 mph
+_ROUTE_POINT_SPACING = 2000  # meters between synthetic route vertices
+_PLACES_PER_SEARCH = 12
+
+_NAME_WORDS = ["Blue", "Cedar", "Harbor", "Lone Star", "Magnolia", "Pioneer", "Riverside", "Sunset", "Union", "Willow"]
+_CONDITIONS = ["Sunny", "Partly cloudy", "Cloudy", "Overcast", "Light rain", "Patchy rain possible", "Clear"]
+
+def _digest(*parts: Any) -> str:
+    return hashlib.sha1(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+def _rng(*parts: Any) -> random.Random:
+    """ Random numbers fixed by the request, so synthetic responses repeat exactly """
+    return random.Random(_digest(*parts))
+
+def _distance(a, b) -> float:
+    lat1, lng1, lat2, lng2 = map(math.radians, (a[0], a[1], b[0], b[1]))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * 6371000 * math.asin(math.sqrt(h))
+
+def _parse_latlng(text: str) -> Optional[tuple]:
+    try:
+        lat, lng = (float(part) for part in text.split(","))
+        return (lat, lng)
+    except ValueError:
+        return None
+
+def _place_point(address: str) -> tuple:
+    """ Where a synthetic address is: 'lat,lng' as given, otherwise a fixed point from its name """
+    point = _parse_latlng(address)
+    if point:
+        return point
+    rng = _rng("address", " ".join(address.lower().split()))
+    return (round(rng.uniform(*_LAT_RANGE), 6), round(rng.uniform(*_LNG_RANGE), 6))
+
+def _duration_text(seconds: float) -> str:
+    hours, minutes = int(seconds // 3600), int(seconds % 3600 // 60)
+    return f"{hours} hours {minutes} mins" if hours else f"{minutes} mins"
+
+class Synthesizer:
+    def __init__(self):
+        """ Plausible, deterministic responses for every endpoint the agents call """
+        # Places handed out by nearby searches, so details for them match
+        self.places: Dict[str, Dict[str, Any]] = {}
+
+    def geocode(self, params: Dict[str, str], body: Any) -> Dict[str, Any]:
+        address = params.get("address", "")
+        lat, lng = _place_point(address)
+        return {
+            "status": "OK",
+            "results": [{
+                "formatted_address": address,
+                "geometry": {"location": {"lat": lat, "lng": lng}},
+                "place_id": f"fake-{_digest('geocode', address)[:20]}"
+            }]
+        }
+
+    def directions(self, params: Dict[str, str], body: Any) -> Dict[str, Any]:
+        stops = [params.get("origin", "")]
+        stops += [w for w in params.get("waypoints", "").split("|") if w and not w.startswith("optimize:")]
+        stops.append(params.get("destination", ""))
+        legs, overview = [], []
+        for start, end in zip(stops, stops[1:]):
+            a, b = _place_point(start), _place_point(end)
+            straight = _distance(a, b)
+            count = max(2, min(2000, int(straight / _ROUTE_POINT_SPACING)))
+            rng = _rng("route", start, end)
+            # A gentle S-curve so the line isn't perfectly straight
+            bend = rng.uniform(-0.02, 0.02)
+            points = [
+                (a[0] + (b[0] - a[0]) * t + bend * math.sin(math.pi * t) * abs(b[1] - a[1]),
+                 a[1] + (b[1] - a[1]) * t)
+                for t in (i / (count - 1) for i in range(count))
+            ]
+            overview.extend(points[::10] + [points[-1]])
+            distance = int(straight * _ROAD_FACTOR)
+            duration = int(distance / _DRIVING_SPEED)
+            legs.append({
+                "start_address": start,
+                "end_address": end,
+                "start_location": {"lat": a[0], "lng": a[1]},
+                "end_location": {"lat": b[0], "lng": b[1]},
+                "distance": {"text": f"{distance * 0.000621371:,.0f} mi", "value": distance},
+                "duration": {"text": _duration_text(duration), "value": duration},
+                "duration_in_traffic": {"text": _duration_text(duration * 1.1), "value": int(duration * 1.1)},
+                "steps": [{"polyline": {"points": polyline.encode(points, 5)}}]
+            })
+        return {"status": "OK", "routes": [{"legs": legs, "overview_polyline": {"points": polyline.encode(overview, 5)}}]}
+
+    def places_nearby(self, params: Dict[str, str], body: Any) -> Dict[str, Any]:
+        lat, lng = _parse_latlng(params.get("location", "")) or (0.0, 0.0)
+        radius = float(params.get("radius", 5000))
+        place_type = params.get("type") or params.get("keyword") or "point_of_interest"
+        rng = _rng("nearby", round(lat, 4), round(lng, 4), radius, place_type)
+        results = []
+        for i in range(_PLACES_PER_SEARCH):
+            # Uniform over the search circle
+            distance = radius * math.sqrt(rng.random())
+            bearing = rng.uniform(0, 2 * math.pi)
+            place_lat = lat + distance * math.cos(bearing) / 111320
+            place_lng = lng + distance * math.sin(bearing) / (111320 * max(math.cos(math.radians(lat)), 0.01))
+            place = {
+                "place_id": f"fake-{_digest('place', round(place_lat, 5), round(place_lng, 5), place_type)[:20]}",
+                "name": f"{rng.choice(_NAME_WORDS)} {rng.choice(_NAME_WORDS)} {place_type.replace('_', ' ').title()}",
+                "geometry": {"location": {"lat": round(place_lat, 6), "lng": round(place_lng, 6)}},
+                "rating": round(rng.uniform(3.0, 5.0), 1),
+                "user_ratings_total": rng.randint(5, 5000),
+                "types": [place_type, "point_of_interest", "establishment"],
+                "vicinity": f"{rng.randint(100, 9999)} Main St"
+            }
+            self.places[place["place_id"]] = place
+            results.append(place)
+        return {"status": "OK", "results": results}
+
+    def place_details(self, params: Dict[str, str], body: Any) -> Dict[str, Any]:
+        place_id = params.get("place_id", "")
+        rng = _rng("details", place_id)
+        place = self.places.get(place_id, {"name": f"Place {place_id[-6:]}", "rating": round(rng.uniform(3.0, 5.0), 1), "vicinity": "1 Main St"})
+        return {
+            "status": "OK",
+            "result": {
+                "name": place["name"],
+                "formatted_address": place["vicinity"],
+                "formatted_phone_number": f"(555) {rng.randint(100, 999)}-{rng.randint(1000, 9999)}",
+                "rating": place["rating"],
+                "opening_hours": {"weekday_text": [f"{day}: 9:00 AM – 9:00 PM" for day in ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")]}
+            }
+        }
+
+    @staticmethod
+    def _conditions(rng: random.Random) -> Dict[str, Any]:
+        temp_f = round(rng.uniform(35, 95), 1)
+        wind_mph = round(rng.uniform(0, 20), 1)
+        return {
+            "temp_f": temp_f,
+            "temp_c": round((temp_f - 32) * 5 / 9, 1),
+            "condition": {"text": rng.choice(_CONDITIONS)},
+            "humidity": rng.randint(20, 95),
+            "wind_mph": wind_mph,
+            "wind_kph": round(wind_mph * 1.609, 1),
+            "chance_of_rain": rng.randint(0, 100)
+        }
+
+    @staticmethod
+    def _location(query: str) -> Dict[str, Any]:
+        lat, lng = _place_point(query)
+        return {"name": f"Town {_digest('town', round(lat, 1), round(lng, 1))[:5]}", "region": "Fake State", "country": "United States of America", "lat": lat, "lon": lng}
+
+    def current_weather(self, params: Dict[str, str], body: Any) -> Dict[str, Any]:
+        query = params.get("q", "")
+        return {"location": self._location(query), "current": self._conditions(_rng("current", query))}
+
+    def forecast_weather(self, params: Dict[str, str], body: Any) -> Dict[str, Any]:
+        query = params.get("q", "")
+        days = int(params.get("days", 1))
+        start = int(time.time() // 86400 * 86400)
+        forecast_days = []
+        for day in range(days):
+            hours = []
+            for hour in range(24):
+                epoch = start + (day * 24 + hour) * 3600
+                hours.append({
+                    "time_epoch": epoch,
+                    "time": time.strftime("%Y-%m-%d %H:%M", time.gmtime(epoch)),
+                    **self._conditions(_rng("forecast", query, epoch))
+                })
+            forecast_days.append({"date": time.strftime("%Y-%m-%d", time.gmtime(start + day * 86400)), "hour": hours})
+        return {"location": self._location(query), "forecast": {"forecastday": forecast_days}}
+
+    def chat_completions(self, params: Dict[str, str], body: Any) -> Dict[str, Any]:
+        # Answers the place ranking prompt: every category's candidates by rating
+        try:
+            categories = json.loads(body["messages"][-1]["content"]).get("categories", {})
+        except (KeyError, IndexError, TypeError, ValueError):
+            categories = {}
+        rankings = {
+            category: [c["index"] for c in sorted(candidates, key=lambda c: c.get("rating") or 0, reverse=True)]
+            for category, candidates in categories.items()
+        }
+        return {"choices": [{"index": 0, "message": {"role": "assistant", "content": json.dumps({"rankings": rankings})}, "finish_reason": "stop"}]}
+
+class FixtureStore:
+    def __init__(self, directory: str):
+        """
+        Recorded responses on disk, one JSON file per distinct request
+
+        Args:
+            directory (str): Folder holding a subfolder of fixtures per endpoint
+        """
+        self.directory = Path(directory)
+
+    @staticmethod
+    def key(params: Dict[str, str], body: Any) -> str:
+        return _digest({name: value for name, value in params.items() if name not in _IGNORED_PARAMS}, body)
+
+    def _path(self, endpoint: str, key: str) -> Path:
+        return self.directory / endpoint / f"{key}.json"
+
+    def get(self, endpoint: str, key: str) -> Optional[Dict[str, Any]]:
+        path = self._path(endpoint, key)
+        if not path.exists():
+            return None
+        return json.loads(path.read_text())
+
+    def put(self, endpoint: str, key: str, request: Dict[str, Any], status: int, body: Any) -> None:
+        path = self._path(endpoint, key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps({"request": request, "status": status, "body": body}, indent=1))
+
+class FaultProfile:
+    def __init__(self, profiles: Dict[str, Dict[str, float]], seed: int = 0):
+        """
+        Latency, server errors and throttling to inject, per endpoint
+
+        Args:
+            profiles (Dict[str, Dict[str, float]]): 'default' and per-endpoint settings:
+                latency_ms, jitter_ms, error_rate, throttle_rate
+            seed (int): Seed for the fault draws, so a run can be repeated
+        """
+        self.profiles = profiles
+        self._rng = random.Random(seed)
+
+    def settings(self, endpoint: str) -> Dict[str, float]:
+        return {**self.profiles.get("default", {}), **self.profiles.get(endpoint, {})}
+
+    async def apply(self, upstream: str, endpoint: str) -> Optional[JSONResponse]:
+        """ Sleep for the endpoint's latency, then return an injected failure, if one is drawn """
+        settings = self.settings(endpoint)
+        latency = settings.get("latency_ms", 0) + self._rng.uniform(-1, 1) * settings.get("jitter_ms", 0)
+        if latency > 0:
+            await asyncio.sleep(latency / 1000)
+        draw = self._rng.random()
+        if draw < settings.get("throttle_rate", 0):
+            if upstream == "google":
+                # Google reports quota errors in a 200 response
+                return JSONResponse({"status": "OVER_QUERY_LIMIT", "error_message": "Injected by fake_upstream"})
+            return JSONResponse({"error": {"message": "Injected rate limit"}}, status_code=429, headers={"Retry-After": "1"})
+        if draw < settings.get("throttle_rate", 0) + settings.get("error_rate", 0):
+            return JSONResponse({"error": {"message": "Injected server error"}}, status_code=500)
+        return None
+
+def create_app(mode: str = "replay", fixtures: str = "fixtures/upstream", on_miss: str = "synthesize", faults: Optional[FaultProfile] = None) -> FastAPI:
+    """
+    Build the fake-upstream app
+
+    Args:
+        mode (str): 'replay' to serve fixtures, 'record' to forward to the real APIs and save fixtures
+        fixtures (str): Fixture folder
+        on_miss (str): In replay mode, 'synthesize' a response for unrecorded requests or return an 'error'
+        faults (Optional[FaultProfile]): Faults to inject; none by default
+    """
+    app = FastAPI(title="Fake upstream")
+    store = FixtureStore(fixtures)
+    synthesizer = Synthesizer()
+    faults = faults or FaultProfile({})
+    stats = {endpoint: {"requests": 0, "fixture_hits": 0, "synthesized": 0, "recorded": 0, "faults": 0} for _, endpoint in ENDPOINTS.values()}
+    recorder = httpx.AsyncClient(timeout=30.0) if mode == "record" else None
+
+    @app.get("/_stats")
+    async def get_stats():
+        return stats
+
+    @app.api_route("/{path:path}", methods=["GET", "POST"])
+    async def serve(path: str, request: Request):
+        route = ENDPOINTS.get(f"/{path}")
+        if route is None:
+            return JSONResponse({"error": {"message": f"Unknown endpoint /{path}"}}, status_code=404)
+        upstream, endpoint = route
+        params = dict(request.query_params)
+        body = await request.json() if request.method == "POST" else None
+        counters = stats[endpoint]
+        counters["requests"] += 1
+
+        fault = await faults.apply(upstream, endpoint)
+        if fault is not None:
+            counters["faults"] += 1
+            return fault
+
+        key = store.key(params, body)
+        if mode == "record":
+            real_path = f"/{path}"[len(FAKE_UPSTREAM_PATHS[upstream]):]
+            headers = {name: value for name, value in request.headers.items() if name in ("authorization", "api-key")}
+            response = await recorder.request(request.method, REAL_BASE_URLS[upstream] + real_path, params=params, json=body, headers=headers)
+            recorded = response.json()
+            if response.status_code < 500:
+                store.put(endpoint, key, {"params": {k: v for k, v in params.items() if k != "key"}, "body": body}, response.status_code, recorded)
+                counters["recorded"] += 1
+            return JSONResponse(recorded, status_code=response.status_code)
+
+        fixture = store.get(endpoint, key)
+        if fixture is not None:
+            counters["fixture_hits"] += 1
+            return JSONResponse(fixture["body"], status_code=fixture["status"])
+        if on_miss == "error":
+            return JSONResponse({"error": {"message": f"No fixture for {endpoint} {key}"}}, status_code=404)
+        counters["synthesized"] += 1
+        return JSONResponse(getattr(synthesizer, endpoint)(params, body))
+
+    return app
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake Google Maps, WeatherAPI and LLM upstream for offline load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--mode", choices=("replay", "record"), default="replay")
+    parser.add_argument("--fixtures", default="fixtures/upstream", help="Fixture folder")
+    parser.add_argument("--on-miss", choices=("synthesize", "error"), default="synthesize")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Added latency for every endpoint")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Latency varies by up to this much either way")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with a 500")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Share of requests throttled")
+    parser.add_argument("--profile", help="JSON file of per-endpoint fault settings, overriding the flags above")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for fault injection")
+    args = parser.parse_args()
+
+    profiles = {"default": {
+        "latency_ms": args.latency_ms,
+        "jitter_ms": args.jitter_ms,
+        "error_rate": args.error_rate,
+        "throttle_rate": args.throttle_rate
+    }}
+    if args.profile:
+        loaded = json.loads(Path(args.profile).read_text())
+        profiles = {**profiles, **loaded, "default": {**profiles["default"], **loaded.get("default", {})}}
+
+    logging.basicConfig(level=logging.INFO)
+    logger.info(f"Fake upstream in {args.mode} mode on http://{args.host}:{args.port} (fixtures in {args.fixtures})")
+    uvicorn.run(create_app(args.mode, args.fixtures, args.on_miss, FaultProfile(profiles, args.seed)), host=args.host, port=args.port, log_level="warning")
@@ -1,4 +1,5 @@
 from dotenv import load_dotenv
+import asyncio
 import os
 
 # Load environment variables
@@ -12,15 +13,34 @@ required_env_vars = [
     "WEATHER_API_KEY"
 ]
 
+# A local fake-upstream server (fake_upstream.py) doesn't check keys, so placeholders will do
+if os.getenv("FAKE_UPSTREAM_URL"):
+    for var in required_env_vars:
+        os.environ.setdefault(var, "fake-upstream")
+
 missing_vars = [var for var in required_env_vars if not os.getenv(var)]
 if missing_vars:
     raise ValueError(f"Missing required environment variables: {', '.join(missing_vars)}")
 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Query, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from orchestrator import router as orchestrator_router
-
-app = FastAPI()
+from orchestrator import router as orchestrator_router, start_agents
+from utils import cache_manager, upstream_client
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Agents are built here rather than at import so reloads and new workers start fast
+    upstream_client.open()
+    # Load recent entries from the persistent cache tier, if configured, off the event loop
+    await asyncio.to_thread(cache_manager.warm_from_l2)
+    start_agents()
+    yield
+    await upstream_client.close()
+    # Flush buffered disk cache writes before the worker exits
+    cache_manager.close()
+
+app = FastAPI(lifespan=lifespan)
 
 # Enable CORS for frontend communication
 app.add_middleware(
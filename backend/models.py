@@ -1,5 +1,8 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import List, Optional, Tuple
+
+def _normalize_place(value: str) -> str:
+    return " ".join(value.lower().split())
 
 # ==============================================
 # Request Models (input data)
@@ -15,7 +18,8 @@ class RouteRequest(BaseModel):
         example=["New Orleans, LA", "Pensacola, FL"]
     )
     departure_time: str = Field(
-        default="now", title="Departure Time", description="Planned departure time in format YYYY-MM-DD HH:MM",
+        default="now", title="Departure Time",
+        description="Planned departure time: YYYY-MM-DD HH:MM in the origin's local time, or ISO-8601 with a UTC offset (e.g. 2025-05-01T05:00-05:00)",
         example="2025-05-01 05:00"
     )
     stop_durations: Optional[List[int]] = Field(
@@ -30,6 +34,34 @@ class RouteRequest(BaseModel):
         description="Types of attractions to include in recommendations",
         example=["museum", "tourist_attraction", "park"]
     )
+    weather_mode: str = Field(
+        default="current", title="Weather Mode", pattern="^(current|forecast)$",
+        description="current: conditions now at each stop; forecast: forecast for when you reach each stop and points along the route",
+        example="forecast"
+    )
+
+    def canonical_key(self, exact_departure: bool = True) -> Tuple:
+        """
+        Identity of the trip: case/whitespace-insensitive places, order-insensitive preferences
+
+        Pass exact_departure=False to leave the departure time out, for keys that
+        group nearby departures themselves (the trip cache buckets them).
+        """
+        return (
+            _normalize_place(self.origin),
+            _normalize_place(self.destination),
+            tuple(_normalize_place(w) for w in self.waypoints or []),
+            *((self.departure_time.strip().lower(),) if exact_departure else ()),
+            tuple(self.stop_durations or []),
+            tuple(sorted(set(self.attraction_preferences or []))),
+            self.weather_mode
+        )
+
+class PlaceDetailsRequest(BaseModel):
+    place_ids: List[str] = Field(
+        ..., title="Place IDs", description="Google place IDs to get details for; duplicates are fetched once",
+        example=["ChIJN1t_tDeuEmsRUsoyG83frY4"]
+    )
 
 class DepartureTimeRequest(BaseModel):
     origin: str = Field(..., title="Origin", description="Starting point address", example="Katy, TX")
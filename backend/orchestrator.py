@@ -1,21 +1,50 @@
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, Header, Query
+from fastapi.responses import StreamingResponse
 import polyline
-from models import RouteRequest
+from models import RouteRequest, PlaceDetailsRequest
 from agents.agent import TravelAgent
 from agents.weather_agent import WeatherAgent
 from agents.recommendation_agent import RecommendationAgent
+from utils import cache_manager, place_ranker, places_cache, upstream_client, FastJSONResponse, fast_json, RequestCoalescer, Stage, StageScheduler, TripResponseCache
+from utils.geo import simplify_for_zoom, MAX_SIMPLIFY_ZOOM
+from utils.geometry_formats import encode_geometry, GEOMETRY_FORMATS
+from utils.place_dedup import PlaceDeduplicator
+from typing import Optional
 import traceback
-import json
 import asyncio
 import time
 import logging
 
 router = APIRouter()
-travel_agent = TravelAgent()
-weather_agent = None  # Initialize lazily
-recommendation_agent = None  # Initialize lazily
+# Agents are created by start_agents() in the app lifespan, or lazily on first use
+travel_agent = None
+weather_agent = None
+recommendation_agent = None
+# Identical trips requested while one is already being planned share its result
+trip_coalescer = RequestCoalescer("plan_trip")
+# Sections of recent plan_trip responses, each kept for its own freshness window
+trip_cache = TripResponseCache(cache_manager)
 logger = logging.getLogger(__name__)
 
+# Map zoom the route line is simplified for unless the client asks for another level
+DEFAULT_ROUTE_ZOOM = 10
+
+GEOMETRY_QUERY_DESCRIPTION = (
+    "How the route line is sent: coordinates ([[lat, lng], ...]), polyline (encoded polyline), "
+    "delta (flat integer deltas at 1e-5 degrees) or float32 (base64 little-endian float32 lat/lng pairs)"
+)
+
+def get_travel_agent():
+    """Get travel agent instance, initializing it if needed"""
+    global travel_agent
+    if travel_agent is None:
+        try:
+            travel_agent = TravelAgent()
+        except ValueError as e:
+            logger.warning(f"Travel agent initialization failed: {e}")
+            return None
+    return travel_agent
+
 def get_weather_agent():
     """Get weather agent instance, initializing it if needed"""
     global weather_agent
@@ -38,6 +67,259 @@ def get_recommendation_agent():
             return None
     return recommendation_agent
 
+def start_agents():
+    """ Create the agents up front so the first trip request doesn't pay for it """
+    start_time = time.perf_counter()
+    get_travel_agent()
+    get_weather_agent()
+    get_recommendation_agent()
+    logger.info(f"Agents initialized in {time.perf_counter() - start_time:.2f} seconds")
+
+async def fetch_route(request: RouteRequest):
+    """ Fetch the optimized route and attach its decoded coordinates """
+    travel_agent_instance = get_travel_agent()
+    if not travel_agent_instance:
+        return {"error": "Failed to get route: Google Maps API key not configured"}
+
+    logger.info(f"Fetching route from {request.origin} to {request.destination}")
+    route_info = await travel_agent_instance.get_route(request.origin, request.destination, request.waypoints)
+    logger.info(f"Route info received: {route_info}")
+
+    if "error" in route_info:
+        logger.error(f"Route request failed: {route_info['error']}")
+        return {"error": f"Failed to get route: {route_info['error']}"}
+
+    if "polyline" in route_info:
+        # Use detailed coordinates if available, otherwise decode the polyline
+        if "detailed_coordinates" in route_info:
+            decoded_coordinates = route_info["detailed_coordinates"]
+            logger.info(f"Using {len(decoded_coordinates)} detailed coordinates from route")
+        else:
+            decoded_coordinates = polyline.decode(route_info["polyline"])
+            decoded_coordinates = [list(coord) for coord in decoded_coordinates]
+            logger.info(f"Decoded {len(decoded_coordinates)} coordinates from polyline")
+    else:
+        decoded_coordinates = []
+        logger.warning("No polyline found in route response")
+
+    route_info["coordinates"] = decoded_coordinates
+    return route_info
+
+async def fetch_weather(request: RouteRequest, on_stop=None, route=None):
+    """
+    Fetch weather for the origin, each waypoint and the destination
+
+    In forecast mode, route (required) gives the arrival times and points along the way.
+    """
+    weather_agent_instance = get_weather_agent()
+    if not weather_agent_instance:
+        logger.warning("Weather agent not available - skipping weather data")
+        return {"error": "Weather API key not configured"}
+
+    weather_stops = [request.origin]
+    if request.waypoints:
+        weather_stops.extend(request.waypoints)
+    weather_stops.append(request.destination)
+
+    if request.weather_mode == "forecast":
+        if route is None or "error" in route:
+            return {"error": "Weather forecast needs a route"}
+        return await weather_agent_instance.get_route_forecast(
+            weather_stops, route, request.departure_time, request.stop_durations, on_stop=on_stop
+        )
+
+    return await weather_agent_instance.get_weather({"waypoints": weather_stops}, on_stop=on_stop)
+
+async def fetch_recommendations(request: RouteRequest, on_location=None):
+    """ Get recommendations for the waypoints and destination """
+    recommendation_agent_instance = get_recommendation_agent()
+    if not recommendation_agent_instance:
+        logger.warning("Recommendation agent not available - skipping recommendations")
+        return {"error": "Google Maps API key not configured"}
+
+    return await recommendation_agent_instance.get_recommendations(
+        (request.waypoints or []) + [request.destination], # Exclude origin
+        request.attraction_preferences,
+        on_location=on_location
+    )
+
+async def fetch_route_attractions(request: RouteRequest, route, on_attraction=None, stats=None):
+    """
+    Get attractions along the decoded route
+
+    stats, if given, is filled with the search counters, including failed_searches.
+    """
+    if "error" in route:
+        return []
+
+    recommendation_agent_instance = get_recommendation_agent()
+    if not recommendation_agent_instance:
+        logger.warning("Recommendation agent not available - skipping route attractions")
+        return []
+
+    search_stats = stats if stats is not None else {}
+    route_attractions = await recommendation_agent_instance.get_route_attractions(
+        route.get("coordinates", []),
+        request.attraction_preferences,
+        stats=search_stats,
+        on_attraction=on_attraction
+    )
+    logger.info(f"Route attraction search: {search_stats.get('sample_points', 0)} search centers, {search_stats.get('api_calls', 0)} API calls")
+    if search_stats.get("failed_searches"):
+        logger.warning(f"Route attraction search: {search_stats['failed_searches']} searches failed after retries; results may be incomplete")
+    return route_attractions
+
+def collect_place_ids(response_data):
+    """ Place IDs of every hotel, restaurant, attraction and route attraction in a trip response """
+    place_ids = []
+    recommendations = response_data.get("recommendations")
+    if isinstance(recommendations, dict) and "error" not in recommendations:
+        for sections in recommendations.values():
+            for section in ("hotels", "restaurants", "attractions"):
+                place_ids.extend(place.get("place_id") for place in sections.get(section, []))
+    for route_item in response_data.get("route") or []:
+        place_ids.extend(attraction.get("place_id") for attraction in route_item.get("route_attractions", []))
+    return place_ids
+
+def dedupe_places(recommendations, route_attractions):
+    """
+    Merge near-duplicate places across every location's sections and the route attractions
+
+    Places are kept in order of first appearance: each location's hotels, restaurants
+    and attractions, then the route attractions. New containers are returned so
+    cached sections are left as they were.
+    """
+    deduplicator = PlaceDeduplicator()
+    if isinstance(recommendations, dict) and "error" not in recommendations:
+        recommendations = {
+            location: dedupe_location(deduplicator, sections)
+            for location, sections in recommendations.items()
+        }
+    if isinstance(route_attractions, list):
+        route_attractions = deduplicator.dedupe(route_attractions)
+    if deduplicator.merged:
+        logger.info(f"Merged {deduplicator.merged} duplicate places across recommendations and route attractions")
+    return recommendations, route_attractions
+
+def dedupe_location(deduplicator, sections):
+    """ One location's sections with places the deduplicator has already kept removed """
+    return {
+        section: deduplicator.dedupe(places) if section in ("hotels", "restaurants", "attractions") else places
+        for section, places in sections.items()
+    }
+
+class TripEventStream:
+    def __init__(self, emit, locations):
+        """
+        Puts a trip's progress events in the order /api/plan_trip/stream documents
+
+        Nothing is sent before the route event. Recommendations go out one location
+        at a time in request order, deduplicated the way dedupe_places treats the
+        final response, so each event matches that location in the final payload.
+        The route_attractions event is sent last, once the places it is deduplicated
+        against are known.
+
+        :param emit: Called with each event, in order
+        :param locations: The recommendation locations in request order
+        """
+        self.emit = emit
+        self._held = []
+        self._locations = list(dict.fromkeys(locations))
+        self._next_location = 0
+        self._finished_locations = {}
+        self._deduplicator = PlaceDeduplicator()
+
+    def send(self, event):
+        """ Send an event, or hold it until the route has been sent """
+        if self._held is None:
+            self.emit(event)
+        else:
+            self._held.append(event)
+
+    def send_route(self, route):
+        """ Send the route event, then everything that was waiting for it """
+        self.emit({"type": "route", "data": route})
+        held, self._held = self._held, None
+        for event in held:
+            self.emit(event)
+
+    def location_finished(self, location, sections):
+        """ Queue a location's recommendations and send every location now next in order """
+        self._finished_locations[location] = sections
+        while self._next_location < len(self._locations) and self._locations[self._next_location] in self._finished_locations:
+            self._send_location(self._locations[self._next_location])
+            self._next_location += 1
+
+    def recommendations_finished(self):
+        """ Send the remaining finished locations; the ones before them will never report (e.g. not geocoded) """
+        for location in self._locations[self._next_location:]:
+            if location in self._finished_locations:
+                self._send_location(location)
+        self._next_location = len(self._locations)
+
+    def _send_location(self, location):
+        sections = self._finished_locations[location]
+        if isinstance(sections, dict):
+            sections = dedupe_location(self._deduplicator, sections)
+        self.send({"type": "recommendations", "location": location, "data": sections})
+
+async def fetch_place_details(place_ids):
+    """ Get details for a batch of places, keyed by place ID """
+    recommendation_agent_instance = get_recommendation_agent()
+    if not recommendation_agent_instance:
+        logger.warning("Recommendation agent not available - skipping place details")
+        return {}
+    return await recommendation_agent_instance.get_place_details_batch(place_ids)
+
+def with_trip_cache(cache_key, section, cached_sections, func, replay=None, degraded=None):
+    """
+    Wrap a stage function so it serves a fresh cached section, or caches what it computes
+
+    replay, if given, is called with a cached section so streaming clients still receive it.
+    degraded, if given, is called after func and returns True when its result is
+    incomplete and must not be cached.
+    """
+    async def run(**inputs):
+        if section in cached_sections:
+            if replay:
+                replay(cached_sections[section])
+            return cached_sections[section]
+        result = await func(**inputs)
+        trip_cache.set_section(cache_key, section, result, degraded=bool(degraded and degraded()))
+        return result
+    return run
+
+async def apply_route_resolution(response_data, zoom, geometry_format="coordinates"):
+    """
+    Return the response with each route line simplified for the given zoom level and
+    sent in the requested geometry format, leaving the original untouched
+    """
+    if not isinstance(response_data.get("route"), list):
+        return response_data
+
+    routes = []
+    for route_item in response_data["route"]:
+        route_item = dict(route_item)
+        full_coordinates = route_item.pop("coordinates", [])
+        # Same points as the full-resolution coordinates; never send them twice
+        route_item.pop("detailed_coordinates", None)
+        coordinates = await asyncio.to_thread(simplify_for_zoom, full_coordinates, zoom)
+        route_item.update(encode_geometry(coordinates, geometry_format))
+        route_item["coordinates_zoom"] = zoom
+        route_item["coordinates_count"] = len(coordinates)
+        route_item["full_coordinates_count"] = len(full_coordinates)
+        routes.append(route_item)
+
+    logger.info(f"Simplified route for zoom {zoom}: {sum(r['full_coordinates_count'] for r in routes)} -> {sum(r['coordinates_count'] for r in routes)} points ({geometry_format})")
+    return {**response_data, "route": routes}
+
+def format_stream_event(event, stream_format):
+    """ Serialize one progress event as an NDJSON line or a server-sent event """
+    payload = fast_json.dumps(event)
+    if stream_format == "sse":
+        return b"event: " + event['type'].encode() + b"\ndata: " + payload + b"\n\n"
+    return payload + b"\n"
+
 @router.get("/api/test", response_model=dict)
 async def test_endpoint():
     """ Simple test endpoint to verify API is working """
@@ -47,9 +329,124 @@ async def test_endpoint():
         "timestamp": time.time()
     }
 
-@router.post("/api/plan_trip", response_model=dict)
-async def plan_trip(request: RouteRequest):
+@router.get("/api/cache_stats", response_model=dict)
+async def cache_stats():
+    """ Cache diagnostics: entries, hit/miss counts and oldest entry age per category """
+    return {
+        "diagnostics": cache_manager.get_diagnostics(),
+        "size": cache_manager.get_cache_size(),
+        "plan_trip_coalescing": trip_coalescer.get_stats(),
+        "places_tiles": places_cache.get_stats()
+    }
+
+@router.get("/api/metrics", response_model=dict)
+async def metrics():
+    """ Encoded JSON response sizes and encode times, upstream HTTP pool usage, and LLM ranking counters """
+    return {
+        "responses": fast_json.response_metrics.get_stats(),
+        "upstream": upstream_client.get_stats(),
+        "rate_limits": upstream_client.rate_limiter.get_stats(),
+        "llm_ranking": place_ranker.get_stats()
+    }
+
+@router.post("/api/plan_trip", response_model=dict, response_class=FastJSONResponse)
+async def plan_trip(
+    request: RouteRequest,
+    route_zoom: int = Query(
+        DEFAULT_ROUTE_ZOOM, ge=0, le=MAX_SIMPLIFY_ZOOM,
+        description=f"Map zoom level to simplify the route line for; {MAX_SIMPLIFY_ZOOM} returns every point"
+    ),
+    geometry: str = Query("coordinates", pattern=f"^({'|'.join(GEOMETRY_FORMATS)})$", description=GEOMETRY_QUERY_DESCRIPTION),
+    include_details: bool = Query(False, description="Attach details for every place in the trip under place_details"),
+    accept_encoding: Optional[str] = Header(None)
+):
     """ AI-powered trip planner that integrates route, weather, and recommendations """
+    response_data = await trip_coalescer.run(request.canonical_key(), lambda: _plan_trip(request))
+    if include_details and "error" not in response_data:
+        response_data = {**response_data, "place_details": await fetch_place_details(collect_place_ids(response_data))}
+    # Encode once here; returning the response directly skips FastAPI's jsonable_encoder pass.
+    # Compressed with gzip (or brotli, if installed) when the client accepts it.
+    return FastJSONResponse(
+        await apply_route_resolution(response_data, route_zoom, geometry),
+        accept_encoding=accept_encoding
+    )
+
+@router.post("/api/place_details", response_model=dict, response_class=FastJSONResponse)
+async def place_details(request: PlaceDetailsRequest):
+    """ Details for many places in one request, e.g. every marker of a trip """
+    return FastJSONResponse({"place_details": await fetch_place_details(request.place_ids)})
+
+@router.post("/api/plan_trip/stream")
+async def plan_trip_stream(
+    request: RouteRequest,
+    route_zoom: int = Query(
+        DEFAULT_ROUTE_ZOOM, ge=0, le=MAX_SIMPLIFY_ZOOM,
+        description=f"Map zoom level to simplify the route line for; {MAX_SIMPLIFY_ZOOM} returns every point"
+    ),
+    geometry: str = Query("coordinates", pattern=f"^({'|'.join(GEOMETRY_FORMATS)})$", description=GEOMETRY_QUERY_DESCRIPTION),
+    include_details: bool = Query(False, description="Send details for every place in the trip in a place_details event"),
+    stream_format: str = Query("ndjson", alias="format", pattern="^(ndjson|sse)$", description="ndjson or sse")
+):
+    """
+    Progressive trip planner: sends each section as soon as it is ready
+
+    Events, each with a "type", in this order: route first; then, as they are ready,
+    weather (per stop), recommendations (per location, in request order) and
+    route_attraction (each candidate as found, before deduplication); then
+    route_attractions (final ranking); place_details (if include_details); then done.
+    recommendations and route_attractions match the final plan_trip response. A
+    failed route sends a single error event instead.
+    """
+    start_time = time.time()
+    queue = asyncio.Queue()
+
+    async def run_pipeline():
+        try:
+            response_data = await _plan_trip(request, emit=queue.put_nowait, route_zoom=route_zoom, route_geometry=geometry)
+            if "error" in response_data:
+                queue.put_nowait({"type": "error", **response_data})
+            else:
+                if include_details:
+                    place_details = await fetch_place_details(collect_place_ids(response_data))
+                    queue.put_nowait({"type": "place_details", "data": place_details})
+                queue.put_nowait({
+                    "type": "done",
+                    "cached_sections": response_data.get("cached_sections", []),
+                    "errors": {
+                        section: response_data[section]["error"]
+                        for section in ("weather", "recommendations")
+                        if isinstance(response_data.get(section), dict) and "error" in response_data[section]
+                    },
+                    "elapsed_seconds": round(time.time() - start_time, 2)
+                })
+        finally:
+            queue.put_nowait(None)
+
+    async def events():
+        task = asyncio.create_task(run_pipeline())
+        try:
+            while True:
+                event = await queue.get()
+                if event is None:
+                    break
+                yield format_stream_event(event, stream_format)
+        finally:
+            # Client went away: stop the upstream work too
+            if not task.done():
+                task.cancel()
+
+    media_type = "text/event-stream" if stream_format == "sse" else "application/x-ndjson"
+    return StreamingResponse(events(), media_type=media_type)
+
+async def _plan_trip(request: RouteRequest, emit=None, route_zoom=DEFAULT_ROUTE_ZOOM, route_geometry="coordinates"):
+    """
+    Run the full planning pipeline for one trip
+
+    emit, if given, is called with a typed progress event as each piece of the
+    response becomes available; route_zoom and route_geometry set the resolution and
+    format of the route event.
+    """
+    scheduler = None
     try:
         # logger.info(f"Received trip planning request: {request}")
         start_time = time.time()
@@ -58,104 +455,111 @@ async def plan_trip(request: RouteRequest):
         departure_time = request.departure_time
         stop_durations = [d for d in request.stop_durations] if request.stop_durations else []
 
-        # Fetch optimized route with timeout
-        logger.info(f"Fetching route from {request.origin} to {request.destination}")
-        try:
-            route_info = await asyncio.wait_for(
-                asyncio.to_thread(travel_agent.get_route, request.origin, request.destination, request.waypoints),
-                timeout=30.0 # 30 second timeout for route
-            )
-        except asyncio.TimeoutError:
-            logger.error("Route request timed out after 30 seconds")
-            return {"error": "Route request timed out. Please try again."}
-        
-        logger.info(f"Route info received: {route_info}")
-
-        # Check if route request failed
-        if "error" in route_info:
-            logger.error(f"Route request failed: {route_info["error"]}")
-            return {"error": f"Failed to get route: {route_info["error"]}"}
-        
-        if "polyline" in route_info:
-            # Use detailed coordinates if available, otherwise decode the polyline
-            if "detailed_coordinates" in route_info:
-                decoded_coordinates = route_info["detailed_coordinates"]
-                logger.info(f"Using {len(decoded_coordinates)} detailed coordinates from route")
-            else:
-                decoded_coordinates = polyline.decode(route_info["polyline"])
-                decoded_coordinates = [list(coord) for coord in decoded_coordinates]
-                logger.info(f"Decoded {len(decoded_coordinates)} coordinates from polyline")
-        else:
-            decoded_coordinates = []
-            logger.warning("No polyline found in route response")
-
-        route_info["coordinates"] = decoded_coordinates
-
-        if not isinstance(route_info, list):
-            route_info = [route_info] if route_info else []
-
-        # Fetch weather alerts with timeout
-        weather_stops = [request.origin]
-        if request.waypoints:
-            weather_stops.extend(request.waypoints)
-        weather_stops.append(request.destination)
-        
-        # Create weather request data with required structure
-        weather_request = {
-            "waypoints": weather_stops,
-            "legs": route_info[0] if isinstance(route_info, list) else route_info
-        }
+        # Reuse whichever sections of a recent identical trip are still fresh
+        cache_key = trip_cache.make_key(request.canonical_key(exact_departure=False), departure_time)
+        cached_sections = await trip_cache.get_sections(cache_key)
+        if cached_sections:
+            logger.info(f"Serving cached sections: {list(cached_sections.keys())}")
+
+        def cached(section, func, replay=None, degraded=None):
+            return with_trip_cache(cache_key, section, cached_sections, func, replay, degraded)
+
+        # Progress callbacks for streaming clients; fresh sections report item by item,
+        # cached sections are replayed in the same shape
+        stream = TripEventStream(emit, (request.waypoints or []) + [request.destination]) if emit else None
+        on_stop = on_location = on_attraction = None
+        replay_weather = replay_recommendations = None
+        if stream:
+            def on_stop(stop, weather):
+                stream.send({"type": "weather", "location": stop, "data": weather})
+
+            on_location = stream.location_finished
+
+            def on_attraction(attraction):
+                stream.send({"type": "route_attraction", "data": attraction})
+
+            def replay_weather(weather_data):
+                for stop, weather in weather_data.items():
+                    on_stop(stop, weather)
+
+            def replay_recommendations(recommendations):
+                for location, location_recommendations in recommendations.items():
+                    on_location(location, location_recommendations)
+
+        cached_recommendations = cached("recommendations", lambda: fetch_recommendations(request, on_location=on_location), replay_recommendations)
+
+        async def recommendations_stage():
+            recommendations = await cached_recommendations()
+            if stream:
+                # Don't hold finished locations back behind ones that will never report
+                stream.recommendations_finished()
+            return recommendations
+
+        route_search_stats = {}
+
+        async def route_attractions_stage(route):
+            return await fetch_route_attractions(request, route, on_attraction=on_attraction, stats=route_search_stats)
+
+        # Waypoint recommendations and current weather only need the request, so they
+        # start right away; route attractions and forecast weather wait for the route.
+        scheduler = StageScheduler([
+            Stage(
+                "route", cached("route", lambda: fetch_route(request)),
+                timeout=30.0, # 30 second timeout for route
+                on_timeout={"error": "Route request timed out. Please try again."},
+                on_error={"error": "Failed to get route: unexpected error"}
+            ),
+            Stage(
+                "weather", cached("weather", lambda route=None: fetch_weather(request, on_stop=on_stop, route=route), replay_weather),
+                inputs=["route"] if request.weather_mode == "forecast" else [],
+                timeout=60.0, # 60 second timeout for weather
+                on_timeout={"error": "Weather request timed out"},
+                on_error={"error": "Weather request failed"}
+            ),
+            Stage(
+                "recommendations", recommendations_stage,
+                timeout=90.0, # 90 second timeout for recommendations
+                on_timeout={"error": "Recommendations request timed out"},
+                on_error={"error": "Recommendations request failed"}
+            ),
+            Stage(
+                "route_attractions",
+                cached(
+                    "route_attractions", route_attractions_stage,
+                    # Some searches failed after retries, so the ranking may be missing places
+                    degraded=lambda: bool(route_search_stats.get("failed_searches"))
+                ),
+                inputs=["route"],
+                timeout=60.0, # 60 second timeout for route attractions
+                on_timeout=[],
+                on_error=[]
+            ),
+        ])
+
+        route_result = await scheduler.result("route")
+
+        # Check if route request failed; nothing else is worth waiting for
+        if "error" in route_result:
+            scheduler.cancel()
+            return route_result
+
+        if stream:
+            route_view = await apply_route_resolution({"route": [route_result]}, route_zoom, route_geometry)
+            stream.send_route(route_view["route"][0])
+
+        results = await scheduler.run()
+        weather_data = results["weather"]
+        recommendations = results["recommendations"]
+        route_attractions = results["route_attractions"]
+        recommendations, route_attractions = dedupe_places(recommendations, route_attractions)
+        if stream:
+            # Also covers a recommendations stage that timed out or failed
+            stream.recommendations_finished()
+            stream.send({"type": "route_attractions", "data": route_attractions})
+
+        # Copy so attaching route attractions doesn't modify the cached route
+        route_info = [dict(route_result)]
 
-        try:
-            weather_agent_instance = get_weather_agent()
-            if weather_agent_instance:
-                weather_data = await asyncio.wait_for(
-                    weather_agent_instance.get_weather(weather_request),
-                    timeout=60.0 # 60 second timeout for weather
-                )
-            else:
-                logger.warning("Weather agent not available - skipping weather data")
-                weather_data = {"error": "Weather API key not configured"}
-        except asyncio.TimeoutError:
-            logger.error("Weather request timed out after 60 seconds")
-            weather_data = {"error": "Weather request timed out"}
-        
-        # Get recommendations for waypoints with timeout
-        try:
-            recommendation_agent_instance = get_recommendation_agent()
-            if recommendation_agent_instance:
-                recommendations = await asyncio.wait_for(
-                    recommendation_agent_instance.get_recommendations(
-                        (request.waypoints or []) + [request.destination], # Exclude origin
-                        request.attraction_preferences
-                    ),
-                    timeout=90.0 # 90 second timeout for recommendations
-                )
-            else:
-                logger.warning("Recommendation agent not available - skipping recommendations")
-                recommendations = {"error": "Google Maps API key not configured"}
-        except asyncio.TimeoutError:
-            logger.error("Recommendations request timed out after 90 seconds")
-            recommendations = {"error": "Recommendations request timed out"}
-        
-        # Get attractions along the route with timeout
-        try:
-            recommendation_agent_instance = get_recommendation_agent()
-            if recommendation_agent_instance:
-                route_attractions = await asyncio.wait_for(
-                    recommendation_agent_instance.get_route_attractions(
-                        decoded_coordinates,
-                        request.attraction_preferences
-                    ),
-                    timeout=60.0 # 60 second timeout for route attractions
-                )
-            else:
-                logger.warning("Recommendation agent not available - skipping route attractions")
-                route_attractions = []
-        except asyncio.TimeoutError:
-            logger.error("Route attractions request timed out after 60 seconds")
-            route_attractions = []
-        
         # Add route attractions to the response
         for route_info_item in route_info:
             route_info_item["route_attractions"] = route_attractions
@@ -164,7 +568,8 @@ async def plan_trip(request: RouteRequest):
         response_data = {
             "route": route_info,
             "weather": weather_data,
-            "recommendations": recommendations
+            "recommendations": recommendations,
+            "cached_sections": [section for section in scheduler.order if section in cached_sections]
         }
 
         # Log response structure for debugging
@@ -180,13 +585,16 @@ async def plan_trip(request: RouteRequest):
                 logger.info(f"- Route coordinates count: {len(route_item['coordinates'])}")
             if 'route_attractions' in route_item:
                 logger.info(f"- Route attractions count: {len(route_item['route_attractions'])}")
-        # Log total response time
-        response_str = json.dumps(response_data, default=str)
-        logger.info(f"Response size: {len(response_str)} characters")
-
+        # Response size is logged when FastJSONResponse encodes it, so it isn't serialized twice
+        logger.info(f"Stage timings: {', '.join(f'{name}={elapsed:.2f}s' for name, elapsed in scheduler.timings.items())}")
         logger.info(f"Trip planning completed in {time.time() - start_time:.2f} seconds")
         return response_data
     
+    except asyncio.CancelledError:
+        # Caller went away (e.g. a streaming client disconnected): stop the stages too
+        if scheduler is not None:
+            scheduler.cancel()
+        raise
     except Exception as e:
         error_msg = f"Error in plan_trip: {str(e)}\n{traceback.format_exc()}"
         logger.error(error_msg)
@@ -0,0 +1,19 @@
+import sys
+from pathlib import Path
+
+# Tests import backend modules the way main.py does (from utils import ...)
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+# Shared test data builders; test modules import them with `from conftest import ...`
+
+def places_result(name, lat=30.0, lng=-90.0, place_id=None, rating=None):
+    """ A Places API search result, as places_nearby returns them """
+    place = {"place_id": place_id, "name": name, "geometry": {"location": {"lat": lat, "lng": lng}}}
+    if rating is not None:
+        place["rating"] = rating
+    return place
+
+def route_attraction(name, rating, lat=30.0, lng=-90.0, place_id=None):
+    """ A route attraction, as get_route_attractions builds them (place_id defaults to the name) """
+    return {"place_id": place_id or name, "name": name, "rating": rating, "location": {"lat": lat, "lng": lng}}
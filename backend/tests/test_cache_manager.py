@@ -0,0 +1,143 @@
+import os
+import tempfile
+import threading
+import time
+import logging
+import unittest
+from unittest import mock
+
+from utils.cache_manager import CacheManager, _LazyDiagnostics
+from utils.disk_cache import DiskCache
+
+class RecordingDiskCache(DiskCache):
+    """ DiskCache that records which thread each read ran on """
+    def __init__(self, path):
+        super().__init__(path)
+        self.read_threads = []
+
+    def get(self, category, key, ttl):
+        self.read_threads.append(threading.current_thread())
+        return super().get(category, key, ttl)
+
+class CacheManagerL2Test(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "cache.db")
+        writer = CacheManager(l2=DiskCache(self.path))
+        writer.set_cached("geocode", "katy, tx", {"lat": 29.78, "lng": -95.82})
+        writer.close()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    async def test_async_read_through_runs_off_the_event_loop(self):
+        l2 = RecordingDiskCache(self.path)
+        cache = CacheManager(l2=l2)
+        try:
+            self.assertEqual(await cache.get_cached_async("geocode", "katy, tx"), {"lat": 29.78, "lng": -95.82})
+            self.assertIsNot(l2.read_threads[0], threading.current_thread())
+            self.assertEqual(cache.get_diagnostics()["geocode"]["l2_hits"], 1)
+
+            # Promoted into memory, so the next read doesn't touch disk
+            await cache.get_cached_async("geocode", "katy, tx")
+            self.assertEqual(len(l2.read_threads), 1)
+            self.assertIsNone(await cache.get_cached_async("geocode", "orlando, fl"))
+            self.assertEqual(cache.get_diagnostics()["geocode"]["misses"], 1)
+        finally:
+            cache.close()
+
+    async def test_warm_from_l2_loads_recent_entries(self):
+        cache = CacheManager(l2=DiskCache(self.path))
+        try:
+            self.assertEqual(cache.get_cache_size(), {})
+            self.assertEqual(cache.warm_from_l2(), 1)
+            self.assertEqual(cache.get_cached("geocode", "katy, tx")["lat"], 29.78)
+        finally:
+            cache.close()
+
+class CacheManagerLimitsTest(unittest.TestCase):
+    def setUp(self):
+        self.now = 1000.0
+        patch = mock.patch.object(time, "time", lambda: self.now)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = CacheManager(max_entries=2)
+        cache.set_cached("geocode", "a", 1)
+        cache.set_cached("geocode", "b", 2)
+        # Reading "a" makes "b" the least recently used
+        self.assertEqual(cache.get_cached("geocode", "a"), 1)
+        cache.set_cached("geocode", "c", 3)
+
+        self.assertIsNone(cache.get_cached("geocode", "b"))
+        self.assertEqual(cache.get_cached("geocode", "a"), 1)
+        self.assertEqual(cache.get_cache_size()["geocode"]["entries"], 2)
+        self.assertEqual(cache.get_cache_size()["geocode"]["evictions"], 1)
+
+    def test_byte_limit_evicts_but_keeps_the_newest_entry(self):
+        cache = CacheManager(category_limits={"places": {"max_bytes": 1}})
+        cache.set_cached("places", "small", "x")
+        cache.set_cached("places", "large", "x" * 1000)
+
+        self.assertIsNone(cache.get_cached("places", "small"))
+        self.assertEqual(cache.get_cached("places", "large"), "x" * 1000)
+        # Other categories use the unbounded default
+        cache.set_cached("geocode", "a", "x" * 1000)
+        cache.set_cached("geocode", "b", "x" * 1000)
+        self.assertEqual(cache.get_cache_size()["geocode"]["entries"], 2)
+
+    def test_entries_expire_after_their_category_ttl(self):
+        cache = CacheManager(ttl=3600, category_ttls={"weather": 60})
+        cache.set_cached("weather", "cell", "sunny")
+        cache.set_cached("geocode", "katy, tx", "29.78,-95.82")
+
+        self.now += 61
+        self.assertIsNone(cache.get_cached("weather", "cell"))
+        self.assertEqual(cache.get_cached("geocode", "katy, tx"), "29.78,-95.82")
+        self.assertEqual(cache.get_cache_size()["weather"]["entries"], 0)
+
+    def test_sweep_removes_only_expired_entries(self):
+        cache = CacheManager(ttl=100)
+        cache.set_cached("geocode", "old", 1)
+        self.now += 50
+        cache.set_cached("geocode", "new", 2)
+        self.now += 60
+
+        self.assertEqual(cache.sweep_expired(), 1)
+        self.assertEqual(cache.get_cache_size()["geocode"]["entries"], 1)
+        self.assertEqual(cache.get_cached("geocode", "new"), 2)
+
+class CacheManagerDiagnosticsTest(unittest.TestCase):
+    def test_hits_misses_and_hit_rate_per_category(self):
+        cache = CacheManager()
+        cache.set_cached("geocode", "katy, tx", 1)
+        cache.get_cached("geocode", "katy, tx")
+        cache.get_cached("geocode", "katy, tx")
+        cache.get_cached("geocode", "houston, tx")
+        cache.get_cached("weather", "cell")
+
+        diagnostics = cache.get_diagnostics()
+        self.assertEqual(diagnostics["geocode"]["entries"], 1)
+        self.assertEqual((diagnostics["geocode"]["hits"], diagnostics["geocode"]["misses"]), (2, 1))
+        self.assertEqual(diagnostics["geocode"]["hit_rate"], 0.667)
+        self.assertEqual(diagnostics["weather"]["hit_rate"], 0.0)
+        # Summaries never include cached values
+        self.assertNotIn("value", diagnostics["geocode"])
+
+    def test_summary_is_not_built_unless_sampled_and_logged(self):
+        with mock.patch.object(CacheManager, "get_diagnostics") as get_diagnostics:
+            CacheManager().get_cached("geocode", "katy, tx")
+            get_diagnostics.assert_not_called()
+
+            # Sampled, but DEBUG is off, so the lazy summary is never formatted
+            sampled = CacheManager(diagnostics_sample_rate=1.0)
+            with self.assertNoLogs("utils.cache_manager", logging.INFO):
+                sampled.get_cached("geocode", "katy, tx")
+            get_diagnostics.assert_not_called()
+
+            self.assertEqual(str(_LazyDiagnostics(sampled)), str(get_diagnostics.return_value))
+            get_diagnostics.assert_called_once()
+
+if __name__ == "__main__":
+    unittest.main()
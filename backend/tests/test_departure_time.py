@@ -0,0 +1,65 @@
+import os
+import unittest
+from datetime import datetime, timezone
+from unittest import mock
+from zoneinfo import ZoneInfo
+
+from utils.trip_cache import has_utc_offset, parse_departure_time
+
+CHICAGO = ZoneInfo("America/Chicago")
+
+class ParseDepartureTimeTest(unittest.TestCase):
+    def test_local_time_is_read_in_the_given_zone(self):
+        expected = datetime(2025, 5, 1, 5, 0, tzinfo=CHICAGO).timestamp()
+        self.assertEqual(parse_departure_time("2025-05-01 05:00", CHICAGO), expected)
+
+    def test_local_time_without_a_zone_is_utc_not_the_server_zone(self):
+        expected = datetime(2025, 5, 1, 5, 0, tzinfo=timezone.utc).timestamp()
+        with mock.patch.dict(os.environ, {"TZ": "Asia/Tokyo"}):
+            self.assertEqual(parse_departure_time("2025-05-01 05:00"), expected)
+
+    def test_explicit_offset_wins_over_the_zone(self):
+        expected = datetime(2025, 5, 1, 10, 0, tzinfo=timezone.utc).timestamp()
+        self.assertEqual(parse_departure_time("2025-05-01T05:00-05:00", ZoneInfo("Asia/Tokyo")), expected)
+
+    def test_has_utc_offset(self):
+        self.assertTrue(has_utc_offset("now"))
+        self.assertTrue(has_utc_offset("2025-05-01T05:00+02:00"))
+        self.assertFalse(has_utc_offset("2025-05-01 05:00"))
+
+class RouteForecastTimeZoneTest(unittest.IsolatedAsyncioTestCase):
+    async def test_arrivals_use_the_origin_and_point_zones(self):
+        with mock.patch.dict(os.environ, {"WEATHER_API_KEY": "test", "GOOGLE_MAPS_API_KEY": "test"}):
+            from agents import weather_agent
+            agent = weather_agent.WeatherAgent()
+
+        start = int(datetime(2025, 5, 1, 0, 0, tzinfo=timezone.utc).timestamp())
+
+        async def forecast_weather(query, days):
+            return {
+                "location": {"name": "Katy", "region": "Texas", "country": "USA", "tz_id": "America/Chicago"},
+                "forecast": {"forecastday": [{"hour": [
+                    {"time_epoch": start + h * 3600, "time": datetime.fromtimestamp(start + h * 3600, CHICAGO).strftime("%Y-%m-%d %H:%M"),
+                     "temp_f": 70, "temp_c": 21, "condition": {"text": "Sunny"}, "humidity": 50, "wind_mph": 5, "wind_kph": 8}
+                    for h in range(48)
+                ]}]}
+            }
+
+        route = {"legs": [{
+            "start_address": "Katy, TX", "end_address": "Houston, TX",
+            "start_location": {"lat": 29.78, "lng": -95.82}, "end_location": {"lat": 29.76, "lng": -95.36},
+            "distance_meters": 45000, "duration_seconds": 2 * 3600
+        }], "coordinates": []}
+        with mock.patch.object(weather_agent.cache_manager, "get_cached_async", mock.AsyncMock(return_value=None)), \
+                mock.patch.object(weather_agent.cache_manager, "set_cached"), \
+                mock.patch.object(weather_agent.upstream_client, "forecast_weather", forecast_weather):
+            weather = await agent.get_route_forecast(["Katy, TX", "Houston, TX"], route, "2025-05-01 05:00")
+
+        # 05:00 in Chicago, not in the server's zone; arrival two hours later, shown in local time
+        self.assertEqual(weather["Katy, TX"]["arrival_time"], "2025-05-01 05:00")
+        self.assertEqual(weather["Katy, TX"]["forecast_time"], "2025-05-01 05:00")
+        self.assertEqual(weather["Houston, TX"]["arrival_time"], "2025-05-01 07:00")
+        self.assertEqual(weather["Houston, TX"]["forecast_time"], "2025-05-01 07:00")
+
+if __name__ == "__main__":
+    unittest.main()
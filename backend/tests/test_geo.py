@@ -0,0 +1,103 @@
+import unittest
+
+from utils.geo import (
+    cumulative_route_length, distances_to_polyline, haversine_distance, haversine_pairwise,
+    haversine_to_points, resample_by_distance, MAX_SIMPLIFY_ZOOM, simplify_for_zoom, simplify_polyline
+)
+
+# Due north along one meridian, about 1.1 km between vertices and 111 km in all
+NORTHBOUND = [[30.0 + i * 0.01, -90.0] for i in range(101)]
+
+# Northbound with a small east-west wiggle (about 100 m) at every vertex
+WIGGLY = [[30.0 + i * 0.01, -90.0 + (0.001 if i % 2 else 0.0)] for i in range(101)]
+
+CITIES = [[29.7604, -95.3698], [29.9511, -90.0715], [30.4213, -87.2169], [47.6062, -122.3321], [-33.8688, 151.2093]]
+
+class ResampleByDistanceTest(unittest.TestCase):
+    def test_points_are_evenly_spaced_along_the_route(self):
+        samples = resample_by_distance(NORTHBOUND, 10000)
+
+        self.assertEqual(samples[0], (30.0, -90.0))
+        gaps = [haversine_distance(a, b) for a, b in zip(samples, samples[1:])]
+        # 0 to 110 km; the last kilometer is under half a step, so the end is not added
+        self.assertEqual(len(samples), 12)
+        for gap in gaps:
+            self.assertAlmostEqual(gap, 10000, delta=1)
+
+    def test_sparse_and_dense_vertices_sample_alike(self):
+        sparse = [NORTHBOUND[0], NORTHBOUND[-1]]
+        self.assertEqual(len(resample_by_distance(sparse, 10000)), len(resample_by_distance(NORTHBOUND, 10000)))
+
+    def test_skip_fraction_skips_the_start(self):
+        samples = resample_by_distance(NORTHBOUND, 10000, skip_fraction=0.5)
+        self.assertAlmostEqual(samples[0][0], 30.5, places=6)
+        self.assertGreater(min(lat for lat, _ in samples), 30.49)
+
+    def test_end_is_covered_when_the_last_step_falls_well_short(self):
+        samples = resample_by_distance(NORTHBOUND, 30000)
+        # 0, 30, 60 and 90 km, then the end at 111 km since 21 km is over half a step
+        self.assertEqual(len(samples), 5)
+        self.assertEqual(samples[-1], (31.0, -90.0))
+
+    def test_empty_and_single_point_routes(self):
+        self.assertEqual(resample_by_distance([], 10000), [])
+        self.assertEqual(resample_by_distance([[30.0, -90.0]], 10000), [(30.0, -90.0)])
+        self.assertEqual(resample_by_distance(NORTHBOUND, 0), [(30.0, -90.0)])
+
+class VectorizedDistanceTest(unittest.TestCase):
+    def test_one_to_many_matches_the_scalar_formula(self):
+        distances = haversine_to_points(CITIES[0], CITIES)
+        for city, distance in zip(CITIES, distances):
+            self.assertAlmostEqual(distance, haversine_distance(CITIES[0], city), delta=0.01)
+
+    def test_pairwise_matches_the_scalar_formula(self):
+        distances = haversine_pairwise(CITIES[:-1], CITIES[1:])
+        for a, b, distance in zip(CITIES, CITIES[1:], distances):
+            self.assertAlmostEqual(distance, haversine_distance(a, b), delta=0.01)
+
+    def test_cumulative_route_length(self):
+        lengths = cumulative_route_length(NORTHBOUND)
+        self.assertEqual(lengths[0], 0)
+        self.assertAlmostEqual(lengths[-1], haversine_distance(NORTHBOUND[0], NORTHBOUND[-1]), delta=0.01)
+        self.assertEqual(len(cumulative_route_length([])), 0)
+
+    def test_distance_to_polyline_is_measured_to_segments(self):
+        # 0.01 degrees of longitude east of the route, between vertices
+        points = [[30.505, -89.99], NORTHBOUND[50], [29.9, -90.0]]
+        distances = distances_to_polyline(points, NORTHBOUND)
+
+        self.assertAlmostEqual(distances[0], haversine_distance((30.505, -89.99), (30.505, -90.0)), delta=1)
+        self.assertAlmostEqual(distances[1], 0, delta=0.01)
+        # Past the start of the route, the nearest point is the first vertex
+        self.assertAlmostEqual(distances[2], haversine_distance((29.9, -90.0), NORTHBOUND[0]), delta=1)
+
+    def test_distance_to_degenerate_polylines(self):
+        self.assertEqual(distances_to_polyline([[30.0, -90.0]], []).tolist(), [float("inf")])
+        self.assertAlmostEqual(distances_to_polyline([CITIES[0]], [CITIES[1]])[0], haversine_distance(CITIES[0], CITIES[1]), delta=0.01)
+        self.assertEqual(len(distances_to_polyline([], NORTHBOUND)), 0)
+
+class SimplifyPolylineTest(unittest.TestCase):
+    def test_straight_route_keeps_only_its_ends(self):
+        self.assertEqual(simplify_polyline(NORTHBOUND, 1), [NORTHBOUND[0], NORTHBOUND[-1]])
+
+    def test_deviations_over_the_tolerance_are_kept(self):
+        self.assertEqual(simplify_polyline(WIGGLY, 10), WIGGLY)
+        self.assertEqual(simplify_polyline(WIGGLY, 1000), [WIGGLY[0], WIGGLY[-1]])
+
+    def test_short_routes_and_zero_tolerance_are_unchanged(self):
+        self.assertEqual(simplify_polyline(NORTHBOUND[:2], 1000), NORTHBOUND[:2])
+        self.assertEqual(simplify_polyline(WIGGLY, 0), WIGGLY)
+
+    def test_lower_zooms_keep_fewer_points(self):
+        counts = [len(simplify_for_zoom(WIGGLY, zoom)) for zoom in (5, 10, 15)]
+        self.assertLessEqual(counts[0], counts[1])
+        self.assertLess(counts[1], counts[2])
+        for zoom in (5, 10, 15):
+            simplified = simplify_for_zoom(WIGGLY, zoom)
+            self.assertEqual((simplified[0], simplified[-1]), (WIGGLY[0], WIGGLY[-1]))
+
+    def test_max_zoom_returns_every_point(self):
+        self.assertEqual(simplify_for_zoom(NORTHBOUND, MAX_SIMPLIFY_ZOOM), NORTHBOUND)
+
+if __name__ == "__main__":
+    unittest.main()
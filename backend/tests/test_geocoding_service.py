@@ -0,0 +1,51 @@
+import asyncio
+import unittest
+
+from utils.cache_manager import CacheManager
+from utils.geocoding_service import GeocodingService
+
+class FakeGeocoder:
+    """ Geocoding API stand-in that answers after a delay and counts calls """
+    def __init__(self, delay=0.01):
+        self.delay = delay
+        self.calls = 0
+
+    async def geocode(self, address):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return [{"geometry": {"location": {"lat": 29.78, "lng": -95.82}}, "formatted_address": "Katy, TX, USA"}]
+
+class GeocodingServiceTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.client = FakeGeocoder()
+        self.service = GeocodingService(client=self.client, cache=CacheManager())
+
+    async def test_concurrent_lookups_share_one_call(self):
+        results = await self.service.geocode_many(["Katy, TX", " katy,  tx", "Katy, TX"])
+        self.assertEqual(self.client.calls, 1)
+        self.assertEqual(len(results), 2)
+        self.assertTrue(all(result["lat"] == 29.78 for result in results.values()))
+        self.assertEqual(self.service.get_stats()["coalesced_calls"], 1)
+
+    async def test_results_are_cached(self):
+        await self.service.geocode("Katy, TX")
+        await self.service.geocode("Katy, TX")
+        self.assertEqual(self.client.calls, 1)
+
+    async def test_cancelled_leader_does_not_fail_followers(self):
+        self.client.delay = 0.05
+        leader = asyncio.create_task(self.service.geocode("Katy, TX"))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(self.service.geocode("Katy, TX"))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+
+        result = await follower
+        self.assertIsNotNone(result)
+        self.assertEqual(result["formatted_address"], "Katy, TX, USA")
+        self.assertEqual(self.client.calls, 2)
+        with self.assertRaises(asyncio.CancelledError):
+            await leader
+
+if __name__ == "__main__":
+    unittest.main()
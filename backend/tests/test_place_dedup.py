@@ -0,0 +1,57 @@
+import unittest
+
+from conftest import places_result as place
+from utils.place_dedup import PlaceDeduplicator, normalize, trigrams
+
+class PlaceDeduplicatorTest(unittest.TestCase):
+    def test_similar_names_nearby_merge(self):
+        deduplicator = PlaceDeduplicator()
+        kept = place("Cafe du Monde", 29.9575, -90.0618)
+        deduplicator.add(kept)
+        self.assertIs(deduplicator.find(place("Café Du Monde!", 29.9576, -90.0619)), kept)
+        self.assertIsNone(deduplicator.find(place("Café Du Monde", 29.9700, -90.0618)))  # ~1.4 km away
+
+    def test_different_names_nearby_are_kept(self):
+        deduplicator = PlaceDeduplicator()
+        self.assertEqual(len(deduplicator.dedupe([
+            place("Starbucks", 29.95, -90.06),
+            place("Starbucks Coffee", 29.95, -90.06),  # ratio 0.72, under the 0.8 threshold
+            place("Audubon Aquarium", 29.9501, -90.0601)
+        ])), 3)
+
+    def test_same_place_id_always_merges(self):
+        deduplicator = PlaceDeduplicator()
+        deduplicator.add(place("Audubon Zoo", 29.92, -90.13, place_id="abc"))
+        self.assertFalse(deduplicator.add(place("Zoo", 40.0, -70.0, place_id="abc")))
+        self.assertEqual(deduplicator.merged, 1)
+
+    def test_neighbor_columns_widen_at_high_latitude(self):
+        deduplicator = PlaceDeduplicator()
+        # 0.0025 degrees of longitude is ~100 m at 69N but spans several 150 m grid columns
+        kept = place("Polar Museum", 69.6492, 18.9553)
+        deduplicator.add(kept)
+        self.assertIs(deduplicator.find(place("Polar Museum", 69.6492, 18.9578)), kept)
+
+    def test_removed_place_no_longer_matches(self):
+        deduplicator = PlaceDeduplicator()
+        kept = place("Jackson Square", 29.9574, -90.0629, place_id="js")
+        deduplicator.add(kept)
+        deduplicator.remove(kept)
+        self.assertIsNone(deduplicator.find(place("Jackson Square", 29.9574, -90.0629, place_id="js")))
+        self.assertTrue(deduplicator.add(place("Jackson Square", 29.9574, -90.0629)))
+
+    def test_remove_matches_copies_of_the_kept_place(self):
+        deduplicator = PlaceDeduplicator()
+        deduplicator.add(place("Jackson Square", 29.9574, -90.0629, place_id="js"))
+        deduplicator.add(place("French Market", 29.9611, -90.0572))
+        deduplicator.remove(place("Jackson Square", 29.9574, -90.0629, place_id="js"))
+        deduplicator.remove(place("French Market", 29.9611, -90.0572))
+        self.assertTrue(deduplicator.add(place("Jackson Square", 29.9574, -90.0629, place_id="js")))
+        self.assertTrue(deduplicator.add(place("French Market", 29.9611, -90.0572)))
+
+    def test_trigrams_cover_short_names(self):
+        self.assertEqual(normalize(" Joe's Bar! "), "joes bar")
+        self.assertEqual(trigrams("ab"), {"  a", " ab", "ab "})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+import asyncio
+import json
+import unittest
+
+from conftest import places_result
+from utils.cache_manager import CacheManager
+from utils.place_ranker import PlaceRanker
+
+def place(place_id, rating):
+    return places_result(place_id.title(), place_id=place_id, rating=rating)
+
+CANDIDATES = {
+    "hotels": [place("inn", 3.0), place("lodge", 4.5), place("motel", 4.0)],
+    "restaurants": [place("diner", 4.8), place("cafe", 4.1)]
+}
+
+class FakeChat:
+    """ Answers chat completions with a fixed ranking, optionally after a delay """
+    def __init__(self, rankings, delay=0.0):
+        self.rankings = rankings
+        self.delay = delay
+        self.calls = 0
+
+    async def chat_completion(self, messages, model=None, json_output=False):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return json.dumps({"rankings": self.rankings})
+
+def ids(ranked):
+    return {category: [p["place_id"] for p in places] for category, places in ranked.items()}
+
+class PlaceRankerTest(unittest.IsolatedAsyncioTestCase):
+    def ranker(self, chat, deadline=1.0):
+        return PlaceRanker(client=chat, cache=CacheManager(), model="test", deadline=deadline)
+
+    async def test_one_request_ranks_every_category(self):
+        chat = FakeChat({"hotels": [2, 0, 1], "restaurants": [1, 0]})
+        ranked = await self.ranker(chat).rank(CANDIDATES, ["museum"])
+        self.assertEqual(chat.calls, 1)
+        self.assertEqual(ids(ranked), {"hotels": ["motel", "inn", "lodge"], "restaurants": ["cafe", "diner"]})
+
+    async def test_bad_repeated_and_missing_indices(self):
+        # 7 is out of range, "0" is not an int, 2 repeats; lodge is left out and goes last
+        chat = FakeChat({"hotels": [2, 7, "0", 2, 0]})
+        ranked = await self.ranker(chat).rank(CANDIDATES, limits={"restaurants": 1})
+        self.assertEqual(ids(ranked), {"hotels": ["motel", "inn", "lodge"], "restaurants": ["diner"]})
+
+    async def test_cached_ranking_applies_to_reordered_candidates(self):
+        chat = FakeChat({"hotels": [2, 0, 1], "restaurants": [1, 0]})
+        ranker = self.ranker(chat)
+        first = await ranker.rank(CANDIDATES, ["park", "zoo"])
+        reordered = {category: list(reversed(places)) for category, places in CANDIDATES.items()}
+        second = await ranker.rank(reordered, ["zoo", "park"])
+        self.assertEqual(chat.calls, 1)
+        self.assertEqual(ids(second), ids(first))
+
+    async def test_missed_deadline_falls_back_to_rating_order(self):
+        ranker = self.ranker(FakeChat({"hotels": [0, 1, 2]}, delay=0.2), deadline=0.05)
+        ranked = await ranker.rank(CANDIDATES)
+        self.assertEqual(ids(ranked), {"hotels": ["lodge", "motel", "inn"], "restaurants": ["diner", "cafe"]})
+        self.assertEqual(ranker.fallbacks, 1)
+
+    async def test_first_callers_deadline_does_not_cancel_the_shared_call(self):
+        chat = FakeChat({"hotels": [0, 1, 2], "restaurants": [1, 0]}, delay=0.1)
+        ranker = self.ranker(chat)
+        hurried, patient = await asyncio.gather(
+            ranker.rank(CANDIDATES, deadline=0.02),
+            ranker.rank(CANDIDATES, deadline=1.0)
+        )
+        self.assertEqual(ids(hurried)["hotels"], ["lodge", "motel", "inn"])
+        self.assertEqual(ids(patient)["hotels"], ["inn", "lodge", "motel"])
+        self.assertEqual(chat.calls, 1)
+
+    async def test_ranking_that_outlives_its_caller_is_cached(self):
+        chat = FakeChat({"hotels": [0, 1, 2], "restaurants": [1, 0]}, delay=0.05)
+        ranker = self.ranker(chat, deadline=0.01)
+        await ranker.rank(CANDIDATES)
+        await asyncio.sleep(0.1)
+        ranked = await ranker.rank(CANDIDATES)
+        self.assertEqual(ids(ranked)["hotels"], ["inn", "lodge", "motel"])
+        self.assertEqual(chat.calls, 1)
+
+    async def test_cancelled_shared_call_falls_back(self):
+        chat = FakeChat({"hotels": [0, 1, 2]}, delay=10)
+        ranker = self.ranker(chat)
+        waiting = asyncio.create_task(ranker.rank(CANDIDATES))
+        await asyncio.sleep(0.01)
+        # Cancel the model call itself, not the caller waiting on it
+        for task in asyncio.all_tasks():
+            if task is not waiting and task is not asyncio.current_task():
+                task.cancel()
+        ranked = await waiting
+        self.assertEqual(ids(ranked)["hotels"], ["lodge", "motel", "inn"])
+        self.assertEqual(ranker.fallbacks, 1)
+
+    async def test_cancelling_the_caller_still_cancels_it(self):
+        ranker = self.ranker(FakeChat({"hotels": [0, 1, 2]}, delay=10))
+        waiting = asyncio.create_task(ranker.rank(CANDIDATES))
+        await asyncio.sleep(0.01)
+        waiting.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await waiting
+        self.assertEqual(ranker.fallbacks, 0)
+
+if __name__ == "__main__":
+    unittest.main()
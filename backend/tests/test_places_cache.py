@@ -0,0 +1,70 @@
+import unittest
+
+from conftest import places_result
+from utils.cache_manager import CacheManager
+from utils.geo import haversine_to_points
+from utils.places_cache import PLACES_PAGE_SIZE, PlacesTileCache
+
+def place(i, lat, lng):
+    return places_result(f"Place {i}", lat, lng, place_id=f"p{i}")
+
+class FakePlaces:
+    """ Nearby Search over a fixed set of places, returning at most one page, nearest first """
+
+    def __init__(self, places):
+        self.places = places
+        self.calls = []
+
+    async def __call__(self, location, type, radius):
+        self.calls.append((location, radius))
+        points = [(p["geometry"]["location"]["lat"], p["geometry"]["location"]["lng"]) for p in self.places]
+        distances = haversine_to_points(location, points) if points else []
+        found = sorted((d, i) for i, d in enumerate(distances) if d <= radius)
+        return {"results": [self.places[i] for _, i in found[:PLACES_PAGE_SIZE]]}
+
+class PlacesTileCacheTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.cache = CacheManager(category_ttls={"places_tiles": 3600, "places_tiles_empty": 60})
+        self.tiles = PlacesTileCache(self.cache)
+
+    async def test_searches_in_a_sparse_cell_share_one_fetch(self):
+        fetch = FakePlaces([place(i, 30.0 + i * 0.001, -97.0) for i in range(5)])
+        first = await self.tiles.search(fetch, (30.001, -97.0), "museum", 5000)
+        second = await self.tiles.search(fetch, (30.002, -97.001), "museum", 5000)
+        self.assertEqual(len(fetch.calls), 1)
+        self.assertEqual(len(first["results"]), 5)
+        self.assertEqual(len(second["results"]), 5)
+
+    async def test_dense_cell_is_answered_from_a_shared_subtile(self):
+        # Far more places than one page, spread over the whole cell
+        fetch = FakePlaces([place(i, 30.0 + (i % 20) * 0.002, -97.0 + (i // 20) * 0.002) for i in range(400)])
+        location = (30.02, -96.98)
+        direct = await fetch(location=location, type="museum", radius=1000)
+        fetch.calls.clear()
+
+        first = await self.tiles.search(fetch, location, "museum", 1000)
+        self.assertEqual(len(fetch.calls), 2)  # the cell, then its sub-tile
+        shared = {p["place_id"] for p in first["results"]} & {p["place_id"] for p in direct["results"]}
+        self.assertGreaterEqual(len(shared), 15)
+
+        # A nearby search in the same sub-tile is answered without going upstream
+        await self.tiles.search(fetch, (30.0201, -96.9799), "museum", 1000)
+        self.assertEqual(len(fetch.calls), 2)
+        stats = self.tiles.get_stats()
+        self.assertEqual(stats["dense_searches"], 2)
+        self.assertEqual(stats["cells_fetched"], 2)
+        self.assertEqual(stats["cells_reused"], 1)
+        self.assertEqual(stats["reuse_rate"], 0.333)
+
+    async def test_empty_results_use_the_short_lived_category(self):
+        fetch = FakePlaces([])
+        result = await self.tiles.search(fetch, (30.0, -97.0), "zoo", 5000)
+        self.assertEqual(result, {"results": []})
+        self.assertFalse(self.cache.cache.get("places_tiles"))
+        self.assertEqual(len(self.cache.cache.get("places_tiles_empty", {})), 1)
+
+        await self.tiles.search(fetch, (30.0, -97.0), "zoo", 5000)
+        self.assertEqual(len(fetch.calls), 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import asyncio
+import unittest
+
+from utils.rate_limiter import AdaptiveConcurrencyLimit, RateLimitedCallError, RateLimiter
+
+class Throttled(Exception):
+    pass
+
+FAMILY_LIMITS = {"places_nearby": {"upstream": "google", "rate": 1000.0, "burst": 1000, "max_concurrency": 16}}
+UPSTREAM_LIMITS = {"google": {"rate": 1000.0, "burst": 1000}}
+
+def limiter(max_retries=3):
+    return RateLimiter(
+        is_throttled=lambda e: isinstance(e, Throttled),
+        upstream_limits=UPSTREAM_LIMITS,
+        family_limits=FAMILY_LIMITS,
+        max_retries=max_retries,
+        base_delay=0.001,
+        max_delay=0.005
+    )
+
+class AdaptiveConcurrencyLimitTest(unittest.TestCase):
+    def test_throttles_from_one_round_trip_halve_once(self):
+        limit = AdaptiveConcurrencyLimit(16)
+        sent_at = limit.generation
+        for _ in range(10):
+            limit.on_throttle(sent_at)
+        self.assertEqual(limit.limit, 8)
+
+    def test_throttles_from_later_round_trips_halve_again(self):
+        limit = AdaptiveConcurrencyLimit(16, min_limit=2)
+        for expected in (8, 4, 2, 2):
+            limit.on_throttle(limit.generation)
+            self.assertEqual(limit.limit, expected)
+
+    def test_successes_recover_the_limit(self):
+        limit = AdaptiveConcurrencyLimit(4)
+        limit.on_throttle(limit.generation)
+        for _ in range(6):
+            limit.on_success()
+        self.assertEqual(limit.limit, 4)
+
+class RateLimiterTest(unittest.IsolatedAsyncioTestCase):
+    async def test_burst_of_throttles_halves_the_limit_once(self):
+        rate_limiter = limiter()
+        attempts = {}
+
+        async def call(i):
+            async def request():
+                attempts[i] = attempts.get(i, 0) + 1
+                await asyncio.sleep(0.01)
+                if attempts[i] == 1:
+                    raise Throttled()
+                return i
+            return await rate_limiter.run("places_nearby", request)
+
+        # Sixteen calls in flight together are all throttled once
+        results = await asyncio.gather(*(call(i) for i in range(16)))
+        self.assertEqual(results, list(range(16)))
+        stats = rate_limiter.get_stats()["places_nearby"]
+        self.assertEqual(stats["throttled"], 16)
+        self.assertGreaterEqual(stats["concurrency_limit"], 8)
+
+    async def test_gives_up_after_every_retry(self):
+        rate_limiter = limiter(max_retries=2)
+
+        async def request():
+            raise Throttled()
+
+        with self.assertRaises(RateLimitedCallError) as raised:
+            await rate_limiter.run("places_nearby", request)
+        self.assertEqual(raised.exception.attempts, 3)
+
+    async def test_other_errors_are_not_retried(self):
+        rate_limiter = limiter()
+        calls = []
+
+        async def request():
+            calls.append(1)
+            raise ValueError("bad request")
+
+        with self.assertRaises(ValueError):
+            await rate_limiter.run("places_nearby", request)
+        self.assertEqual(len(calls), 1)
+
+if __name__ == "__main__":
+    unittest.main()
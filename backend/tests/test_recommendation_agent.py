@@ -0,0 +1,64 @@
+import os
+import unittest
+from unittest import mock
+
+from agents import recommendation_agent
+from agents.recommendation_agent import RecommendationAgent
+from conftest import places_result
+
+GEOCODES = {
+    "New Orleans, LA": {"lat": 29.95, "lng": -90.07},
+    "Pensacola, FL": {"lat": 30.42, "lng": -87.22},
+}
+
+def search_results(label, count):
+    return {"results": [places_result(f"{label} {i}", rating=round(5 - i * 0.1, 1), place_id=f"{label}-{i}") for i in range(count)]}
+
+class RecommendationAgentTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        patches = [
+            mock.patch.dict(os.environ, {"GOOGLE_MAPS_API_KEY": "test-key"}),
+            mock.patch.object(recommendation_agent.geocoding_service, "geocode_many", mock.AsyncMock(return_value=GEOCODES)),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.agent = RecommendationAgent(rank_with_ai=False)
+        self.failing_location = None
+
+    async def search_nearby(self, location, coords, label, place_type, semaphore, radius=5000):
+        if location == self.failing_location and label == "hotels":
+            raise RuntimeError("places search failed")
+        return search_results(label, 12)
+
+    async def get_recommendations(self, preferences):
+        completed = {}
+        with mock.patch.object(self.agent, "_search_nearby", self.search_nearby):
+            recommendations = await self.agent.get_recommendations(
+                list(GEOCODES), preferences, on_location=lambda location, sections: completed.update({location: sections})
+            )
+        return recommendations, completed
+
+    async def test_each_section_uses_its_own_limit(self):
+        limits = {"hotels": 2, "restaurants": 4, "attractions": 5}
+        with mock.patch.dict(recommendation_agent.SECTION_LIMITS, limits):
+            recommendations, _ = await self.get_recommendations(["museum", "zoo"])
+
+        sections = recommendations["New Orleans, LA"]
+        self.assertEqual(len(sections["hotels"]), 2)
+        self.assertEqual(len(sections["restaurants"]), 4)
+        # Three per attraction type, then cut to the best five by rating
+        self.assertEqual([place["name"] for place in sections["attractions"]], ["museum 0", "zoo 0", "museum 1", "zoo 1", "museum 2"])
+
+    async def test_failing_location_keeps_the_others(self):
+        self.failing_location = "New Orleans, LA"
+        recommendations, completed = await self.get_recommendations(["museum"])
+
+        self.assertEqual(recommendations["New Orleans, LA"]["error"], "places search failed")
+        self.assertEqual(len(recommendations["Pensacola, FL"]["hotels"]), recommendation_agent.SECTION_LIMITS["hotels"])
+        self.assertNotIn("error", recommendations["Pensacola, FL"])
+        # The failed location is still reported, so streamed trips don't wait on it
+        self.assertEqual(set(completed), set(GEOCODES))
+
+if __name__ == "__main__":
+    unittest.main()
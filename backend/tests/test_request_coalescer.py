@@ -0,0 +1,86 @@
+import asyncio
+import unittest
+
+from utils.request_coalescer import RequestCoalescer
+
+class RequestCoalescerTest(unittest.IsolatedAsyncioTestCase):
+    async def test_concurrent_callers_share_one_call(self):
+        coalescer = RequestCoalescer()
+        calls = 0
+
+        async def work():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return {"answer": 42}
+
+        results = await asyncio.gather(*(coalescer.run("key", work) for _ in range(5)))
+        self.assertEqual(calls, 1)
+        self.assertTrue(all(result is results[0] for result in results))
+        self.assertEqual(coalescer.get_stats(), {"leaders": 1, "coalesced": 4, "in_flight": 0})
+
+    async def test_different_keys_run_separately(self):
+        coalescer = RequestCoalescer()
+
+        async def work(value):
+            await asyncio.sleep(0.01)
+            return value
+
+        results = await asyncio.gather(coalescer.run("a", lambda: work(1)), coalescer.run("b", lambda: work(2)))
+        self.assertEqual(results, [1, 2])
+        self.assertEqual(coalescer.leaders, 2)
+
+    async def test_leader_exception_reaches_followers(self):
+        coalescer = RequestCoalescer()
+
+        async def work():
+            await asyncio.sleep(0.01)
+            raise ValueError("upstream failed")
+
+        results = await asyncio.gather(*(coalescer.run("key", work) for _ in range(3)), return_exceptions=True)
+        self.assertTrue(all(isinstance(result, ValueError) for result in results))
+        self.assertEqual(coalescer.get_stats()["in_flight"], 0)
+
+    async def test_cancelled_leader_does_not_cancel_followers(self):
+        coalescer = RequestCoalescer()
+        calls = 0
+
+        async def work():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return calls
+
+        leader = asyncio.create_task(coalescer.run("key", work))
+        await asyncio.sleep(0)
+        followers = [asyncio.create_task(coalescer.run("key", work)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+
+        results = await asyncio.gather(*followers)
+        with self.assertRaises(asyncio.CancelledError):
+            await leader
+        # One follower reran the work and the others joined it
+        self.assertEqual(calls, 2)
+        self.assertEqual(results, [2, 2, 2])
+        self.assertEqual(coalescer.get_stats()["in_flight"], 0)
+
+    async def test_cancelled_follower_does_not_cancel_leader(self):
+        coalescer = RequestCoalescer()
+
+        async def work():
+            await asyncio.sleep(0.02)
+            return "done"
+
+        leader = asyncio.create_task(coalescer.run("key", work))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(coalescer.run("key", work))
+        await asyncio.sleep(0)
+        follower.cancel()
+
+        self.assertEqual(await leader, "done")
+        with self.assertRaises(asyncio.CancelledError):
+            await follower
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import asyncio
+import unittest
+
+from utils.stage_scheduler import Stage, StageScheduler
+
+class StageSchedulerTest(unittest.IsolatedAsyncioTestCase):
+    async def test_independent_stages_run_concurrently_and_inputs_are_passed_on(self):
+        started = []
+
+        def stage(name, result, delay=0.02):
+            async def run(**inputs):
+                started.append(name)
+                await asyncio.sleep(delay)
+                return result(inputs) if callable(result) else result
+            return run
+
+        scheduler = StageScheduler([
+            Stage("attractions", stage("attractions", lambda inputs: f"near {inputs['route']}"), inputs=["route"]),
+            Stage("route", stage("route", "I-10")),
+            Stage("weather", stage("weather", "sunny")),
+        ])
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        results = await scheduler.run()
+
+        self.assertEqual(results, {"route": "I-10", "weather": "sunny", "attractions": "near I-10"})
+        self.assertLess(scheduler.order.index("route"), scheduler.order.index("attractions"))
+        self.assertEqual(started[-1], "attractions")
+        # Two rounds of 20 ms (route and weather together, then attractions), not three
+        self.assertLess(loop.time() - start, 0.055)
+        self.assertEqual(set(scheduler.timings), {"route", "weather", "attractions"})
+
+    async def test_timeouts_and_errors_use_the_fallbacks(self):
+        async def slow():
+            await asyncio.sleep(1)
+
+        async def broken():
+            raise RuntimeError("upstream down")
+
+        scheduler = StageScheduler([
+            Stage("weather", slow, timeout=0.01, on_timeout={"error": "timed out"}),
+            Stage("recommendations", broken, on_error={"error": "failed"}),
+        ])
+        self.assertEqual(await scheduler.run(), {"weather": {"error": "timed out"}, "recommendations": {"error": "failed"}})
+
+    async def test_result_waits_for_one_stage_only(self):
+        finished = asyncio.Event()
+
+        async def route():
+            return "route"
+
+        async def weather():
+            await finished.wait()
+            return "weather"
+
+        scheduler = StageScheduler([Stage("route", route), Stage("weather", weather)])
+        self.assertEqual(await scheduler.result("route"), "route")
+        finished.set()
+        self.assertEqual((await scheduler.run())["weather"], "weather")
+
+    async def test_cancel_stops_running_stages(self):
+        cancelled = asyncio.Event()
+
+        async def forever():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        scheduler = StageScheduler([Stage("weather", forever)])
+        scheduler.start()
+        await asyncio.sleep(0)
+        scheduler.cancel()
+        await asyncio.wait_for(cancelled.wait(), 1)
+
+    def test_bad_dependencies_are_rejected(self):
+        async def noop(**inputs):
+            return None
+
+        with self.assertRaises(ValueError):
+            StageScheduler([Stage("a", noop, inputs=["b"]), Stage("b", noop, inputs=["a"])])
+        with self.assertRaises(ValueError):
+            StageScheduler([Stage("a", noop, inputs=["missing"])])
+        with self.assertRaises(ValueError):
+            StageScheduler([Stage("a", noop), Stage("a", noop)])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+
+from conftest import route_attraction as place
+from utils.top_k import TopKAggregator
+
+def by_rating(place):
+    return (place["rating"],)
+
+def names(places):
+    return [p["name"] for p in places]
+
+class TopKAggregatorTest(unittest.TestCase):
+    def test_keeps_the_best_per_group_and_overall(self):
+        aggregator = TopKAggregator(per_group=2, total=3, key=by_rating)
+        for i, rating in enumerate([3.0, 4.5, 4.0, 2.0]):
+            aggregator.offer("museum", place(f"Museum {i}", rating, lng=-90.0 + i))
+        aggregator.offer("park", place("Park", 4.2, lng=-80.0))
+        self.assertTrue(aggregator.is_full("museum"))
+        self.assertFalse(aggregator.is_full("park"))
+        self.assertEqual(names(aggregator.results()), ["Museum 1", "Park", "Museum 2"])
+
+    def test_equal_keys_keep_the_first_offered(self):
+        aggregator = TopKAggregator(per_group=1, total=1, key=by_rating)
+        self.assertTrue(aggregator.offer("zoo", place("First Zoo", 4.0, lng=-90.0)))
+        self.assertFalse(aggregator.offer("zoo", place("Second Zoo", 4.0, lng=-80.0)))
+        self.assertEqual(names(aggregator.results()), ["First Zoo"])
+
+    def test_duplicates_of_kept_places_are_dropped(self):
+        aggregator = TopKAggregator(per_group=2, total=4, key=by_rating)
+        aggregator.offer("museum", place("City Museum", 4.0))
+        self.assertFalse(aggregator.offer("park", place("City Museum", 4.0, place_id="other")))
+        self.assertEqual(aggregator.duplicates, 1)
+
+    def test_evicted_place_no_longer_blocks_copies(self):
+        aggregator = TopKAggregator(per_group=1, total=2, key=by_rating)
+        self.assertTrue(aggregator.offer("museum", place("X", 3.0)))
+        self.assertTrue(aggregator.offer("museum", place("Y", 4.0, lng=-80.0)))
+        # X was evicted from museum, so it is free to be kept under park
+        self.assertTrue(aggregator.offer("park", place("X", 3.0)))
+        self.assertEqual(names(aggregator.results()), ["Y", "X"])
+        self.assertEqual(aggregator.duplicates, 0)
+
+    def test_can_change(self):
+        aggregator = TopKAggregator(per_group=2, total=2, key=by_rating)
+        aggregator.offer("museum", place("A", 4.0, lng=-90.0))
+        self.assertTrue(aggregator.can_change((1.0,)))
+        aggregator.offer("museum", place("B", 3.5, lng=-80.0))
+        self.assertFalse(aggregator.can_change((3.5,)))
+        self.assertTrue(aggregator.can_change((3.6,)))
+
+if __name__ == "__main__":
+    unittest.main()
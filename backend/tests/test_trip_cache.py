@@ -0,0 +1,49 @@
+import unittest
+
+from models import RouteRequest
+from utils.cache_manager import CacheManager
+from utils.trip_cache import TripResponseCache
+
+class TripCacheKeyTest(unittest.TestCase):
+    def setUp(self):
+        self.trip_cache = TripResponseCache(CacheManager(), bucket_seconds=3600)
+
+    def key(self, **fields):
+        request = RouteRequest(origin="Katy, TX", destination="Orlando, FL", **fields)
+        return self.trip_cache.make_key(request.canonical_key(exact_departure=False), request.departure_time)
+
+    def test_departures_in_the_same_bucket_share_a_key(self):
+        self.assertEqual(self.key(departure_time="2025-01-01 10:05"), self.key(departure_time="2025-01-01 10:50"))
+
+    def test_departures_in_different_buckets_do_not(self):
+        self.assertNotEqual(self.key(departure_time="2025-01-01 10:05"), self.key(departure_time="2025-01-01 11:05"))
+
+    def test_coalescer_key_keeps_the_exact_departure(self):
+        early = RouteRequest(origin="Katy, TX", destination="Orlando, FL", departure_time="2025-01-01 10:05")
+        late = RouteRequest(origin="Katy, TX", destination="Orlando, FL", departure_time="2025-01-01 10:10")
+        self.assertNotEqual(early.canonical_key(), late.canonical_key())
+
+class TripCacheSectionTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.trip_cache = TripResponseCache(CacheManager(), bucket_seconds=3600)
+
+    async def test_complete_sections_are_cached(self):
+        self.trip_cache.set_section("trip", "weather", {"Katy, TX": {"temperature": 70}})
+        self.trip_cache.set_section("trip", "route_attractions", [{"name": "Zoo"}])
+        self.assertEqual(set(await self.trip_cache.get_sections("trip")), {"weather", "route_attractions"})
+
+    async def test_error_results_are_not_cached(self):
+        self.trip_cache.set_section("trip", "weather", {"error": "Weather request failed"})
+        self.assertIsNone(await self.trip_cache.get_section("trip", "weather"))
+
+    async def test_sections_holding_an_error_are_not_cached(self):
+        self.trip_cache.set_section("trip", "weather", {"Katy, TX": {"temperature": 70}, "Mobile, AL": {"error": "timeout"}})
+        self.trip_cache.set_section("trip", "recommendations", {"Mobile, AL": {"error": "Recommendations failed"}})
+        self.assertEqual(await self.trip_cache.get_sections("trip"), {})
+
+    async def test_sections_the_producer_marks_degraded_are_not_cached(self):
+        self.trip_cache.set_section("trip", "route_attractions", [{"name": "Zoo"}], degraded=True)
+        self.assertIsNone(await self.trip_cache.get_section("trip", "route_attractions"))
+
+if __name__ == "__main__":
+    unittest.main()
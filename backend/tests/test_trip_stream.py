@@ -0,0 +1,95 @@
+import asyncio
+import unittest
+from unittest import mock
+
+import orchestrator
+from conftest import places_result
+from models import RouteRequest
+from utils.cache_manager import CacheManager
+from utils.trip_cache import TripResponseCache
+
+AQUARIUM = places_result("Audubon Aquarium", 29.9504, -90.0630, place_id="aq")
+# The same aquarium listed under another place_id, found again along the route
+AQUARIUM_COPY = places_result("Audubon Aquarium", 29.9505, -90.0631, place_id="aq-2")
+ZOO = places_result("Audubon Zoo", 29.9237, -90.1300, place_id="zoo")
+BEACH = places_result("Pensacola Beach", 30.3335, -87.1363, place_id="beach")
+SEASHORE = places_result("Gulf Islands National Seashore", 30.3260, -86.9900, place_id="seashore")
+
+class TripStreamTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.request = RouteRequest(origin="Katy, TX", waypoints=["New Orleans, LA"], destination="Pensacola, FL")
+        patches = [
+            mock.patch.object(orchestrator, "trip_cache", TripResponseCache(CacheManager())),
+            mock.patch.object(orchestrator, "fetch_route", self.fetch_route),
+            mock.patch.object(orchestrator, "fetch_weather", self.fetch_weather),
+            mock.patch.object(orchestrator, "fetch_recommendations", self.fetch_recommendations),
+            mock.patch.object(orchestrator, "fetch_route_attractions", self.fetch_route_attractions),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    async def fetch_route(self, request):
+        await asyncio.sleep(0.02)
+        return {"coordinates": [[29.78, -95.82], [30.33, -87.13]], "legs": []}
+
+    async def fetch_weather(self, request, on_stop=None, route=None):
+        weather = {stop: {"temperature": 70} for stop in ("Katy, TX", "New Orleans, LA", "Pensacola, FL")}
+        for stop, data in weather.items():
+            if on_stop:
+                on_stop(stop, data)
+        return weather
+
+    async def fetch_recommendations(self, request, on_location=None):
+        # The destination finishes before the waypoint, and repeats the waypoint's aquarium
+        pensacola = {"hotels": [], "restaurants": [], "attractions": [BEACH, AQUARIUM]}
+        new_orleans = {"hotels": [], "restaurants": [], "attractions": [AQUARIUM, ZOO]}
+        if on_location:
+            on_location("Pensacola, FL", pensacola)
+            await asyncio.sleep(0.01)
+            on_location("New Orleans, LA", new_orleans)
+        return {"New Orleans, LA": new_orleans, "Pensacola, FL": pensacola}
+
+    async def fetch_route_attractions(self, request, route, on_attraction=None, stats=None):
+        for attraction in (AQUARIUM_COPY, ZOO, SEASHORE):
+            if on_attraction:
+                on_attraction(attraction)
+        return [AQUARIUM_COPY, ZOO, SEASHORE]
+
+    async def test_events_follow_the_route_and_match_the_final_response(self):
+        events = []
+        response = await orchestrator._plan_trip(self.request, emit=events.append)
+        types = [event["type"] for event in events]
+
+        self.assertEqual(types[0], "route")
+        self.assertEqual(types[-1], "route_attractions")
+        self.assertEqual(types.count("weather"), 3)
+
+        streamed = {event["location"]: event["data"] for event in events if event["type"] == "recommendations"}
+        self.assertEqual(list(streamed), ["New Orleans, LA", "Pensacola, FL"])
+        self.assertEqual(streamed, response["recommendations"])
+        self.assertEqual([p["place_id"] for p in streamed["Pensacola, FL"]["attractions"]], ["beach"])
+        self.assertEqual(events[-1]["data"], response["route"][0]["route_attractions"])
+        self.assertEqual([p["place_id"] for p in events[-1]["data"]], ["seashore"])
+
+    async def test_cached_sections_are_replayed_in_the_same_order(self):
+        await orchestrator._plan_trip(self.request)
+        events = []
+        response = await orchestrator._plan_trip(self.request, emit=events.append)
+        self.assertIn("recommendations", response["cached_sections"])
+        self.assertEqual(events[0]["type"], "route")
+        streamed = {event["location"]: event["data"] for event in events if event["type"] == "recommendations"}
+        self.assertEqual(streamed, response["recommendations"])
+
+    async def test_locations_that_never_report_do_not_hold_back_the_rest(self):
+        stream = orchestrator.TripEventStream(lambda event: None, ["Nowhere", "Pensacola, FL"])
+        sent = []
+        stream.emit = sent.append
+        stream.send_route({})
+        stream.location_finished("Pensacola, FL", {"attractions": [BEACH]})
+        self.assertEqual([event["type"] for event in sent], ["route"])
+        stream.recommendations_finished()
+        self.assertEqual(sent[-1]["location"], "Pensacola, FL")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+import os
+import unittest
+from datetime import datetime, timezone
+from unittest import mock
+
+from utils.cache_manager import CacheManager
+
+START = int(datetime(2025, 5, 1, 0, 0, tzinfo=timezone.utc).timestamp())
+
+class WeatherAgentForecastTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        with mock.patch.dict(os.environ, {"WEATHER_API_KEY": "test", "GOOGLE_MAPS_API_KEY": "test"}):
+            from agents import weather_agent
+            self.agent = weather_agent.WeatherAgent(grid_degrees=0.1)
+        self.cache = CacheManager()
+        self.queries = []
+        patches = [
+            mock.patch.object(weather_agent, "cache_manager", self.cache),
+            mock.patch.object(weather_agent.upstream_client, "forecast_weather", self.forecast_weather),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    async def forecast_weather(self, query, days):
+        self.queries.append(query)
+        return {
+            "location": {"name": "Katy", "region": "Texas", "country": "USA", "tz_id": "UTC"},
+            "forecast": {"forecastday": [{"hour": [
+                {"time_epoch": START + h * 3600, "time": f"2025-05-01 {h:02d}:00",
+                 "temp_f": 70, "temp_c": 21, "condition": {"text": "Sunny"}, "humidity": 50, "wind_mph": 5, "wind_kph": 8}
+                for h in range(24)
+            ]}]}
+        }
+
+    async def test_forecast_queries_the_point_and_is_shared_by_its_cell(self):
+        stop = await self.agent._point_forecast(29.7812, -95.8234, START)
+        # Same 0.1 degree cell, a few kilometers away
+        nearby = await self.agent._point_forecast(29.7601, -95.7950, START + 3600)
+
+        # The upstream query is the stop itself, not the cell center (29.8, -95.8)
+        self.assertEqual(self.queries, ["29.7812,-95.8234"])
+        self.assertEqual(stop["coords"], {"lat": 29.7812, "lng": -95.8234})
+        self.assertEqual(nearby["forecast_time"], "2025-05-01 01:00")
+        self.assertIsNotNone(self.cache.get_cached("weather_forecast", self.agent._grid_cell(29.7812, -95.8234)))
+
+if __name__ == "__main__":
+    unittest.main()
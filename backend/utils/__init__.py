@@ -1,6 +1,47 @@
+import os
 from .cache_manager import CacheManager
+from .disk_cache import DiskCache
+from . import fast_json
+from .fast_json import FastJSONResponse
+from .geocoding_service import GeocodingService, GEOCODE_TTL
+from .places_cache import PlacesTileCache, PLACES_EMPTY_TTL, PLACES_TILE_TTL
+from .place_ranker import PlaceRanker, RANKING_TTL
+from .request_coalescer import RequestCoalescer
+from .stage_scheduler import Stage, StageScheduler
+from .trip_cache import TripResponseCache, TRIP_SECTION_TTLS
+from .rate_limiter import RateLimiter, RateLimitedCallError
+from .upstream_client import UpstreamClient, UpstreamError
 
-# Create a singleton instance of CacheManager
-cache_manager = CacheManager()
+# Create a singleton instance of CacheManager, bounded so long-running workers don't grow forever
+cache_manager = CacheManager(
+    max_entries=10000,
+    max_bytes=64 * 1024 * 1024,  # 64 MB per category
+    category_ttls={
+        'geocode': GEOCODE_TTL,
+        'weather': 600,  # current conditions go stale quickly
+        'weather_forecast': 3600,  # forecasts are reissued about hourly
+        'places_tiles': PLACES_TILE_TTL,
+        'places_tiles_empty': PLACES_EMPTY_TTL,
+        'llm_rankings': RANKING_TTL,
+        **{f"trip_{section}": ttl for section, ttl in TRIP_SECTION_TTLS.items()}
+    },
+    sweep_interval=300,
+    # Opt-in sampled cache summaries in DEBUG logs, e.g. 0.01 for 1% of lookups
+    diagnostics_sample_rate=float(os.getenv("CACHE_DIAGNOSTICS_SAMPLE_RATE", "0")),
+    # Opt-in persistent tier so restarts don't start from a cold cache
+    l2=DiskCache(os.environ["CACHE_DB_PATH"]) if os.getenv("CACHE_DB_PATH") else None
+)
 
-__all__ = ['cache_manager'] 
\ No newline at end of file
+# Shared HTTP connection pool for every Google Maps, WeatherAPI and LLM call; opened and closed by the app lifespan
+upstream_client = UpstreamClient()
+
+# Shared geocoder so every agent reuses the same cache and in-flight lookups
+geocoding_service = GeocodingService(client=upstream_client, cache=cache_manager)
+
+# Shared spatial cache so overlapping nearby-places searches reuse each other's results
+places_cache = PlacesTileCache(cache_manager)
+
+# Shared LLM ranker so identical candidate sets are ranked once
+place_ranker = PlaceRanker(client=upstream_client, cache=cache_manager)
+
+__all__ = ['cache_manager', 'CacheManager', 'DiskCache', 'fast_json', 'FastJSONResponse', 'geocoding_service', 'GeocodingService', 'place_ranker', 'PlaceRanker', 'places_cache', 'PlacesTileCache', 'RateLimiter', 'RateLimitedCallError', 'RequestCoalescer', 'Stage', 'StageScheduler', 'TripResponseCache', 'upstream_client', 'UpstreamClient', 'UpstreamError'] 
\ No newline at end of file
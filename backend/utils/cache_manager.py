@@ -1,89 +1,367 @@
+import sys
 import time
+import asyncio
+import random
 import logging
-from typing import Dict, Any, Optional
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+from .disk_cache import DiskCache
 
 logger = logging.getLogger(__name__)
 
+def _estimate_size(value: Any) -> int:
+    """ Approximate the in-memory size of a value in bytes, following containers """
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(_estimate_size(k) + _estimate_size(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(_estimate_size(item) for item in value)
+    return size
+
+class _LazyDiagnostics:
+    """ Formats a cache summary only if the log record is actually emitted """
+    def __init__(self, cache_manager):
+        self.cache_manager = cache_manager
+
+    def __str__(self):
+        return str(self.cache_manager.get_diagnostics())
+
 class CacheManager:
-    def __init__(self, ttl: int = 3600):
+    def __init__(
+        self,
+        ttl: int = 3600,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        category_ttls: Optional[Dict[str, int]] = None,
+        category_limits: Optional[Dict[str, Dict[str, int]]] = None,
+        sweep_interval: Optional[float] = None,
+        diagnostics_sample_rate: float = 0.0,
+        l2: Optional[DiskCache] = None
+    ):
         """
         Initialize the cache manager with a default TTL of 1 hour
-        
+
+        Without limits the cache is unbounded. Setting max_entries or max_bytes turns on
+        bounded mode, where each category evicts its least recently used entries once
+        it goes over its limits.
+
         Args:
             ttl (int): Time to live in seconds for cached items
+            max_entries (Optional[int]): Default maximum number of entries per category
+            max_bytes (Optional[int]): Default maximum approximate size in bytes per category
+            category_ttls (Optional[Dict[str, int]]): TTL overrides by category (e.g. short for 'weather', long for 'geocode')
+            category_limits (Optional[Dict[str, Dict[str, int]]]): 'max_entries'/'max_bytes' overrides by category
+            sweep_interval (Optional[float]): If set, remove expired entries in the background every this many seconds
+            diagnostics_sample_rate (float): Fraction of lookups that log a cache summary at DEBUG level (0 disables)
+            l2 (Optional[DiskCache]): Optional persistent tier; memory misses read through to it and
+                every write is also written behind to it
         """
-        self.cache: Dict[str, Dict[str, Any]] = {}
+        self.cache: Dict[str, OrderedDict] = {}
         self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.category_ttls = dict(category_ttls or {})
+        self.category_limits = dict(category_limits or {})
+        self._bytes: Dict[str, int] = {}
+        self._evictions: Dict[str, int] = {}
+        self._hits: Dict[str, int] = {}
+        self._misses: Dict[str, int] = {}
+        self._l2_hits: Dict[str, int] = {}
+        self.l2 = l2
+        self.diagnostics_sample_rate = diagnostics_sample_rate
+        self._lock = threading.RLock()
+        self._sweeper: Optional[threading.Thread] = None
+        self._stop_sweeper = threading.Event()
         logger.info("CacheManager initialized with TTL: %d seconds", ttl)
+        if sweep_interval:
+            self.start_sweeper(sweep_interval)
+
+    def get_ttl(self, category: str) -> int:
+        """ Get the TTL in seconds that applies to a category """
+        return self.category_ttls.get(category, self.ttl)
+
+    def _get_limit(self, category: str, name: str) -> Optional[int]:
+        return self.category_limits.get(category, {}).get(name, getattr(self, name))
 
     def get_cached(self, category: str, key: str) -> Optional[Any]:
         """
         Get a cached value if it exists and hasn't expired
-        
+
+        A memory miss reads the persistent tier on the calling thread; code running
+        on the event loop should use get_cached_async instead.
+
         Args:
             category (str): The category of the cached item (e.g., 'geocode', 'places')
             key (str): The unique key for the cached item
-            
+
         Returns:
             Optional[Any]: The cached value if it exists and hasn't expired, None otherwise
         """
-        logger.debug(f"Getting cached value for category: {category}, key: {key}")
-        logger.debug(f"Current cache state: {self.cache}")
-        
-        if category not in self.cache:
-            logger.debug(f"Category {category} not found in cache")
-            return None
-            
-        if key not in self.cache[category]:
-            logger.debug(f"Key {key} not found in category {category}")
+        found, value = self._get_memory(category, key)
+        if found:
+            return value
+        return self._read_through(category, key, self._get_l2(category, key))
+
+    async def get_cached_async(self, category: str, key: str) -> Optional[Any]:
+        """
+        get_cached for code running on the event loop
+
+        Memory hits return right away; on a miss the persistent tier is read in a
+        worker thread, so a SQLite read never blocks the loop.
+
+        Args:
+            category (str): The category of the cached item (e.g., 'geocode', 'places')
+            key (str): The unique key for the cached item
+
+        Returns:
+            Optional[Any]: The cached value if it exists and hasn't expired, None otherwise
+        """
+        found, value = self._get_memory(category, key)
+        if found:
+            return value
+        stored = await asyncio.to_thread(self._get_l2, category, key) if self.l2 is not None else None
+        return self._read_through(category, key, stored)
+
+    def _get_memory(self, category: str, key: str) -> Tuple[bool, Optional[Any]]:
+        """ (True, value) for a fresh in-memory entry, else (False, None) """
+        if self.diagnostics_sample_rate and random.random() < self.diagnostics_sample_rate:
+            logger.debug("Cache diagnostics: %s", _LazyDiagnostics(self))
+
+        with self._lock:
+            entries = self.cache.get(category)
+            if entries is not None and key in entries:
+                cache_entry = entries[key]
+                if time.time() - cache_entry['timestamp'] <= self.get_ttl(category):
+                    # Mark as most recently used
+                    entries.move_to_end(key)
+                    self._hits[category] = self._hits.get(category, 0) + 1
+                    logger.debug("Cache hit for %s/%s", category, key)
+                    return True, cache_entry['value']
+
+                logger.debug("Cache entry expired for %s/%s", category, key)
+                self._remove(category, key)
+        return False, None
+
+    def _get_l2(self, category: str, key: str) -> Optional[Tuple[Any, float]]:
+        """ Read an entry from the persistent tier, if there is one """
+        if self.l2 is None:
             return None
-            
-        cache_entry = self.cache[category][key]
-        if time.time() - cache_entry['timestamp'] > self.ttl:
-            logger.debug("Cache entry expired for %s/%s", category, key)
-            del self.cache[category][key]
+        try:
+            return self.l2.get(category, key, self.get_ttl(category))
+        except Exception as e:
+            logger.error(f"Error reading disk cache for {category}/{key}: {str(e)}")
             return None
-            
-        logger.debug("Cache hit for %s/%s", category, key)
-        return cache_entry['value']
+
+    def _read_through(self, category: str, key: str, stored: Optional[Tuple[Any, float]]) -> Optional[Any]:
+        """ Promote what the persistent tier had into memory, or count the miss """
+        if stored is not None:
+            value, timestamp = stored
+            with self._lock:
+                self._store(category, key, value, timestamp)
+                self._hits[category] = self._hits.get(category, 0) + 1
+                self._l2_hits[category] = self._l2_hits.get(category, 0) + 1
+            logger.debug("Disk cache hit for %s/%s", category, key)
+            return value
+
+        with self._lock:
+            self._misses[category] = self._misses.get(category, 0) + 1
+        logger.debug("Cache miss for %s/%s", category, key)
+        return None
 
     def set_cached(self, category: str, key: str, value: Any) -> None:
         """
         Set a value in the cache with the current timestamp
-        
+
         Args:
             category (str): The category of the cached item
             key (str): The unique key for the cached item
             value (Any): The value to cache
         """
+        timestamp = time.time()
+        with self._lock:
+            self._store(category, key, value, timestamp)
+        if self.l2 is not None:
+            self.l2.set(category, key, value, timestamp)
+        logger.debug("Cached value for %s/%s", category, key)
+
+    def _store(self, category: str, key: str, value: Any, timestamp: float) -> None:
+        """ Put an entry in memory, evicting as needed; callers hold the lock """
         if category not in self.cache:
-            self.cache[category] = {}
-            
+            self.cache[category] = OrderedDict()
+            self._bytes[category] = 0
+            self._evictions.setdefault(category, 0)
+
+        if key in self.cache[category]:
+            self._remove(category, key)
+
+        size = _estimate_size(value)
         self.cache[category][key] = {
             'value': value,
-            'timestamp': time.time()
+            'timestamp': timestamp,
+            'size': size
         }
-        logger.debug("Cached value for %s/%s", category, key)
+        self._bytes[category] += size
+        self._enforce_limits(category)
 
-    def get_cache_size(self) -> Dict[str, int]:
+    def warm_from_l2(self, limit: int = 5000) -> int:
+        """
+        Load the most recently cached fresh entries from the persistent tier into memory
+
+        Args:
+            limit (int): Maximum number of entries to load
+
+        Returns:
+            int: The number of entries loaded
+        """
+        if self.l2 is None:
+            return 0
+        rows = self.l2.load_recent(limit, self.get_ttl)
+        with self._lock:
+            # Oldest first so the newest entries end up most recently used
+            for category, key, value, timestamp in reversed(rows):
+                self._store(category, key, value, timestamp)
+        logger.info("Warmed cache with %d entries from disk", len(rows))
+        return len(rows)
+
+    def close(self) -> None:
+        """ Stop the sweeper and flush the persistent tier """
+        self.stop_sweeper()
+        if self.l2 is not None:
+            self.l2.close()
+
+    def _remove(self, category: str, key: str) -> None:
+        entry = self.cache[category].pop(key)
+        self._bytes[category] -= entry['size']
+
+    def _enforce_limits(self, category: str) -> None:
+        """ Evict least recently used entries until the category fits its limits """
+        max_entries = self._get_limit(category, 'max_entries')
+        max_bytes = self._get_limit(category, 'max_bytes')
+        entries = self.cache[category]
+        # Always keep the newest entry, even if it alone is over the byte limit
+        while len(entries) > 1 and (
+            (max_entries is not None and len(entries) > max_entries) or
+            (max_bytes is not None and self._bytes[category] > max_bytes)
+        ):
+            key, entry = entries.popitem(last=False)
+            self._bytes[category] -= entry['size']
+            self._evictions[category] += 1
+            logger.debug("Evicted %s/%s", category, key)
+
+    def sweep_expired(self) -> int:
+        """
+        Remove every expired entry from the cache
+
+        Returns:
+            int: The number of entries removed
+        """
+        removed = 0
+        now = time.time()
+        with self._lock:
+            for category, entries in self.cache.items():
+                ttl = self.get_ttl(category)
+                expired = [key for key, entry in entries.items() if now - entry['timestamp'] > ttl]
+                for key in expired:
+                    self._remove(category, key)
+                removed += len(expired)
+        if self.l2 is not None:
+            removed += self.l2.delete_expired(self.get_ttl)
+        if removed:
+            logger.debug("Swept %d expired cache entries", removed)
+        return removed
+
+    def start_sweeper(self, interval: float) -> None:
+        """
+        Start a daemon thread that removes expired entries every interval seconds
+
+        Args:
+            interval (float): Seconds between sweeps
+        """
+        if self._sweeper is not None and self._sweeper.is_alive():
+            return
+        self._stop_sweeper.clear()
+
+        def run():
+            while not self._stop_sweeper.wait(interval):
+                try:
+                    self.sweep_expired()
+                except Exception as e:
+                    logger.error(f"Error sweeping cache: {str(e)}")
+
+        self._sweeper = threading.Thread(target=run, name="cache-sweeper", daemon=True)
+        self._sweeper.start()
+        logger.info("Cache sweeper started with interval: %s seconds", interval)
+
+    def stop_sweeper(self) -> None:
+        """ Stop the background sweeper if it is running """
+        self._stop_sweeper.set()
+        if self._sweeper is not None:
+            self._sweeper.join()
+            self._sweeper = None
+
+    def get_cache_size(self) -> Dict[str, Dict[str, int]]:
         """
         Get the current size of each cache category
-        
+
+        Returns:
+            Dict[str, Dict[str, int]]: Dictionary mapping categories to their entry count,
+                approximate bytes and number of LRU evictions so far
+        """
+        with self._lock:
+            return {
+                category: {
+                    "entries": len(entries),
+                    "bytes": self._bytes[category],
+                    "evictions": self._evictions.get(category, 0)
+                }
+                for category, entries in self.cache.items()
+            }
+
+    def get_diagnostics(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Summarize the cache per category without exposing cached values
+
         Returns:
-            Dict[str, int]: Dictionary mapping categories to their cache sizes
+            Dict[str, Dict[str, Any]]: Dictionary mapping categories to their entry count, hits,
+                misses, hit rate and age in seconds of the oldest entry
         """
-        return {category: len(entries) for category, entries in self.cache.items()}
+        now = time.time()
+        with self._lock:
+            categories = set(self.cache) | set(self._hits) | set(self._misses)
+            diagnostics = {}
+            for category in sorted(categories):
+                entries = self.cache.get(category, {})
+                hits = self._hits.get(category, 0)
+                misses = self._misses.get(category, 0)
+                oldest = min((entry['timestamp'] for entry in entries.values()), default=None)
+                diagnostics[category] = {
+                    "entries": len(entries),
+                    "hits": hits,
+                    "misses": misses,
+                    "hit_rate": round(hits / (hits + misses), 3) if hits + misses else None,
+                    "oldest_entry_age": round(now - oldest, 1) if oldest is not None else None
+                }
+                if self.l2 is not None:
+                    diagnostics[category]["l2_hits"] = self._l2_hits.get(category, 0)
+            return diagnostics
 
     def clear_cache(self, category: Optional[str] = None) -> None:
         """
         Clear the cache for a specific category or all categories
-        
+
         Args:
             category (Optional[str]): The category to clear. If None, clears all categories.
         """
-        if category is None:
-            self.cache.clear()
-            logger.info("Cleared all cache categories")
-        elif category in self.cache:
-            del self.cache[category]
-            logger.info("Cleared cache category: %s", category) 
\ No newline at end of file
+        with self._lock:
+            if category is None:
+                self.cache.clear()
+                self._bytes.clear()
+                logger.info("Cleared all cache categories")
+            elif category in self.cache:
+                del self.cache[category]
+                del self._bytes[category]
+                logger.info("Cleared cache category: %s", category)
+        if self.l2 is not None:
+            self.l2.clear(category)
@@ -0,0 +1,210 @@
+import json
+import time
+import sqlite3
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_NOT_PENDING = object()
+
+class DiskCache:
+    def __init__(self, path: str, flush_interval: float = 1.0, max_pending: int = 500):
+        """
+        SQLite-backed second cache tier that survives restarts
+
+        Reads go straight to the database; writes are buffered and flushed in the
+        background (write-behind) so the request path never waits on disk commits.
+
+        Args:
+            path (str): Path of the SQLite database file
+            flush_interval (float): Seconds between background flushes of buffered writes
+            max_pending (int): Flush early once this many writes are buffered
+        """
+        self.path = path
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "category TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, timestamp REAL NOT NULL, "
+            "PRIMARY KEY (category, key))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cache_timestamp ON cache (timestamp)")
+        self._db_lock = threading.Lock()
+        # Buffered writes: (category, key) -> (serialized value, timestamp), or None for a delete
+        self._pending: Dict[Tuple[str, str], Optional[Tuple[str, float]]] = {}
+        self._pending_lock = threading.Condition()
+        self._closed = False
+        self._writer = threading.Thread(target=self._write_loop, name="disk-cache-writer", daemon=True)
+        self._writer.start()
+        logger.info("DiskCache opened at %s", path)
+
+    def get(self, category: str, key: str, ttl: float) -> Optional[Tuple[Any, float]]:
+        """
+        Read an entry that is younger than ttl
+
+        Args:
+            category (str): The category of the cached item
+            key (str): The unique key for the cached item
+            ttl (float): Time to live in seconds for this category
+
+        Returns:
+            Optional[Tuple[Any, float]]: (value, timestamp) if present and fresh, None otherwise
+        """
+        # Buffered writes are newer than what is on disk
+        with self._pending_lock:
+            row = self._pending.get((category, key), _NOT_PENDING)
+        if row is _NOT_PENDING:
+            with self._db_lock:
+                row = self._conn.execute(
+                    "SELECT value, timestamp FROM cache WHERE category = ? AND key = ?",
+                    (category, key)
+                ).fetchone()
+        if row is None:
+            return None
+
+        serialized, timestamp = row
+        if time.time() - timestamp > ttl:
+            return None
+        return json.loads(serialized), timestamp
+
+    def set(self, category: str, key: str, value: Any, timestamp: float) -> None:
+        """
+        Buffer a write; it reaches disk on the next background flush
+
+        Values that can't be represented as JSON are kept in memory only.
+
+        Args:
+            category (str): The category of the cached item
+            key (str): The unique key for the cached item
+            value (Any): The value to cache
+            timestamp (float): When the value was cached
+        """
+        try:
+            serialized = json.dumps(value)
+        except (TypeError, ValueError):
+            logger.debug("Skipping disk cache for non-JSON value %s/%s", category, key)
+            return
+        self._buffer((category, key), (serialized, timestamp))
+
+    def delete(self, category: str, key: str) -> None:
+        """ Buffer removal of a single entry """
+        self._buffer((category, key), None)
+
+    def _buffer(self, item_key, item) -> None:
+        with self._pending_lock:
+            self._pending[item_key] = item
+            if len(self._pending) >= self.max_pending:
+                self._pending_lock.notify()
+
+    def _write_loop(self) -> None:
+        while True:
+            with self._pending_lock:
+                if not self._closed and len(self._pending) < self.max_pending:
+                    self._pending_lock.wait(self.flush_interval)
+                closed = self._closed
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error flushing disk cache: {str(e)}")
+            if closed:
+                return
+
+    def flush(self) -> None:
+        """ Write all buffered changes to disk now """
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+
+        upserts = [(c, k, item[0], item[1]) for (c, k), item in pending.items() if item is not None]
+        deletes = [(c, k) for (c, k), item in pending.items() if item is None]
+        with self._db_lock:
+            self._conn.execute("BEGIN")
+            try:
+                if upserts:
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO cache (category, key, value, timestamp) VALUES (?, ?, ?, ?)",
+                        upserts
+                    )
+                if deletes:
+                    self._conn.executemany("DELETE FROM cache WHERE category = ? AND key = ?", deletes)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        logger.debug("Flushed %d disk cache writes", len(pending))
+
+    def load_recent(self, limit: int, get_ttl: Callable[[str], float]) -> List[Tuple[str, str, Any, float]]:
+        """
+        Load the most recently written fresh entries, used to warm memory at startup
+
+        Args:
+            limit (int): Maximum number of entries to load
+            get_ttl (Callable[[str], float]): Returns the TTL in seconds for a category
+
+        Returns:
+            List[Tuple[str, str, Any, float]]: (category, key, value, timestamp) rows, newest first
+        """
+        now = time.time()
+        with self._db_lock:
+            rows = self._conn.execute(
+                "SELECT category, key, value, timestamp FROM cache ORDER BY timestamp DESC LIMIT ?",
+                (limit,)
+            ).fetchall()
+        return [
+            (category, key, json.loads(value), timestamp)
+            for category, key, value, timestamp in rows
+            if now - timestamp <= get_ttl(category)
+        ]
+
+    def delete_expired(self, get_ttl: Callable[[str], float]) -> int:
+        """
+        Remove expired entries from disk
+
+        Args:
+            get_ttl (Callable[[str], float]): Returns the TTL in seconds for a category
+
+        Returns:
+            int: The number of entries removed
+        """
+        now = time.time()
+        removed = 0
+        with self._db_lock:
+            categories = [row[0] for row in self._conn.execute("SELECT DISTINCT category FROM cache")]
+            for category in categories:
+                cursor = self._conn.execute(
+                    "DELETE FROM cache WHERE category = ? AND timestamp < ?",
+                    (category, now - get_ttl(category))
+                )
+                removed += cursor.rowcount
+        return removed
+
+    def clear(self, category: Optional[str] = None) -> None:
+        """ Remove every entry, or every entry in one category, from disk """
+        with self._pending_lock:
+            if category is None:
+                self._pending.clear()
+            else:
+                self._pending = {k: v for k, v in self._pending.items() if k[0] != category}
+        with self._db_lock:
+            if category is None:
+                self._conn.execute("DELETE FROM cache")
+            else:
+                self._conn.execute("DELETE FROM cache WHERE category = ?", (category,))
+
+    def close(self) -> None:
+        """ Flush buffered writes and close the database """
+        with self._pending_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._pending_lock.notify()
+        self._writer.join()
+        with self._db_lock:
+            self._conn.close()
+        logger.info("DiskCache closed at %s", self.path)
@@ -0,0 +1,146 @@
+import gzip
+import time
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+import orjson
+from fastapi.responses import Response
+
+try:
+    import brotli
+except ImportError:  # Optional; gzip is used when it isn't installed
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Bodies smaller than this are sent uncompressed; compressing them saves almost nothing
+MIN_COMPRESS_BYTES = 1024
+
+# Fast settings: these responses are built per request, so encode time matters more than ratio
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+
+# NumPy arrays/scalars and non-string keys are encoded natively instead of failing
+_ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+def dumps(content: Any) -> bytes:
+    """ Encode content as JSON bytes; unknown types fall back to str() """
+    return orjson.dumps(content, default=str, option=_ORJSON_OPTIONS)
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    Pick the compression to use from an Accept-Encoding header
+
+    Args:
+        accept_encoding (Optional[str]): The request's Accept-Encoding header
+
+    Returns:
+        Optional[str]: "br" (if brotli is installed), "gzip", or None for no compression
+    """
+    if not accept_encoding:
+        return None
+    accepted = set()
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = params.strip()
+        if quality.startswith("q="):
+            try:
+                if float(quality[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(coding.strip().lower())
+    if brotli is not None and ("br" in accepted or "*" in accepted):
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return None
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """ Compress a body with the encoding chosen by negotiate_encoding """
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+class ResponseMetrics:
+    def __init__(self):
+        """ Running totals of encoded JSON response sizes and encode times """
+        self._lock = threading.Lock()
+        self.responses = 0
+        self.total_bytes = 0
+        self.total_encode_seconds = 0.0
+        self.max_bytes = 0
+        self.last_bytes = 0
+        self.total_wire_bytes = 0
+        self.compressed = 0
+
+    def record(self, size: int, encode_seconds: float, wire_size: Optional[int] = None) -> None:
+        """ Record one encoded response; wire_size is its size after compression, if any """
+        with self._lock:
+            self.responses += 1
+            self.total_bytes += size
+            self.total_encode_seconds += encode_seconds
+            self.max_bytes = max(self.max_bytes, size)
+            self.last_bytes = size
+            self.total_wire_bytes += size if wire_size is None else wire_size
+            if wire_size is not None:
+                self.compressed += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get response size and encode time totals
+
+        Returns:
+            Dict[str, Any]: Response count, byte totals before and after compression,
+                and average encode time in milliseconds
+        """
+        with self._lock:
+            return {
+                "responses": self.responses,
+                "total_bytes": self.total_bytes,
+                "average_bytes": round(self.total_bytes / self.responses) if self.responses else None,
+                "max_bytes": self.max_bytes,
+                "last_bytes": self.last_bytes,
+                "total_wire_bytes": self.total_wire_bytes,
+                "compressed_responses": self.compressed,
+                "average_encode_ms": round(self.total_encode_seconds * 1000 / self.responses, 3) if self.responses else None
+            }
+
+response_metrics = ResponseMetrics()
+
+class FastJSONResponse(Response):
+    """
+    JSON response encoded once with orjson
+
+    Returning it from an endpoint skips FastAPI's jsonable_encoder pass; the
+    encoded size and time are recorded in response_metrics. Pass the request's
+    Accept-Encoding header to compress bodies of MIN_COMPRESS_BYTES or more.
+    """
+    media_type = "application/json"
+
+    def __init__(self, content: Any, accept_encoding: Optional[str] = None, **kwargs):
+        self.content_encoding = None
+        self._accept_encoding = accept_encoding
+        super().__init__(content, **kwargs)
+        if self.content_encoding:
+            self.headers["content-encoding"] = self.content_encoding
+        self.headers["vary"] = "Accept-Encoding"
+
+    def render(self, content: Any) -> bytes:
+        start_time = time.perf_counter()
+        body = dumps(content)
+        size = len(body)
+        wire_size = None
+        encoding = negotiate_encoding(self._accept_encoding) if size >= MIN_COMPRESS_BYTES else None
+        if encoding:
+            body = compress(body, encoding)
+            wire_size = len(body)
+            self.content_encoding = encoding
+        encode_seconds = time.perf_counter() - start_time
+        response_metrics.record(size, encode_seconds, wire_size)
+        if encoding:
+            logger.info(f"Response size: {size} bytes, {wire_size} bytes {encoding} (encoded in {encode_seconds * 1000:.1f} ms)")
+        else:
+            logger.info(f"Response size: {size} bytes (encoded in {encode_seconds * 1000:.1f} ms)")
+        return body
@@ -0,0 +1,259 @@
+import logging
+from math import radians, sin, cos, sqrt, atan2
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_METERS = 6371000
+
+# Candidate points are compared against the route in chunks to bound memory use
+_POLYLINE_CHUNK_SIZE = 256
+
+def haversine_distance(point1: Sequence[float], point2: Sequence[float]) -> float:
+    """
+    Calculate distance between two points using Haversine formula
+
+    Args:
+        point1 (Sequence[float]): (lat, lng) of the first point
+        point2 (Sequence[float]): (lat, lng) of the second point
+
+    Returns:
+        float: Distance in meters
+    """
+    lat1, lng1 = point1[0], point1[1]
+    lat2, lng2 = point2[0], point2[1]
+
+    lat1, lng1, lat2, lng2 = map(radians, [lat1, lng1, lat2, lng2])
+    dlat = lat2 - lat1
+    dlng = lng2 - lng1
+
+    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlng/2)**2
+    c = 2 * atan2(sqrt(a), sqrt(1-a))
+    return EARTH_RADIUS_METERS * c
+
+def _as_points(points) -> np.ndarray:
+    return np.asarray(points, dtype=float).reshape(-1, 2)
+
+def _haversine(lat1, lng1, lat2, lng2) -> np.ndarray:
+    """ Haversine on arrays of radians; broadcasts like NumPy arithmetic """
+    a = np.sin((lat2 - lat1) / 2)**2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2)**2
+    return 2 * EARTH_RADIUS_METERS * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+def haversine_to_points(origin: Sequence[float], points) -> np.ndarray:
+    """
+    Distance from one point to many points
+
+    Args:
+        origin (Sequence[float]): (lat, lng) of the origin
+        points: N x 2 array-like of (lat, lng)
+
+    Returns:
+        np.ndarray: N distances in meters
+    """
+    pts = np.radians(_as_points(points))
+    lat1, lng1 = np.radians(origin[0]), np.radians(origin[1])
+    return _haversine(lat1, lng1, pts[:, 0], pts[:, 1])
+
+def haversine_pairwise(points1, points2) -> np.ndarray:
+    """
+    Element-wise distance between two equally long lists of points
+
+    Args:
+        points1: N x 2 array-like of (lat, lng)
+        points2: N x 2 array-like of (lat, lng)
+
+    Returns:
+        np.ndarray: N distances in meters
+    """
+    a = np.radians(_as_points(points1))
+    b = np.radians(_as_points(points2))
+    return _haversine(a[:, 0], a[:, 1], b[:, 0], b[:, 1])
+
+def cumulative_route_length(polyline) -> np.ndarray:
+    """
+    Distance traveled from the start of a polyline to each of its vertices
+
+    Args:
+        polyline: N x 2 array-like of (lat, lng) vertices
+
+    Returns:
+        np.ndarray: N cumulative distances in meters, starting at 0
+    """
+    pts = _as_points(polyline)
+    if len(pts) == 0:
+        return np.zeros(0)
+    return np.concatenate(([0.0], np.cumsum(haversine_pairwise(pts[:-1], pts[1:]))))
+
+def distances_to_polyline(points, polyline) -> np.ndarray:
+    """
+    Shortest distance from each point to a polyline, measured to its segments
+
+    Each point is compared to the segments in a local equirectangular projection
+    centered on that point, which is accurate at the distances that matter here.
+
+    Args:
+        points: N x 2 array-like of (lat, lng)
+        polyline: M x 2 array-like of (lat, lng) vertices
+
+    Returns:
+        np.ndarray: N distances in meters
+    """
+    pts = np.radians(_as_points(points))
+    line = np.radians(_as_points(polyline))
+    if len(pts) == 0:
+        return np.zeros(0)
+    if len(line) == 0:
+        return np.full(len(pts), np.inf)
+    if len(line) == 1:
+        return _haversine(pts[:, 0], pts[:, 1], line[0, 0], line[0, 1])
+
+    starts, ends = line[:-1], line[1:]
+    result = np.empty(len(pts))
+    for chunk_start in range(0, len(pts), _POLYLINE_CHUNK_SIZE):
+        chunk = pts[chunk_start:chunk_start + _POLYLINE_CHUNK_SIZE]
+        lat = chunk[:, 0:1]
+        lng = chunk[:, 1:2]
+        scale = np.cos(lat) * EARTH_RADIUS_METERS
+
+        # Segment endpoints relative to each point, in meters (chunk x segments)
+        ax = (starts[:, 1] - lng) * scale
+        ay = (starts[:, 0] - lat) * EARTH_RADIUS_METERS
+        bx = (ends[:, 1] - lng) * scale
+        by = (ends[:, 0] - lat) * EARTH_RADIUS_METERS
+
+        dx = bx - ax
+        dy = by - ay
+        length_sq = dx * dx + dy * dy
+        with np.errstate(invalid="ignore", divide="ignore"):
+            t = np.where(length_sq > 0, -(ax * dx + ay * dy) / length_sq, 0.0)
+        t = np.clip(t, 0.0, 1.0)
+        px = ax + t * dx
+        py = ay + t * dy
+        result[chunk_start:chunk_start + len(chunk)] = np.sqrt(px * px + py * py).min(axis=1)
+    return result
+
+def resample_by_distance(coordinates: Sequence[Sequence[float]], spacing: float, skip_fraction: float = 0.0) -> List[Tuple[float, float]]:
+    """
+    Walk a polyline by cumulative distance and emit points evenly spaced along it
+
+    The number of points depends on how far the route goes, not on how many
+    vertices it has, so dense city polylines and sparse highway ones are
+    sampled alike.
+
+    Args:
+        coordinates (Sequence[Sequence[float]]): [lat, lng] vertices of the route
+        spacing (float): Distance in meters between emitted points
+        skip_fraction (float): Fraction of the route length to skip at the start
+
+    Returns:
+        List[Tuple[float, float]]: (lat, lng) points along the route
+    """
+    if len(coordinates) == 0:
+        return []
+    coords = _as_points(coordinates)
+    if len(coords) == 1 or spacing <= 0:
+        return [(float(coords[0, 0]), float(coords[0, 1]))]
+
+    cumulative = cumulative_route_length(coords)
+    total = cumulative[-1]
+    targets = np.arange(total * skip_fraction, total + 1e-9, spacing)
+    lats = np.interp(targets, cumulative, coords[:, 0])
+    lngs = np.interp(targets, cumulative, coords[:, 1])
+    samples = list(zip(lats.tolist(), lngs.tolist()))
+
+    # Cover the end of the route if the last point stopped well short of it
+    if samples and total - targets[-1] > spacing / 2:
+        samples.append((float(coords[-1, 0]), float(coords[-1, 1])))
+
+    logger.debug("Resampled %d vertices over %.0f m into %d points", len(coords), total, len(samples))
+    return samples
+
+# Web Mercator meters per pixel at zoom 0 on the equator (256 px tiles)
+_METERS_PER_PIXEL_ZOOM_0 = 2 * np.pi * 6378137 / 256
+
+# Zoom level at and above which routes are returned at full resolution
+MAX_SIMPLIFY_ZOOM = 21
+
+def _to_web_mercator(coords: np.ndarray) -> np.ndarray:
+    lat = np.radians(np.clip(coords[:, 0], -85.05112878, 85.05112878))
+    lng = np.radians(coords[:, 1])
+    return np.column_stack((6378137 * lng, 6378137 * np.log(np.tan(np.pi / 4 + lat / 2))))
+
+def simplify_polyline(coordinates: Sequence[Sequence[float]], tolerance: float) -> List[List[float]]:
+    """
+    Simplify a polyline with the Douglas-Peucker algorithm
+
+    Distances are measured in Web Mercator (the projection the map draws in), so a
+    tolerance of one pixel's worth of meters keeps the drawn line unchanged.
+
+    Args:
+        coordinates (Sequence[Sequence[float]]): [lat, lng] vertices of the route
+        tolerance (float): Maximum deviation in Web Mercator meters
+
+    Returns:
+        List[List[float]]: The kept [lat, lng] vertices, always including both ends
+    """
+    coords = _as_points(coordinates)
+    if len(coords) <= 2 or tolerance <= 0:
+        return coords.tolist()
+
+    projected = _to_web_mercator(coords)
+    keep = np.zeros(len(coords), dtype=bool)
+    keep[0] = keep[-1] = True
+    tolerance_sq = tolerance * tolerance
+
+    stack = [(0, len(coords) - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        start = projected[first]
+        dx, dy = projected[last] - start
+        between = projected[first + 1:last] - start
+        length_sq = dx * dx + dy * dy
+        if length_sq > 0:
+            # Distance to the segment, clamped to its endpoints
+            t = np.clip((between[:, 0] * dx + between[:, 1] * dy) / length_sq, 0.0, 1.0)
+            offsets = between - np.outer(t, (dx, dy))
+        else:
+            offsets = between
+        distances_sq = (offsets * offsets).sum(axis=1)
+        farthest = int(np.argmax(distances_sq))
+        if distances_sq[farthest] > tolerance_sq:
+            index = first + 1 + farthest
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+
+    return coords[keep].tolist()
+
+def tolerance_for_zoom(zoom: int, pixel_tolerance: float = 1.0) -> float:
+    """
+    Web Mercator meters covered by pixel_tolerance pixels at a map zoom level
+
+    Args:
+        zoom (int): Map zoom level (0 shows the whole world)
+        pixel_tolerance (float): Allowed deviation in screen pixels
+
+    Returns:
+        float: Tolerance in meters for simplify_polyline
+    """
+    return _METERS_PER_PIXEL_ZOOM_0 / (2 ** zoom) * pixel_tolerance
+
+def simplify_for_zoom(coordinates: Sequence[Sequence[float]], zoom: int, pixel_tolerance: float = 1.0) -> List[List[float]]:
+    """
+    Simplify a route so it draws the same at the given zoom level
+
+    Args:
+        coordinates (Sequence[Sequence[float]]): [lat, lng] vertices of the route
+        zoom (int): Map zoom level; MAX_SIMPLIFY_ZOOM or above returns every vertex
+        pixel_tolerance (float): Allowed deviation in screen pixels
+
+    Returns:
+        List[List[float]]: The simplified [lat, lng] vertices
+    """
+    if zoom >= MAX_SIMPLIFY_ZOOM:
+        return _as_points(coordinates).tolist()
+    return simplify_polyline(coordinates, tolerance_for_zoom(zoom, pixel_tolerance))
@@ -0,0 +1,113 @@
+import asyncio
+import logging
+from typing import Any, Dict, Iterable, Optional
+
+from .cache_manager import CacheManager
+from .request_coalescer import RequestCoalescer
+from .upstream_client import UpstreamClient
+
+logger = logging.getLogger(__name__)
+
+# Addresses rarely move, so geocodes can live far longer than other cached data
+GEOCODE_TTL = 30 * 24 * 3600  # 30 days
+
+class GeocodingService:
+    def __init__(self, client: Optional[UpstreamClient] = None, cache: Optional[CacheManager] = None, max_concurrent_requests: int = 8):
+        """
+        Shared geocoder with a long-TTL cache and single-flight deduplication
+
+        Concurrent lookups for the same address share one upstream call. If the
+        lookup that made the call is cancelled, the others rerun it rather than
+        reporting the address as not found.
+
+        Args:
+            client (Optional[UpstreamClient]): HTTP client for the Geocoding API; defaults to a private one
+            cache (Optional[CacheManager]): Cache for geocode results; defaults to a private long-TTL cache
+            max_concurrent_requests (int): Maximum upstream calls in flight for a batch lookup
+        """
+        self.client = client if client is not None else UpstreamClient()
+        self.cache = cache if cache is not None else CacheManager(ttl=GEOCODE_TTL)
+        self.max_concurrent_requests = max_concurrent_requests
+        self._coalescer = RequestCoalescer("geocode")
+        self.upstream_calls = 0
+
+    @staticmethod
+    def _normalize(address: str) -> str:
+        return " ".join(address.lower().split())
+
+    async def geocode(self, address: str) -> Optional[Dict[str, Any]]:
+        """
+        Geocode an address, serving from cache or an in-flight lookup when possible
+
+        Args:
+            address (str): The address to geocode
+
+        Returns:
+            Optional[Dict[str, Any]]: {'lat', 'lng', 'formatted_address'} or None if it could not be geocoded
+        """
+        key = self._normalize(address)
+        cached = await self.cache.get_cached_async('geocode', key)
+        if cached:
+            return cached
+
+        async def lookup():
+            result = await self._fetch(address)
+            if result:
+                self.cache.set_cached('geocode', key, result)
+            return result
+
+        return await self._coalescer.run(key, lookup)
+
+    async def geocode_many(self, addresses: Iterable[str], max_concurrent_requests: Optional[int] = None) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        Geocode several addresses at once, looking each distinct address up only once
+
+        Args:
+            addresses (Iterable[str]): The addresses to geocode
+            max_concurrent_requests (Optional[int]): Upstream concurrency limit (defaults to the service setting)
+
+        Returns:
+            Dict[str, Optional[Dict[str, Any]]]: Dictionary mapping each address to its geocode result or None
+        """
+        unique = list(dict.fromkeys(addresses))
+        semaphore = asyncio.Semaphore(max_concurrent_requests or self.max_concurrent_requests)
+
+        async def bounded(address):
+            async with semaphore:
+                return await self.geocode(address)
+
+        results = await asyncio.gather(*(bounded(address) for address in unique))
+        return dict(zip(unique, results))
+
+    async def _fetch(self, address: str) -> Optional[Dict[str, Any]]:
+        try:
+            logger.info(f"Geocoding address: {address}")
+            self.upstream_calls += 1
+            geocode_result = await self.client.geocode(address)
+            if not geocode_result:
+                logger.warning(f"Could not geocode location: {address}")
+                return None
+
+            location = geocode_result[0]['geometry']['location']
+            return {
+                "lat": location['lat'],
+                "lng": location['lng'],
+                "formatted_address": geocode_result[0].get('formatted_address', address)
+            }
+        except Exception as e:
+            logger.error(f"Error getting lat/lng for {address}: {str(e)}")
+            return None
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Get upstream and deduplication counters
+
+        Returns:
+            Dict[str, int]: Upstream calls made, lookups that joined an in-flight call, and lookups in flight now
+        """
+        coalescer_stats = self._coalescer.get_stats()
+        return {
+            "upstream_calls": self.upstream_calls,
+            "coalesced_calls": coalescer_stats["coalesced"],
+            "in_flight": coalescer_stats["in_flight"]
+        }
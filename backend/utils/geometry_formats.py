@@ -0,0 +1,74 @@
+import base64
+import logging
+from typing import Any, Dict, Sequence
+
+import numpy as np
+import polyline
+
+logger = logging.getLogger(__name__)
+
+# Decimal places kept by the integer formats (1e-5 degrees is about 1.1 m)
+GEOMETRY_PRECISION = 5
+
+# Ways a route line can be sent; "coordinates" is the plain [[lat, lng], ...] list
+GEOMETRY_FORMATS = ("coordinates", "polyline", "delta", "float32")
+
+def encode_delta(coordinates: Sequence[Sequence[float]], precision: int = GEOMETRY_PRECISION) -> list:
+    """
+    Encode a route as a flat list of integer deltas
+
+    The first pair is the scaled start point; every following pair is the change
+    from the previous point. Decode with a running sum divided by 10 ** precision.
+
+    Args:
+        coordinates (Sequence[Sequence[float]]): [lat, lng] vertices of the route
+        precision (int): Decimal places to keep
+
+    Returns:
+        list: [lat0, lng0, dlat1, dlng1, ...] as integers
+    """
+    scaled = np.rint(np.asarray(coordinates, dtype=float).reshape(-1, 2) * 10 ** precision).astype(np.int64)
+    if len(scaled) == 0:
+        return []
+    deltas = np.diff(scaled, axis=0, prepend=np.zeros((1, 2), dtype=np.int64))
+    return deltas.ravel().tolist()
+
+def encode_float32(coordinates: Sequence[Sequence[float]]) -> str:
+    """
+    Encode a route as base64 of a little-endian float32 buffer
+
+    The buffer holds lat, lng, lat, lng, ... and can be wrapped directly in a
+    Float32Array; float32 keeps coordinates to within about a meter.
+
+    Args:
+        coordinates (Sequence[Sequence[float]]): [lat, lng] vertices of the route
+
+    Returns:
+        str: Base64 text of the buffer
+    """
+    buffer = np.asarray(coordinates, dtype="<f4").reshape(-1, 2).tobytes()
+    return base64.b64encode(buffer).decode("ascii")
+
+def encode_geometry(coordinates: Sequence[Sequence[float]], geometry_format: str) -> Dict[str, Any]:
+    """
+    Build the route fields that carry its line in the requested format
+
+    Args:
+        coordinates (Sequence[Sequence[float]]): [lat, lng] vertices of the route
+        geometry_format (str): One of GEOMETRY_FORMATS
+
+    Returns:
+        Dict[str, Any]: Fields to set on the route, including "geometry_format"
+    """
+    if geometry_format == "polyline":
+        fields = {"coordinates_polyline": polyline.encode([tuple(point) for point in coordinates], GEOMETRY_PRECISION)}
+    elif geometry_format == "delta":
+        fields = {"coordinates_delta": encode_delta(coordinates), "coordinates_precision": GEOMETRY_PRECISION}
+    elif geometry_format == "float32":
+        fields = {"coordinates_float32": encode_float32(coordinates)}
+    elif geometry_format == "coordinates":
+        fields = {"coordinates": coordinates}
+    else:
+        raise ValueError(f"Unknown geometry format: {geometry_format}")
+    fields["geometry_format"] = geometry_format
+    return fields
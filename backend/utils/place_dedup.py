@@ -0,0 +1,159 @@
+import re
+import math
+import logging
+from difflib import SequenceMatcher
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .geo import haversine_distance
+
+logger = logging.getLogger(__name__)
+
+# Places closer than this with similar names are treated as the same place
+DEFAULT_MERGE_DISTANCE = 150  # meters
+DEFAULT_NAME_THRESHOLD = 0.8
+
+# Share of trigrams two names need in common before they are compared in full
+_TRIGRAM_PREFILTER = 0.3
+
+_METERS_PER_DEGREE = 111320
+
+def is_similar(a, b, threshold=DEFAULT_NAME_THRESHOLD):
+    return SequenceMatcher(None, a, b).ratio() > threshold
+
+def normalize(name):
+    return re.sub(r"[^\w\s]", "", name).lower().strip()
+
+def trigrams(name: str) -> set:
+    """ Character trigrams of a normalized name, padded so short names still have some """
+    padded = f"  {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def place_location(place: Dict[str, Any]) -> Optional[Tuple[float, float]]:
+    """ (lat, lng) of a Places API result or a route attraction, if it has one """
+    location = place.get("location") or place.get("geometry", {}).get("location")
+    if not location or location.get("lat") is None or location.get("lng") is None:
+        return None
+    return (location["lat"], location["lng"])
+
+class PlaceDeduplicator:
+    def __init__(self, max_distance: float = DEFAULT_MERGE_DISTANCE, name_threshold: float = DEFAULT_NAME_THRESHOLD):
+        """
+        Finds places already seen that are near a new place and have a similar name
+
+        Kept places are indexed in a spatial grid of max_distance cells, and within
+        each cell by name trigram. A new place is only compared with kept places in
+        the neighboring cells that share enough trigrams with it, so a batch of n
+        places is checked in about O(n) instead of comparing every pair. Places with
+        the same place_id are always duplicates. A kept place can be removed again,
+        after which it no longer blocks later copies.
+
+        Args:
+            max_distance (float): Farthest apart, in meters, two places can be and still merge
+            name_threshold (float): SequenceMatcher ratio above which two normalized names are similar
+        """
+        self.max_distance = max_distance
+        self.name_threshold = name_threshold
+        self._cell_degrees = max_distance / _METERS_PER_DEGREE
+        self._place_ids: Dict[str, Dict[str, Any]] = {}
+        # (cell row, cell column) -> trigram -> indexes into self._kept
+        self._cells: Dict[Tuple[int, int], Dict[str, List[int]]] = {}
+        # Removed places leave None behind so the indexes in self._cells stay valid
+        self._kept: List[Optional[Tuple[Dict[str, Any], str, set, Tuple[float, float]]]] = []
+        # place_id (or normalized name and location) of each kept place -> its index in self._kept
+        self._kept_index: Dict[Any, int] = {}
+        self.merged = 0
+
+    @staticmethod
+    def _identity(place: Dict[str, Any], name: str, location: Optional[Tuple[float, float]]) -> Any:
+        """ What identifies a place across copies of its dict """
+        return place.get("place_id") or (name, location)
+
+    def _cell(self, location: Tuple[float, float]) -> Tuple[int, int]:
+        return (math.floor(location[0] / self._cell_degrees), math.floor(location[1] / self._cell_degrees))
+
+    def _neighbor_cells(self, location: Tuple[float, float]):
+        row, column = self._cell(location)
+        # A degree of longitude shrinks away from the equator, so reach across more columns there
+        column_span = math.ceil(1 / max(math.cos(math.radians(location[0])), 0.01))
+        for dr in (-1, 0, 1):
+            for dc in range(-column_span, column_span + 1):
+                yield (row + dr, column + dc)
+
+    def find(self, place: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Get the kept place a new place duplicates, if any
+
+        Args:
+            place (Dict[str, Any]): A place with 'name', 'place_id' and a location
+
+        Returns:
+            Optional[Dict[str, Any]]: The matching kept place, or None
+        """
+        place_id = place.get("place_id")
+        if place_id and place_id in self._place_ids:
+            return self._place_ids[place_id]
+
+        location = place_location(place)
+        name = normalize(place.get("name") or "")
+        if location is None or not name:
+            return None
+        grams = trigrams(name)
+
+        shared: Dict[int, int] = {}
+        for cell in self._neighbor_cells(location):
+            index = self._cells.get(cell)
+            if not index:
+                continue
+            for gram in grams:
+                for kept in index.get(gram, ()):
+                    shared[kept] = shared.get(kept, 0) + 1
+
+        for kept, count in shared.items():
+            if self._kept[kept] is None:
+                continue
+            kept_place, kept_name, kept_grams, kept_location = self._kept[kept]
+            if 2 * count / (len(grams) + len(kept_grams)) < _TRIGRAM_PREFILTER:
+                continue
+            if haversine_distance(location, kept_location) > self.max_distance:
+                continue
+            if kept_name == name or is_similar(name, kept_name, self.name_threshold):
+                return kept_place
+        return None
+
+    def add(self, place: Dict[str, Any]) -> bool:
+        """
+        Keep a place unless it duplicates one already kept
+
+        Returns:
+            bool: True if the place was kept, False if it was merged into an earlier one
+        """
+        if self.find(place) is not None:
+            self.merged += 1
+            return False
+
+        place_id = place.get("place_id")
+        if place_id:
+            self._place_ids[place_id] = place
+        location = place_location(place)
+        name = normalize(place.get("name") or "")
+        if location is not None and name:
+            grams = trigrams(name)
+            index = self._cells.setdefault(self._cell(location), {})
+            for gram in grams:
+                index.setdefault(gram, []).append(len(self._kept))
+            self._kept_index[self._identity(place, name, location)] = len(self._kept)
+            self._kept.append((place, name, grams, location))
+        return True
+
+    def remove(self, place: Dict[str, Any]):
+        """ Forget a kept place, matched by place_id or else by name and location, so later copies of it are kept again """
+        place_id = place.get("place_id")
+        if place_id:
+            self._place_ids.pop(place_id, None)
+        kept = self._kept_index.pop(self._identity(place, normalize(place.get("name") or ""), place_location(place)), None)
+        if kept is not None:
+            self._kept[kept] = None
+
+    def dedupe(self, places: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """ The places that are not duplicates of any place kept so far, in order """
+        return [place for place in places if self.add(place)]
@@ -0,0 +1,205 @@
+import os
+import json
+import asyncio
+import hashlib
+import logging
+from typing import Any, Dict, List, Optional, Sequence
+
+from .cache_manager import CacheManager
+from .request_coalescer import RequestCoalescer
+from .upstream_client import UpstreamClient
+
+logger = logging.getLogger(__name__)
+
+# A ranking only depends on its candidates and preferences, so it can be kept for a day
+RANKING_TTL = 24 * 3600
+
+# Seconds to wait for the model before falling back to rating order (env LLM_RANKING_DEADLINE)
+DEFAULT_RANKING_DEADLINE = 5.0
+
+# Model used for ranking (env LLM_MODEL)
+DEFAULT_RANKING_MODEL = "gpt-4o"
+
+_SYSTEM_PROMPT = (
+    "You are an AI assistant that ranks restaurants, hotels, and attractions based on user preferences. "
+    "You receive JSON with the traveler's preferences and numbered candidates for each category. "
+    "Reply with a JSON object {\"rankings\": {category: [index, ...]}} listing, for each category, "
+    "the indices of its candidates from best to worst. Use only the indices given."
+)
+
+def _place_key(place: Dict[str, Any]) -> str:
+    return place.get("place_id") or place.get("name") or ""
+
+def rating_order(places: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """ Places sorted by rating, best first; the fallback when there is no model ranking """
+    return sorted(places, key=lambda p: p.get("rating") or 0, reverse=True)
+
+class PlaceRanker:
+    def __init__(
+        self,
+        client: Optional[UpstreamClient] = None,
+        cache: Optional[CacheManager] = None,
+        model: Optional[str] = None,
+        deadline: Optional[float] = None
+    ):
+        """
+        Ranks a location's candidate places with an LLM, one request for all categories
+
+        The model is sent every category's candidates as numbered JSON and answers
+        with index lists, so no names have to be matched back. Rankings are cached by
+        a hash of the candidates' place_ids and the preferences, and concurrent
+        requests for the same candidates share one call. If the model is not
+        configured, fails, or misses the deadline, places come back in rating order.
+
+        Args:
+            client (Optional[UpstreamClient]): HTTP client for the chat completions API; defaults to a private one
+            cache (Optional[CacheManager]): Cache for rankings; defaults to a private one
+            model (Optional[str]): Model name (env LLM_MODEL, default gpt-4o)
+            deadline (Optional[float]): Seconds to wait for the model (env LLM_RANKING_DEADLINE, default 5)
+        """
+        self.client = client if client is not None else UpstreamClient()
+        self.cache = cache if cache is not None else CacheManager(ttl=RANKING_TTL)
+        self.model = model or os.getenv("LLM_MODEL", DEFAULT_RANKING_MODEL)
+        self.deadline = deadline or float(os.getenv("LLM_RANKING_DEADLINE", DEFAULT_RANKING_DEADLINE))
+        self._coalescer = RequestCoalescer("ranking")
+        self.model_calls = 0
+        self.fallbacks = 0
+
+    @staticmethod
+    def cache_key(candidates: Dict[str, Sequence[Dict[str, Any]]], preferences: Optional[Sequence[str]]) -> str:
+        """ Hash of each category's candidate place_ids and the preferences, ignoring their order """
+        identity = {
+            "candidates": {category: sorted(_place_key(p) for p in places) for category, places in candidates.items()},
+            "preferences": sorted(preferences or [])
+        }
+        return hashlib.sha256(json.dumps(identity, sort_keys=True).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _prompt(candidates: Dict[str, Sequence[Dict[str, Any]]], preferences: Optional[Sequence[str]]) -> str:
+        return json.dumps({
+            "preferences": list(preferences or []),
+            "categories": {
+                category: [
+                    {
+                        "index": i,
+                        "name": p.get("name"),
+                        "rating": p.get("rating"),
+                        "reviews": p.get("user_ratings_total"),
+                        "types": p.get("types", [p["type"]] if p.get("type") else [])[:4]
+                    }
+                    for i, p in enumerate(places)
+                ]
+                for category, places in candidates.items()
+            }
+        })
+
+    @staticmethod
+    def _parse(content: str, candidates: Dict[str, Sequence[Dict[str, Any]]]) -> Dict[str, List[str]]:
+        """
+        Read the model's index lists, dropping out-of-range and repeated indices
+
+        Candidates the model left out are appended in rating order so none are lost.
+        Returns the place_ids in ranked order, so a cached ranking still applies when
+        the same candidates arrive in another order.
+        """
+        rankings = json.loads(content).get("rankings", {})
+        orders = {}
+        for category, places in candidates.items():
+            order = []
+            for index in rankings.get(category) or []:
+                if isinstance(index, int) and 0 <= index < len(places) and index not in order:
+                    order.append(index)
+            unranked = [i for i in range(len(places)) if i not in order]
+            order.extend(sorted(unranked, key=lambda i: places[i].get("rating") or 0, reverse=True))
+            orders[category] = [_place_key(places[i]) for i in order]
+        return orders
+
+    async def _rank_with_model(self, candidates: Dict[str, Sequence[Dict[str, Any]]], preferences: Optional[Sequence[str]]) -> Dict[str, List[str]]:
+        self.model_calls += 1
+        content = await self.client.chat_completion(
+            [
+                {"role": "system", "content": _SYSTEM_PROMPT},
+                {"role": "user", "content": self._prompt(candidates, preferences)}
+            ],
+            model=self.model,
+            json_output=True
+        )
+        return self._parse(content, candidates)
+
+    async def rank(
+        self,
+        candidates: Dict[str, Sequence[Dict[str, Any]]],
+        preferences: Optional[Sequence[str]] = None,
+        limits: Optional[Dict[str, int]] = None,
+        deadline: Optional[float] = None
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Rank every category of candidates for one location
+
+        Args:
+            candidates (Dict[str, Sequence[Dict[str, Any]]]): Places by category, e.g. 'hotels', 'restaurants'
+            preferences (Optional[Sequence[str]]): The traveler's preferred place types
+            limits (Optional[Dict[str, int]]): Most places to keep per category
+            deadline (Optional[float]): Seconds to wait for the model (defaults to the ranker setting)
+
+        Returns:
+            Dict[str, List[Dict[str, Any]]]: The same categories, best place first
+        """
+        limits = limits or {}
+        candidates = {category: list(places) for category, places in candidates.items() if places}
+
+        def apply(orders):
+            ranked = {}
+            for category, places in candidates.items():
+                by_key = {_place_key(p): p for p in places}
+                ranked[category] = [by_key[key] for key in orders.get(category, []) if key in by_key][:limits.get(category)]
+            return ranked
+
+        if not candidates:
+            return {}
+        key = self.cache_key(candidates, preferences)
+        cached = await self.cache.get_cached_async('llm_rankings', key)
+        if cached:
+            return apply(cached)
+
+        async def model_ranking():
+            orders = await self._rank_with_model(candidates, preferences)
+            # Cached here rather than by the caller, so a ranking that finishes after
+            # every caller gave up on it is still kept for the next request
+            self.cache.set_cached('llm_rankings', key, orders)
+            return orders
+
+        try:
+            # Shielded so one caller's deadline does not cancel the call others share
+            orders = await asyncio.wait_for(
+                asyncio.shield(self._coalescer.run(key, model_ranking)),
+                timeout=deadline or self.deadline
+            )
+        except (Exception, asyncio.CancelledError) as e:
+            # Only fall back when the shared call was cancelled, not this request
+            if isinstance(e, asyncio.CancelledError) and asyncio.current_task().cancelling():
+                raise
+            self.fallbacks += 1
+            if isinstance(e, asyncio.TimeoutError):
+                logger.warning(f"Ranking missed its {deadline or self.deadline}s deadline; using rating order")
+            elif isinstance(e, asyncio.CancelledError):
+                logger.warning("Shared ranking call was cancelled; using rating order")
+            else:
+                logger.error(f"Error ranking places with the model: {str(e)}; using rating order")
+            return {category: rating_order(places)[:limits.get(category)] for category, places in candidates.items()}
+
+        return apply(orders)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get ranking counters
+
+        Returns:
+            Dict[str, Any]: Model calls, rating-order fallbacks, and calls shared with an in-flight ranking
+        """
+        return {
+            "model": self.model,
+            "model_calls": self.model_calls,
+            "fallbacks": self.fallbacks,
+            "coalesced": self._coalescer.coalesced
+        }
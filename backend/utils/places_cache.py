@@ -0,0 +1,209 @@
+import logging
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+from .cache_manager import CacheManager
+from .geo import haversine_distance, haversine_to_points
+from .request_coalescer import RequestCoalescer
+
+logger = logging.getLogger(__name__)
+
+# How long a cell's places stay cached, in seconds
+PLACES_TILE_TTL = 24 * 3600
+
+# Searches that found nothing are kept only briefly, in case that was a transient gap
+PLACES_EMPTY_TTL = 15 * 60
+
+# Nearby Search returns at most this many places; a full page may have left some out
+PLACES_PAGE_SIZE = 20
+
+# Extra geohash characters for the sub-tiles of a dense cell (each character is ~1/5.7 the width)
+DENSE_SUBTILE_DEPTH = 2
+
+# Largest radius the Places Nearby Search API accepts, in meters
+MAX_SEARCH_RADIUS = 50000
+
+_GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+# Search radii are rounded up to one of these classes (meters) so nearby
+# searches share cells; each class uses the coarsest geohash precision whose
+# cells are no larger than the radius.
+RADIUS_CLASSES = (
+    (1000, 6),   # ~1.2 km x 0.6 km cells
+    (5000, 5),   # ~4.9 km x 4.9 km cells
+    (20000, 4),  # ~39 km x 19.5 km cells
+    (50000, 3)   # ~156 km x 156 km cells
+)
+
+def geohash_encode(lat: float, lng: float, precision: int) -> str:
+    """ Encode a coordinate as a geohash string of the given length """
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        if even:
+            mid = (lng_range[0] + lng_range[1]) / 2
+            if lng >= mid:
+                value = value * 2 + 1
+                lng_range[0] = mid
+            else:
+                value *= 2
+                lng_range[1] = mid
+        else:
+            mid = (lat_range[0] + lat_range[1]) / 2
+            if lat >= mid:
+                value = value * 2 + 1
+                lat_range[0] = mid
+            else:
+                value *= 2
+                lat_range[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_GEOHASH_ALPHABET[value])
+            bits = 0
+            value = 0
+    return "".join(chars)
+
+def geohash_bounds(geohash: str) -> Tuple[float, float, float, float]:
+    """ Return (lat_min, lat_max, lng_min, lng_max) of a geohash cell """
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        value = _GEOHASH_ALPHABET.index(char)
+        for shift in range(4, -1, -1):
+            bit = (value >> shift) & 1
+            target = lng_range if even else lat_range
+            mid = (target[0] + target[1]) / 2
+            if bit:
+                target[0] = mid
+            else:
+                target[1] = mid
+            even = not even
+    return lat_range[0], lat_range[1], lng_range[0], lng_range[1]
+
+def radius_class(radius: float) -> Tuple[int, int]:
+    """ Round a radius up to its class, returning (class radius in meters, geohash precision) """
+    for class_radius, precision in RADIUS_CLASSES:
+        if radius <= class_radius:
+            return class_radius, precision
+    return RADIUS_CLASSES[-1]
+
+class PlacesTileCache:
+    def __init__(self, cache: CacheManager):
+        """
+        Spatial cache for nearby-places searches, keyed by (geohash cell, place type, radius class)
+
+        A search is answered from the cell containing its center. On a miss the
+        cell is fetched once, with a search centered on the cell and wide enough to
+        contain any search of that radius class centered inside it, so overlapping
+        searches from neighboring route points and other trips reuse the result.
+
+        The API returns at most PLACES_PAGE_SIZE places, so a cell whose fetch fills
+        a page may be missing places a search at the caller's own point would find.
+        Searches in such a dense cell are answered from the much smaller sub-tile
+        (DENSE_SUBTILE_DEPTH more geohash characters) containing their center, fetched
+        and cached the same way, so nearby searches in a dense area still share
+        fetches. Empty results are cached for PLACES_EMPTY_TTL only
+        ('places_tiles_empty' category).
+
+        Args:
+            cache (CacheManager): Cache used to store cell results
+        """
+        self.cache = cache
+        self._coalescer = RequestCoalescer("places cell")
+        self.cells_reused = 0
+        self.cells_fetched = 0
+        self.dense_searches = 0
+
+    async def search(
+        self,
+        fetch: Callable[..., Awaitable[Any]],
+        location: Tuple[float, float],
+        place_type: str,
+        radius: float
+    ) -> Dict[str, Any]:
+        """
+        Find places of a type within radius of location, reusing cached cells
+
+        Args:
+            fetch (Callable): Upstream search called as fetch(location=(lat, lng), type=..., radius=...)
+            location (Tuple[float, float]): (lat, lng) search center
+            place_type (str): Google Places type
+            radius (float): Search radius in meters
+
+        Returns:
+            Dict[str, Any]: Places API-shaped response whose 'results' are within radius of location
+        """
+        lat, lng = location
+        class_radius, precision = radius_class(radius)
+        results, hit = await self._cell_results(fetch, geohash_encode(lat, lng, precision), place_type, class_radius)
+        if len(results) >= PLACES_PAGE_SIZE:
+            # The cell's page is full, so it can't stand in for every search inside it
+            self.dense_searches += 1
+            subtile = geohash_encode(lat, lng, precision + DENSE_SUBTILE_DEPTH)
+            results, hit = await self._cell_results(fetch, subtile, place_type, class_radius)
+        if hit:
+            self.cells_reused += 1
+
+        if not results:
+            return {"results": []}
+        distances = haversine_to_points(
+            location,
+            [(p['geometry']['location']['lat'], p['geometry']['location']['lng']) for p in results]
+        )
+        return {"results": [place for place, distance in zip(results, distances) if distance <= radius]}
+
+    async def _cell_results(self, fetch, cell, place_type, class_radius):
+        """ A cell's places and whether they came from the cache """
+        key = f"{cell}:{place_type}:{class_radius}"
+        results = await self._get_cached(key)
+        if results is not None:
+            logger.debug("Places cell hit for %s", key)
+            return results, True
+        results = await self._coalescer.run(key, lambda: self._fetch_cell(fetch, cell, place_type, class_radius, key))
+        return results, False
+
+    async def _fetch_cell(self, fetch, cell, place_type, class_radius, key):
+        lat_min, lat_max, lng_min, lng_max = geohash_bounds(cell)
+        center = ((lat_min + lat_max) / 2, (lng_min + lng_max) / 2)
+        half_diagonal = haversine_distance(center, (lat_max, lng_max))
+
+        self.cells_fetched += 1
+        logger.debug("Places cell miss for %s", key)
+        response = await fetch(location=center, type=place_type, radius=min(class_radius + half_diagonal, MAX_SEARCH_RADIUS))
+        results = (response or {}).get('results', [])
+        self._set_cached(key, results)
+        return results
+
+    async def _get_cached(self, key):
+        results = await self.cache.get_cached_async('places_tiles', key)
+        if results is None:
+            results = await self.cache.get_cached_async('places_tiles_empty', key)
+        return results
+
+    def _set_cached(self, key, results):
+        self.cache.set_cached('places_tiles' if results else 'places_tiles_empty', key, results)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get cell reuse counters
+
+        Returns:
+            Dict[str, Any]: Cells served from cache, cells that joined an in-flight fetch,
+                cells and sub-tiles fetched upstream, searches answered from a sub-tile
+                because their cell was dense, and the reuse rate. A dense cell found in
+                the cache saved nothing, so only the tile that answered counts as reuse
+        """
+        reused = self.cells_reused + self._coalescer.coalesced
+        total = reused + self.cells_fetched
+        return {
+            "cells_reused": self.cells_reused,
+            "cells_coalesced": self._coalescer.coalesced,
+            "cells_fetched": self.cells_fetched,
+            "dense_searches": self.dense_searches,
+            "reuse_rate": round(reused / total, 3) if total else None
+        }
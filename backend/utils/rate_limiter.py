@@ -0,0 +1,243 @@
+import time
+import random
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Requests per second and burst size allowed for each upstream as a whole
+UPSTREAM_RATE_LIMITS = {
+    "google": {"rate": 50.0, "burst": 50},
+    "weatherapi": {"rate": 20.0, "burst": 20},
+    "llm": {"rate": 5.0, "burst": 10}
+}
+
+# Limits for each API family; a call must pass both its family's and its upstream's limits
+API_FAMILY_LIMITS = {
+    "directions": {"upstream": "google", "rate": 10.0, "burst": 10, "max_concurrency": 10},
+    "geocode": {"upstream": "google", "rate": 40.0, "burst": 40, "max_concurrency": 20},
+    "places_nearby": {"upstream": "google", "rate": 40.0, "burst": 40, "max_concurrency": 20},
+    "place_details": {"upstream": "google", "rate": 40.0, "burst": 40, "max_concurrency": 20},
+    "current_weather": {"upstream": "weatherapi", "rate": 20.0, "burst": 20, "max_concurrency": 10},
+    "forecast_weather": {"upstream": "weatherapi", "rate": 10.0, "burst": 10, "max_concurrency": 10},
+    "chat_completions": {"upstream": "llm", "rate": 5.0, "burst": 10, "max_concurrency": 4}
+}
+
+# Retry schedule for throttled and transient failures, in seconds
+MAX_RETRIES = 4
+BASE_RETRY_DELAY = 0.5
+MAX_RETRY_DELAY = 8.0
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        """
+        Token bucket allowing rate requests per second on average and burst at once
+
+        Args:
+            rate (float): Tokens added per second
+            burst (int): Most tokens the bucket holds
+        """
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        """ Wait until a token is available and take it """
+        # Waiters queue on the lock so tokens are handed out in arrival order
+        async with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
+
+    def drain(self) -> None:
+        """ Empty the bucket, e.g. after the upstream says its quota is used up """
+        self._refill()
+        self._tokens = min(self._tokens, 0.0)
+
+class AdaptiveConcurrencyLimit:
+    def __init__(self, max_limit: int, min_limit: int = 1):
+        """
+        Concurrency limit tuned with AIMD (additive increase, multiplicative decrease)
+
+        Each success raises the limit by 1/limit (about one slot per round of calls);
+        a throttled call halves it. Calls already in flight when the limit was last
+        halved were sent under the old limit, so their throttles belong to the same
+        burst and don't halve it again: at most one decrease per round trip.
+
+        Args:
+            max_limit (int): Highest the limit goes
+            min_limit (int): Lowest the limit goes
+        """
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.limit = float(max_limit)
+        self.in_flight = 0
+        # Bumped on every decrease; a call records it when sent
+        self.generation = 0
+        self._changed = asyncio.Condition()
+
+    async def __aenter__(self):
+        async with self._changed:
+            await self._changed.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+        return self
+
+    async def __aexit__(self, *exc_info):
+        async with self._changed:
+            self.in_flight -= 1
+            self._changed.notify_all()
+
+    def on_success(self) -> None:
+        self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def on_throttle(self, generation: int) -> None:
+        """ Halve the limit for a throttled call sent at generation, unless it was already halved since """
+        if generation != self.generation:
+            return
+        self.limit = max(self.min_limit, self.limit / 2)
+        self.generation += 1
+
+class RateLimitedCallError(Exception):
+    def __init__(self, family: str, attempts: int, cause: BaseException):
+        """ A call still failed after every retry """
+        super().__init__(f"{family} failed after {attempts} attempts: {cause}")
+        self.family = family
+        self.attempts = attempts
+        self.cause = cause
+
+class RateLimiter:
+    def __init__(
+        self,
+        is_throttled: Callable[[BaseException], bool],
+        is_transient: Callable[[BaseException], bool] = lambda e: False,
+        retry_after: Callable[[BaseException], Optional[float]] = lambda e: None,
+        upstream_limits: Optional[Dict[str, Dict[str, Any]]] = None,
+        family_limits: Optional[Dict[str, Dict[str, Any]]] = None,
+        max_retries: int = MAX_RETRIES,
+        base_delay: float = BASE_RETRY_DELAY,
+        max_delay: float = MAX_RETRY_DELAY
+    ):
+        """
+        Rate limits, adaptive concurrency and retries for every outbound API call
+
+        Each call waits for a token from its upstream's bucket and its API family's
+        bucket, then for a slot under the family's adaptive concurrency limit. A
+        throttled call halves that limit (once per burst of throttles), drains the
+        family's bucket, and is retried after an exponential backoff with full
+        jitter; transient failures are retried the same way without touching the limit.
+
+        Args:
+            is_throttled (Callable): Whether an exception means the upstream is throttling us
+            is_transient (Callable): Whether an exception is worth retrying as-is (timeouts, 5xx)
+            retry_after (Callable): Seconds the upstream asked us to wait, if it said
+            upstream_limits (Optional[Dict]): Rate and burst per upstream (defaults to UPSTREAM_RATE_LIMITS)
+            family_limits (Optional[Dict]): Upstream, rate, burst and max concurrency per API family
+                (defaults to API_FAMILY_LIMITS)
+            max_retries (int): Retries after the first attempt
+            base_delay (float): Backoff before the first retry, in seconds
+            max_delay (float): Longest backoff, in seconds
+        """
+        self.is_throttled = is_throttled
+        self.is_transient = is_transient
+        self.retry_after = retry_after
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.upstream_limits = upstream_limits or UPSTREAM_RATE_LIMITS
+        self.family_limits = family_limits or API_FAMILY_LIMITS
+        self._upstream_buckets: Dict[str, TokenBucket] = {}
+        self._families: Dict[str, tuple] = {}
+
+    def _family(self, family: str) -> tuple:
+        # Created on first use so they bind to the running event loop
+        if family not in self._families:
+            config = self.family_limits.get(family, {"upstream": family, "rate": 10.0, "burst": 10, "max_concurrency": 10})
+            upstream = config["upstream"]
+            if upstream not in self._upstream_buckets:
+                upstream_config = self.upstream_limits.get(upstream, config)
+                self._upstream_buckets[upstream] = TokenBucket(upstream_config["rate"], upstream_config["burst"])
+            self._families[family] = (
+                self._upstream_buckets[upstream],
+                TokenBucket(config["rate"], config["burst"]),
+                AdaptiveConcurrencyLimit(config["max_concurrency"]),
+                {"calls": 0, "throttled": 0, "retries": 0, "failures": 0}
+            )
+        return self._families[family]
+
+    def _backoff(self, attempt: int, error: BaseException) -> float:
+        requested = self.retry_after(error)
+        if requested is not None:
+            return min(requested, self.max_delay)
+        # Full jitter: spreads out retries from calls that were throttled together
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    async def run(self, family: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Call func under the limits for an API family, retrying throttled and transient failures
+
+        Args:
+            family (str): API family, e.g. 'places_nearby'
+            func (Callable[[], Awaitable[Any]]): Coroutine function making one upstream call
+
+        Returns:
+            Any: What func returned
+
+        Raises:
+            RateLimitedCallError: If the call was still throttled or failing after every retry
+            Exception: Whatever func raised, if it is neither throttling nor transient
+        """
+        upstream_bucket, family_bucket, concurrency, stats = self._family(family)
+        stats["calls"] += 1
+        for attempt in range(self.max_retries + 1):
+            await family_bucket.acquire()
+            await upstream_bucket.acquire()
+            generation = concurrency.generation
+            try:
+                async with concurrency:
+                    generation = concurrency.generation
+                    result = await func()
+                    # Raised before the slot is released so waiters see the new limit
+                    concurrency.on_success()
+                return result
+            except Exception as e:
+                throttled = self.is_throttled(e)
+                if not throttled and not self.is_transient(e):
+                    raise
+                if throttled:
+                    stats["throttled"] += 1
+                    concurrency.on_throttle(generation)
+                    family_bucket.drain()
+                if attempt == self.max_retries:
+                    stats["failures"] += 1
+                    logger.error(f"{family} call failed after {attempt + 1} attempts: {e}")
+                    raise RateLimitedCallError(family, attempt + 1, e) from e
+                delay = self._backoff(attempt, e)
+                stats["retries"] += 1
+                logger.warning(
+                    f"{family} call {'throttled' if throttled else 'failed'} ({e}); retrying in {delay:.2f}s "
+                    f"with concurrency limit {int(concurrency.limit)}"
+                )
+                await asyncio.sleep(delay)
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get per-family counters and current concurrency limits
+
+        Returns:
+            Dict[str, Dict[str, Any]]: Calls, throttled attempts, retries, failures after
+                all retries, and the adaptive concurrency limit for each API family used so far
+        """
+        return {
+            family: {**stats, "concurrency_limit": int(concurrency.limit), "in_flight": concurrency.in_flight}
+            for family, (_, _, concurrency, stats) in self._families.items()
+        }
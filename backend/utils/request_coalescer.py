@@ -0,0 +1,77 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+logger = logging.getLogger(__name__)
+
+class _LeaderCancelled(Exception):
+    """ Handed to followers when the leader was cancelled, so one of them reruns the work """
+
+class RequestCoalescer:
+    def __init__(self, name: str = "requests"):
+        """
+        Share one in-flight call among concurrent callers with the same key
+
+        The first caller for a key (the leader) runs the work; callers arriving while
+        it is still running (followers) await the leader's result instead of repeating it.
+        If the leader is cancelled (its own timeout, or its client going away), its
+        followers aren't: the first of them to resume reruns the work for the rest.
+
+        Args:
+            name (str): Label used in log messages
+        """
+        self.name = name
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def run(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run func for key, or join the call already running for it
+
+        Args:
+            key (Hashable): Canonical identity of the request
+            func (Callable[[], Awaitable[Any]]): Coroutine function that does the work
+
+        Returns:
+            Any: The leader's result; followers receive the same object
+        """
+        in_flight = self._in_flight.get(key)
+        while in_flight is not None:
+            self.coalesced += 1
+            logger.info(f"Coalescing {self.name} request onto in-flight call ({self.coalesced} coalesced so far)")
+            try:
+                return await asyncio.shield(in_flight)
+            except _LeaderCancelled:
+                logger.info(f"In-flight {self.name} call was cancelled; running it again")
+                in_flight = self._in_flight.get(key)
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        self.leaders += 1
+        try:
+            result = await func()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            if not future.done():
+                # Followers weren't cancelled themselves, so they get an ordinary exception
+                future.set_exception(_LeaderCancelled() if isinstance(e, asyncio.CancelledError) else e)
+                # Mark retrieved so an exception nobody followed isn't reported as unhandled
+                future.exception()
+            raise
+        finally:
+            del self._in_flight[key]
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Get coalescing counters
+
+        Returns:
+            Dict[str, int]: Calls that ran the work, calls that joined one, and calls in flight now
+        """
+        return {
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._in_flight)
+        }
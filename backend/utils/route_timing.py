@@ -0,0 +1,78 @@
+import logging
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .geo import cumulative_route_length
+
+logger = logging.getLogger(__name__)
+
+def stop_times(legs: Sequence[Dict[str, Any]], departure: float, stop_durations: Optional[Sequence[int]] = None) -> List[Tuple[float, float]]:
+    """
+    Arrival and departure time at every stop of a route
+
+    Args:
+        legs (Sequence[Dict[str, Any]]): Route legs with 'duration_seconds'
+        departure (float): Departure from the origin in epoch seconds
+        stop_durations (Optional[Sequence[int]]): Minutes spent at each intermediate stop
+
+    Returns:
+        List[Tuple[float, float]]: (arrival, departure) in epoch seconds for the origin,
+            each intermediate stop, and the destination
+    """
+    stop_durations = stop_durations or []
+    times = [(departure, departure)]
+    for i, leg in enumerate(legs):
+        arrival = times[-1][1] + leg["duration_seconds"]
+        is_intermediate = i < len(legs) - 1
+        dwell = stop_durations[i] * 60 if is_intermediate and i < len(stop_durations) else 0
+        times.append((arrival, arrival + dwell))
+    return times
+
+def sample_route_etas(
+    coordinates: Sequence[Sequence[float]],
+    legs: Sequence[Dict[str, Any]],
+    times: Sequence[Tuple[float, float]],
+    spacing: float
+) -> List[Dict[str, float]]:
+    """
+    Points evenly spaced along a route with the time each is reached
+
+    Time is interpolated by distance within each leg, and stands still while
+    stopped. Leg distances are scaled to the polyline's own length so the leg
+    boundaries line up with it.
+
+    Args:
+        coordinates (Sequence[Sequence[float]]): [lat, lng] vertices of the route
+        legs (Sequence[Dict[str, Any]]): Route legs with 'distance_meters'
+        times (Sequence[Tuple[float, float]]): Output of stop_times for the same legs
+        spacing (float): Distance in meters between points; the ends of the route are left out
+
+    Returns:
+        List[Dict[str, float]]: {'lat', 'lng', 'eta', 'distance_meters'} for each point
+    """
+    coords = np.asarray(coordinates, dtype=float).reshape(-1, 2)
+    leg_distances = np.array([leg.get("distance_meters", 0) for leg in legs], dtype=float)
+    if len(coords) < 2 or spacing <= 0 or leg_distances.sum() <= 0:
+        return []
+
+    cumulative = cumulative_route_length(coords)
+    total = cumulative[-1]
+    boundaries = np.cumsum(leg_distances) * (total / leg_distances.sum())
+
+    # Distance -> time, with a flat step at each stop for the time spent there
+    distance_knots = [0.0]
+    time_knots = [times[0][1]]
+    for boundary, (arrival, departure) in zip(boundaries, times[1:]):
+        distance_knots.extend((boundary, boundary))
+        time_knots.extend((arrival, departure))
+
+    targets = np.arange(spacing, total - spacing / 2, spacing)
+    etas = np.interp(targets, distance_knots, time_knots)
+    lats = np.interp(targets, cumulative, coords[:, 0])
+    lngs = np.interp(targets, cumulative, coords[:, 1])
+    logger.debug("Sampled %d points every %.0f m along a %.0f m route", len(targets), spacing, total)
+    return [
+        {"lat": lat, "lng": lng, "eta": eta, "distance_meters": distance}
+        for lat, lng, eta, distance in zip(lats.tolist(), lngs.tolist(), etas.tolist(), targets.tolist())
+    ]
@@ -0,0 +1,128 @@
+import asyncio
+import time
+import logging
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+class Stage:
+    def __init__(
+        self,
+        name: str,
+        func: Callable[..., Awaitable[Any]],
+        inputs: Iterable[str] = (),
+        timeout: Optional[float] = None,
+        on_timeout: Any = None,
+        on_error: Any = None
+    ):
+        """
+        A single unit of work in a StageScheduler
+
+        Args:
+            name (str): Unique stage name, also used as the keyword when passing its result downstream
+            func (Callable): Coroutine function called with the results of its inputs as keyword arguments
+            inputs (Iterable[str]): Names of the stages whose results this stage needs
+            timeout (Optional[float]): Seconds the stage may run once its inputs are ready
+            on_timeout (Any): Result used when the stage times out
+            on_error (Any): Result used when the stage raises
+        """
+        self.name = name
+        self.func = func
+        self.inputs = tuple(inputs)
+        self.timeout = timeout
+        self.on_timeout = on_timeout
+        self.on_error = on_error
+
+class StageScheduler:
+    def __init__(self, stages: List[Stage]):
+        """
+        Run stages concurrently, starting each as soon as the stages it depends on have finished
+
+        Args:
+            stages (List[Stage]): The stages to run; inputs must name other stages and be acyclic
+        """
+        self.stages: Dict[str, Stage] = {}
+        for stage in stages:
+            if stage.name in self.stages:
+                raise ValueError(f"Duplicate stage name: {stage.name}")
+            self.stages[stage.name] = stage
+        self.order = self._resolve_order()
+        self.timings: Dict[str, float] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def _resolve_order(self) -> List[str]:
+        """ Return stage names so that every stage comes after its inputs """
+        order = []
+        state = {}  # name -> "visiting" | "done"
+
+        def visit(name, path):
+            if state.get(name) == "done":
+                return
+            if state.get(name) == "visiting":
+                raise ValueError(f"Stage dependency cycle: {' -> '.join(path + [name])}")
+            if name not in self.stages:
+                raise ValueError(f"Stage {path[-1]} depends on unknown stage {name}")
+            state[name] = "visiting"
+            for dependency in self.stages[name].inputs:
+                visit(dependency, path + [name])
+            state[name] = "done"
+            order.append(name)
+
+        for name in self.stages:
+            visit(name, [])
+        return order
+
+    def start(self) -> None:
+        """ Schedule every stage; stages without inputs begin running immediately """
+        if self._tasks:
+            return
+        for name in self.order:
+            self._tasks[name] = asyncio.create_task(self._run_stage(self.stages[name]))
+
+    async def _run_stage(self, stage: Stage) -> Any:
+        inputs = {}
+        for dependency in stage.inputs:
+            inputs[dependency] = await self._tasks[dependency]
+
+        start_time = time.time()
+        try:
+            result = await asyncio.wait_for(stage.func(**inputs), timeout=stage.timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"{stage.name} stage timed out after {stage.timeout} seconds")
+            result = stage.on_timeout
+        except Exception as e:
+            logger.error(f"{stage.name} stage failed: {str(e)}")
+            result = stage.on_error
+        self.timings[stage.name] = time.time() - start_time
+        logger.info(f"{stage.name} stage finished in {self.timings[stage.name]:.2f} seconds")
+        return result
+
+    async def result(self, name: str) -> Any:
+        """
+        Wait for a single stage and return its result, starting the scheduler if needed
+
+        Args:
+            name (str): The stage to wait for
+
+        Returns:
+            Any: The stage result, or its fallback if it timed out or failed
+        """
+        self.start()
+        return await self._tasks[name]
+
+    async def run(self) -> Dict[str, Any]:
+        """
+        Run all stages to completion
+
+        Returns:
+            Dict[str, Any]: Dictionary mapping stage names to their results
+        """
+        self.start()
+        results = await asyncio.gather(*(self._tasks[name] for name in self.order))
+        return dict(zip(self.order, results))
+
+    def cancel(self) -> None:
+        """ Cancel any stages that are still pending or running """
+        for task in self._tasks.values():
+            if not task.done():
+                task.cancel()
@@ -0,0 +1,90 @@
+import heapq
+import logging
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from .place_dedup import PlaceDeduplicator
+
+logger = logging.getLogger(__name__)
+
+class TopKAggregator:
+    def __init__(
+        self,
+        per_group: int,
+        total: int,
+        key: Callable[[Dict[str, Any]], Tuple],
+        deduplicator: Optional[PlaceDeduplicator] = None
+    ):
+        """
+        Streaming top-k of places per group and overall, deduplicated as they arrive
+
+        Each group keeps its best per_group places in a bounded min-heap, so a new
+        place costs O(log per_group) and nothing is sorted until results() is called.
+        Places that duplicate one still kept are dropped on insert; an evicted place
+        is removed from the deduplicator so a later copy of it can be kept. Among
+        places with equal keys the one offered first is kept.
+
+        Args:
+            per_group (int): Most places kept per group (e.g. per attraction type)
+            total (int): Most places returned overall
+            key (Callable[[Dict[str, Any]], Tuple]): Sort key; larger is better
+            deduplicator (Optional[PlaceDeduplicator]): Duplicate detection; defaults to a new one
+        """
+        self.per_group = per_group
+        self.total = total
+        self.key = key
+        self.deduplicator = deduplicator if deduplicator is not None else PlaceDeduplicator()
+        self._heaps: Dict[Hashable, List[Tuple[Tuple, int, Dict[str, Any]]]] = {}
+        self._offered = 0
+        self.duplicates = 0
+
+    def is_full(self, group: Hashable) -> bool:
+        """ Whether a group already holds per_group places """
+        return len(self._heaps.get(group, ())) >= self.per_group
+
+    def offer(self, group: Hashable, place: Dict[str, Any]) -> bool:
+        """
+        Add a place to a group if it is new and among the group's best
+
+        Returns:
+            bool: True if the place was kept
+        """
+        heap = self._heaps.setdefault(group, [])
+        key = self.key(place)
+        # A full group only takes places that beat its worst
+        if len(heap) >= self.per_group and key <= heap[0][0]:
+            return False
+        if not self.deduplicator.add(place):
+            self.duplicates += 1
+            return False
+        self._offered += 1
+        # Negated counter: among equal keys the latest offered is evicted first
+        entry = (key, -self._offered, place)
+        if len(heap) < self.per_group:
+            heapq.heappush(heap, entry)
+        else:
+            _, _, evicted = heapq.heapreplace(heap, entry)
+            self.deduplicator.remove(evicted)
+        return True
+
+    def can_change(self, best_possible_key: Tuple) -> bool:
+        """
+        Whether a place with best_possible_key could still change results()
+
+        Returns:
+            bool: False once the overall top total is full and its worst key is at
+                least best_possible_key, i.e. further searching is wasted
+        """
+        entries = [entry for heap in self._heaps.values() for entry in heap]
+        if len(entries) < self.total:
+            return True
+        floor = heapq.nlargest(self.total, entries)[-1][0]
+        return floor < best_possible_key
+
+    def places(self) -> List[Dict[str, Any]]:
+        """ Every place currently kept, in no particular order """
+        return [place for heap in self._heaps.values() for _, _, place in heap]
+
+    def results(self) -> List[Dict[str, Any]]:
+        """ The best total places across all groups, best first """
+        entries = [(self.key(place), order, place) for heap in self._heaps.values() for _, order, place in heap]
+        return [place for _, _, place in heapq.nlargest(self.total, entries)]
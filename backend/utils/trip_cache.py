@@ -0,0 +1,126 @@
+import json
+import time
+import logging
+from datetime import datetime, timezone, tzinfo
+from typing import Any, Dict, Optional
+
+from .cache_manager import CacheManager
+
+logger = logging.getLogger(__name__)
+
+# How long each section of a plan_trip response stays fresh, in seconds
+TRIP_SECTION_TTLS = {
+    "route": 4 * 3600,
+    "route_attractions": 24 * 3600,
+    "weather": 10 * 60,
+    "recommendations": 24 * 3600
+}
+
+# Departures within the same window share cached sections
+DEPARTURE_BUCKET_SECONDS = 3600
+
+def parse_departure_time(departure_time: str, tz: Optional[tzinfo] = None) -> float:
+    """
+    Convert a requested departure time to epoch seconds
+
+    Args:
+        departure_time (str): 'now', an ISO-8601 time with a UTC offset (e.g.
+            2025-05-01T05:00-05:00), or a local time in the format YYYY-MM-DD HH:MM
+        tz (Optional[tzinfo]): Zone of times given without an offset, normally the
+            origin's; UTC if not given, never the server's own zone
+
+    Returns:
+        float: Epoch seconds; unparseable times are treated as 'now'
+    """
+    if departure_time and departure_time.strip().lower() != "now":
+        try:
+            parsed = datetime.fromisoformat(departure_time.strip())
+            if parsed.tzinfo is None:
+                parsed = parsed.replace(tzinfo=tz or timezone.utc)
+            return parsed.timestamp()
+        except ValueError:
+            logger.warning(f"Could not parse departure time: {departure_time}")
+    return time.time()
+
+def has_utc_offset(departure_time: str) -> bool:
+    """ Whether a departure time says its own UTC offset (or is 'now'), so no zone is needed to read it """
+    if not departure_time or departure_time.strip().lower() == "now":
+        return True
+    try:
+        return datetime.fromisoformat(departure_time.strip()).tzinfo is not None
+    except ValueError:
+        return True
+
+def departure_bucket(departure_time: str, bucket_seconds: int = DEPARTURE_BUCKET_SECONDS) -> int:
+    """
+    Map a departure time to the start of its time bucket
+
+    Args:
+        departure_time (str): 'now' or a time as accepted by parse_departure_time
+            (times without an offset are bucketed as UTC, which keeps keys stable)
+        bucket_seconds (int): Width of a bucket in seconds
+
+    Returns:
+        int: Epoch seconds at the start of the bucket; unparseable times are treated as 'now'
+    """
+    return int(parse_departure_time(departure_time) // bucket_seconds) * bucket_seconds
+
+def is_degraded(value: Any) -> bool:
+    """ Whether a section is an error result or holds one, e.g. a single stop's weather failed """
+    if not isinstance(value, dict):
+        return False
+    return "error" in value or any(isinstance(item, dict) and "error" in item for item in value.values())
+
+class TripResponseCache:
+    def __init__(self, cache: CacheManager, bucket_seconds: int = DEPARTURE_BUCKET_SECONDS):
+        """
+        Cache the sections of a plan_trip response separately, each with its own TTL
+
+        Section TTLs come from the cache's per-category TTLs for 'trip_<section>'.
+
+        Args:
+            cache (CacheManager): Cache used to store the sections
+            bucket_seconds (int): Width of the departure-time buckets in seconds
+        """
+        self.cache = cache
+        self.bucket_seconds = bucket_seconds
+
+    def make_key(self, canonical_key: tuple, departure_time: str) -> str:
+        """
+        Build the cache key from the canonical request and its departure bucket
+
+        canonical_key must not include the exact departure time, or departures in
+        the same bucket would still get different keys.
+        """
+        return json.dumps([list(canonical_key), departure_bucket(departure_time, self.bucket_seconds)])
+
+    async def get_section(self, key: str, section: str) -> Optional[Any]:
+        """ Get a fresh cached section, or None if it must be recomputed """
+        return await self.cache.get_cached_async(f"trip_{section}", key)
+
+    def set_section(self, key: str, section: str, value: Any, degraded: bool = False) -> None:
+        """
+        Cache a section unless it is degraded
+
+        A section is degraded if it is or holds an error result, or if its producer
+        says so (e.g. some route attraction searches failed). Caching it would serve
+        the incomplete result for the section's whole TTL after a transient failure.
+        """
+        if degraded or is_degraded(value):
+            logger.info(f"Not caching degraded {section} section")
+            return
+        self.cache.set_cached(f"trip_{section}", key, value)
+
+    async def get_sections(self, key: str) -> Dict[str, Any]:
+        """
+        Get every section that is still fresh
+
+        Returns:
+            Dict[str, Any]: Dictionary mapping section names to cached values
+        """
+        sections = {}
+        for section in TRIP_SECTION_TTLS:
+            value = await self.get_section(key, section)
+            if value is not None:
+                sections[section] = value
+        return sections
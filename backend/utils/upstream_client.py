@@ -0,0 +1,340 @@
+import os
+import logging
+import importlib.util
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import httpx
+
+from .rate_limiter import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+GOOGLE_MAPS_BASE_URL = "https://maps.googleapis.com/maps/api"
+WEATHER_API_BASE_URL = "http://api.weatherapi.com/v1"
+# Any OpenAI-compatible chat completions API; override with LLM_BASE_URL (e.g. a local stub)
+LLM_BASE_URL = "https://api.openai.com/v1"
+
+# Where each upstream is served on a local fake-upstream server (fake_upstream.py);
+# setting FAKE_UPSTREAM_URL points every upstream there
+FAKE_UPSTREAM_PATHS = {"google": "/maps/api", "weather": "/weather/v1", "llm": "/llm/v1"}
+
+# Connection pool defaults; each can be overridden with the environment variable of the same name
+UPSTREAM_MAX_CONNECTIONS = 100
+UPSTREAM_MAX_KEEPALIVE_CONNECTIONS = 20
+UPSTREAM_KEEPALIVE_EXPIRY = 30.0
+UPSTREAM_TIMEOUT = 30.0
+
+# Google statuses that mean the request worked, even if nothing matched
+_GOOGLE_OK_STATUSES = ("OK", "ZERO_RESULTS")
+
+# Google statuses that mean we are sending too much, and those worth simply retrying
+_GOOGLE_THROTTLED_STATUSES = ("OVER_QUERY_LIMIT", "RESOURCE_EXHAUSTED")
+_GOOGLE_RETRYABLE_STATUSES = ("UNKNOWN_ERROR",)
+
+class UpstreamError(Exception):
+    def __init__(self, service: str, status: str, message: Optional[str] = None):
+        """
+        An upstream API answered, but reported that the request failed
+
+        Args:
+            service (str): Which API failed, e.g. 'directions'
+            status (str): The API's status code, e.g. 'OVER_QUERY_LIMIT'
+            message (Optional[str]): The API's error message, if it gave one
+        """
+        super().__init__(f"{service} returned {status}" + (f": {message}" if message else ""))
+        self.service = service
+        self.status = status
+        self.message = message
+
+def is_throttled(error: BaseException) -> bool:
+    """ Whether an upstream error means we are over a rate limit or quota """
+    if isinstance(error, UpstreamError):
+        return error.status in _GOOGLE_THROTTLED_STATUSES
+    return isinstance(error, httpx.HTTPStatusError) and error.response.status_code == 429
+
+def is_transient(error: BaseException) -> bool:
+    """ Whether an upstream error is likely to go away on retry """
+    if isinstance(error, UpstreamError):
+        return error.status in _GOOGLE_RETRYABLE_STATUSES
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code >= 500
+    return isinstance(error, (httpx.TimeoutException, httpx.NetworkError))
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """ Seconds a 429/503 response asked us to wait, if it said """
+    if isinstance(error, httpx.HTTPStatusError):
+        try:
+            return float(error.response.headers.get("retry-after", ""))
+        except ValueError:
+            return None
+    return None
+
+def _base_url(upstream: str, env_var: str, default: str) -> str:
+    """ Base URL for an upstream: its own env var, else the fake-upstream server, else the real API """
+    fake_upstream_url = os.getenv("FAKE_UPSTREAM_URL")
+    if os.getenv(env_var):
+        url = os.environ[env_var]
+    elif fake_upstream_url:
+        url = fake_upstream_url.rstrip("/") + FAKE_UPSTREAM_PATHS[upstream]
+    else:
+        url = default
+    return url.rstrip("/")
+
+def _as_latlng(location: Union[str, Sequence[float]]) -> str:
+    if isinstance(location, str):
+        return location
+    return f"{location[0]},{location[1]}"
+
+class UpstreamClient:
+    def __init__(
+        self,
+        max_connections: Optional[int] = None,
+        max_keepalive_connections: Optional[int] = None,
+        keepalive_expiry: Optional[float] = None,
+        timeout: Optional[float] = None,
+        http2: Optional[bool] = None,
+        rate_limiter: Optional[RateLimiter] = None
+    ):
+        """
+        One async HTTP client shared by every agent for Google Maps, WeatherAPI and LLM calls
+
+        Connections are pooled and kept alive across requests. The client is opened
+        and closed by the app lifespan; used outside it (scripts, tests) it opens on
+        first use. Every call goes through the rate limiter for its API family, which
+        retries throttled and transient failures. Base URLs come from
+        GOOGLE_MAPS_BASE_URL, WEATHER_API_BASE_URL and LLM_BASE_URL, or all point at a
+        local fake-upstream server when FAKE_UPSTREAM_URL is set.
+
+        Args:
+            max_connections (Optional[int]): Most connections open at once (env UPSTREAM_MAX_CONNECTIONS)
+            max_keepalive_connections (Optional[int]): Most idle connections kept open (env UPSTREAM_MAX_KEEPALIVE_CONNECTIONS)
+            keepalive_expiry (Optional[float]): Seconds an idle connection is kept (env UPSTREAM_KEEPALIVE_EXPIRY)
+            timeout (Optional[float]): Request timeout in seconds (env UPSTREAM_TIMEOUT)
+            http2 (Optional[bool]): Use HTTP/2; defaults to on when the h2 package is installed
+            rate_limiter (Optional[RateLimiter]): Limits for each upstream and API family; defaults to the standard limits
+        """
+        self.max_connections = max_connections or int(os.getenv("UPSTREAM_MAX_CONNECTIONS", UPSTREAM_MAX_CONNECTIONS))
+        self.max_keepalive_connections = max_keepalive_connections or int(os.getenv("UPSTREAM_MAX_KEEPALIVE_CONNECTIONS", UPSTREAM_MAX_KEEPALIVE_CONNECTIONS))
+        self.keepalive_expiry = keepalive_expiry or float(os.getenv("UPSTREAM_KEEPALIVE_EXPIRY", UPSTREAM_KEEPALIVE_EXPIRY))
+        self.timeout = timeout or float(os.getenv("UPSTREAM_TIMEOUT", UPSTREAM_TIMEOUT))
+        self.http2 = http2 if http2 is not None else importlib.util.find_spec("h2") is not None
+        self.google_base_url = _base_url("google", "GOOGLE_MAPS_BASE_URL", GOOGLE_MAPS_BASE_URL)
+        self.weather_base_url = _base_url("weather", "WEATHER_API_BASE_URL", WEATHER_API_BASE_URL)
+        self.llm_base_url = _base_url("llm", "LLM_BASE_URL", LLM_BASE_URL)
+        self.rate_limiter = rate_limiter or RateLimiter(is_throttled, is_transient, retry_after)
+        self._client: Optional[httpx.AsyncClient] = None
+        self.requests = 0
+
+    def open(self) -> None:
+        """ Create the connection pool if it isn't open yet """
+        if self._client is not None:
+            return
+        self._client = httpx.AsyncClient(
+            http2=self.http2,
+            timeout=self.timeout,
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive_connections,
+                keepalive_expiry=self.keepalive_expiry
+            )
+        )
+        logger.info(f"Opened upstream HTTP client (max {self.max_connections} connections, HTTP/2 {'on' if self.http2 else 'off'})")
+
+    async def close(self) -> None:
+        """ Close every pooled connection """
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            logger.info("Closed upstream HTTP client")
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self.open()
+        return self._client
+
+    async def get_json(self, url: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        """
+        GET a URL and parse its JSON body
+
+        Raises:
+            httpx.HTTPError: If the request fails or returns an error status
+        """
+        self.requests += 1
+        response = await self.client.get(url, params=params)
+        response.raise_for_status()
+        return response.json()
+
+    async def post_json(self, url: str, body: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> Any:
+        """
+        POST a JSON body to a URL and parse its JSON response
+
+        Raises:
+            httpx.HTTPError: If the request fails or returns an error status
+        """
+        self.requests += 1
+        response = await self.client.post(url, json=body, headers=headers)
+        response.raise_for_status()
+        return response.json()
+
+    async def _google(self, service: str, path: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        api_key = os.getenv("GOOGLE_MAPS_API_KEY")
+        if not api_key:
+            raise ValueError("Google Maps API key not found")
+        params = {name: value for name, value in params.items() if value is not None}
+
+        async def call():
+            body = await self.get_json(f"{self.google_base_url}/{path}", {**params, "key": api_key})
+            status = body.get("status", "OK")
+            if status not in _GOOGLE_OK_STATUSES:
+                raise UpstreamError(service, status, body.get("error_message"))
+            return body
+
+        return await self.rate_limiter.run(service, call)
+
+    async def directions(
+        self,
+        origin: str,
+        destination: str,
+        waypoints: Optional[List[str]] = None,
+        mode: str = "driving",
+        departure_time: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Google Directions API
+
+        Returns:
+            List[Dict[str, Any]]: The routes found (empty if there is none)
+        """
+        body = await self._google("directions", "directions/json", {
+            "origin": origin,
+            "destination": destination,
+            "waypoints": "|".join(waypoints) if waypoints else None,
+            "mode": mode,
+            "departure_time": departure_time
+        })
+        return body.get("routes", [])
+
+    async def geocode(self, address: str) -> List[Dict[str, Any]]:
+        """
+        Google Geocoding API
+
+        Returns:
+            List[Dict[str, Any]]: The matching results (empty if there is none)
+        """
+        body = await self._google("geocode", "geocode/json", {"address": address})
+        return body.get("results", [])
+
+    async def places_nearby(
+        self,
+        location: Union[str, Sequence[float]],
+        radius: float,
+        type: Optional[str] = None,
+        keyword: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Google Places Nearby Search
+
+        Args:
+            location (Union[str, Sequence[float]]): (lat, lng) or 'lat,lng' search center
+            radius (float): Search radius in meters
+            type (Optional[str]): Google Places type
+            keyword (Optional[str]): Free-text filter
+
+        Returns:
+            Dict[str, Any]: The API response, with the places in 'results'
+        """
+        return await self._google("places_nearby", "place/nearbysearch/json", {
+            "location": _as_latlng(location),
+            "radius": int(radius),
+            "type": type,
+            "keyword": keyword
+        })
+
+    async def place_details(self, place_id: str, fields: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Google Place Details
+
+        Returns:
+            Dict[str, Any]: The API response, with the place in 'result'
+        """
+        return await self._google("place_details", "place/details/json", {"place_id": place_id, "fields": fields})
+
+    async def current_weather(self, query: str) -> Dict[str, Any]:
+        """
+        WeatherAPI current conditions
+
+        Args:
+            query (str): 'lat,lng' or a place name
+
+        Returns:
+            Dict[str, Any]: The API response
+        """
+        api_key = os.getenv("WEATHER_API_KEY")
+        if not api_key:
+            raise ValueError("Weather API key not found")
+        return await self.rate_limiter.run(
+            "current_weather",
+            lambda: self.get_json(f"{self.weather_base_url}/current.json", {"key": api_key, "q": query, "aqi": "no"})
+        )
+
+    async def forecast_weather(self, query: str, days: int) -> Dict[str, Any]:
+        """
+        WeatherAPI hourly forecast
+
+        Args:
+            query (str): 'lat,lng' or a place name
+            days (int): Days of forecast, starting today
+
+        Returns:
+            Dict[str, Any]: The API response, with hours under forecast.forecastday[].hour
+        """
+        api_key = os.getenv("WEATHER_API_KEY")
+        if not api_key:
+            raise ValueError("Weather API key not found")
+        return await self.rate_limiter.run(
+            "forecast_weather",
+            lambda: self.get_json(
+                f"{self.weather_base_url}/forecast.json",
+                {"key": api_key, "q": query, "days": days, "aqi": "no", "alerts": "no"}
+            )
+        )
+
+    async def chat_completion(self, messages: List[Dict[str, str]], model: str, json_output: bool = False) -> str:
+        """
+        OpenAI-compatible chat completion
+
+        Args:
+            messages (List[Dict[str, str]]): Chat messages with 'role' and 'content'
+            model (str): Model name
+            json_output (bool): Ask the model to reply with a JSON object
+
+        Returns:
+            str: The content of the first choice
+        """
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            raise ValueError("OpenAI API key not found")
+        body = {"model": model, "messages": messages, "temperature": 0}
+        if json_output:
+            body["response_format"] = {"type": "json_object"}
+        response = await self.rate_limiter.run(
+            "chat_completions",
+            lambda: self.post_json(f"{self.llm_base_url}/chat/completions", body, {"Authorization": f"Bearer {api_key}"})
+        )
+        return response["choices"][0]["message"]["content"]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get pool settings and the number of requests sent
+
+        Returns:
+            Dict[str, Any]: Requests sent, whether the pool is open, and its limits
+        """
+        return {
+            "requests": self.requests,
+            "open": self._client is not None,
+            "http2": self.http2,
+            "max_connections": self.max_connections,
+            "max_keepalive_connections": self.max_keepalive_connections
+        }